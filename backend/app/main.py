@@ -1,12 +1,15 @@
+import asyncio
 import time
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from .settings import settings
 from .db import migrate_on_boot, get_pool
+from .services import batch_rulecheck, catalog_cache, catalog_refresh, curriculum_registry
 from .routes.catalog import router as catalog_router
 from .routes.rulecheck import router as rulecheck_router
 from .routes.auth import router as auth_router
 from .routes.planner_state import router as planner_state_router
+from .routes.analytics import router as analytics_router
 
 app = FastAPI(
     title="My Service",
@@ -22,6 +25,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Link", "Catalog-Version"],  # read by the catalog client
 )
 
 
@@ -36,9 +40,36 @@ async def log_http_requests(request: Request, call_next):
     )
     return response
 
+_curriculum_watch: asyncio.Task | None = None
+_catalog_listen: asyncio.Task | None = None
+_catalog_refresh: asyncio.Task | None = None
+
 @app.on_event("startup")
 async def _startup():
+    global _curriculum_watch, _catalog_listen, _catalog_refresh
     await migrate_on_boot()
+    if settings.CATALOG_CACHE:
+        _catalog_listen = asyncio.create_task(catalog_cache.listen())
+    if settings.CATALOG_REFRESH_POLL_SECONDS > 0:
+        _catalog_refresh = asyncio.create_task(catalog_refresh.watch(settings.CATALOG_REFRESH_POLL_SECONDS))
+    try:
+        await curriculum_registry.load()
+        print(f"✅ curricula: {', '.join(curriculum_registry.display_program_codes())}")
+    except Exception as e:
+        # keep serving; the watcher retries on its next tick
+        print(f"❌ curricula: {e}")
+    if settings.CURRICULUM_REFRESH_SECONDS > 0:
+        _curriculum_watch = asyncio.create_task(curriculum_registry.watch(settings.CURRICULUM_REFRESH_SECONDS))
+
+@app.on_event("shutdown")
+async def _shutdown():
+    if _curriculum_watch is not None:
+        _curriculum_watch.cancel()
+    if _catalog_listen is not None:
+        _catalog_listen.cancel()
+    if _catalog_refresh is not None:
+        _catalog_refresh.cancel()
+    batch_rulecheck.shutdown()
 
 @app.get("/health")
 async def health():
@@ -51,3 +82,4 @@ app.include_router(catalog_router)
 app.include_router(rulecheck_router)
 app.include_router(auth_router)
 app.include_router(planner_state_router)
+app.include_router(analytics_router)
@@ -0,0 +1,33 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from ..db import get_pool
+from ..deps import require_current_user
+from ..services import cohort_analytics
+from ..settings import settings
+
+router = APIRouter(tags=["analytics"])
+
+
+@router.get("/analytics/cohort")
+async def cohort_report(
+        program_code: Optional[str] = Query(None),
+        top: int = Query(10, ge=1, le=100),
+        _user=Depends(require_current_user),
+):
+    """
+    Per-program distributions over all users' saved plans (see cohort_analytics.report).
+    Reads the per-user summaries kept by PUT /planner-state, not the raw planner states.
+    Programs and groups with fewer than COHORT_MIN_USERS users are left out, so small
+    cohorts do not expose individual plans.
+    """
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        try:
+            data = await cohort_analytics.report(conn, program_code, top, settings.COHORT_MIN_USERS)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Cohort query failed: {e}")
+    if program_code and not data["programs"]:
+        raise HTTPException(status_code=404, detail="Not enough saved plans for this program")
+    return data
@@ -1,42 +1,383 @@
-from fastapi import APIRouter, Query, Depends, HTTPException
-from typing import Optional
+from fastapi import APIRouter, Query, Depends, HTTPException, Header, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from typing import Any, Awaitable, Callable, Dict, List, Optional
 from ..db import get_pool
 from ..deps import require_current_user
+from ..services import catalog_cache, catalog_fields, catalog_refresh, catalog_search
+from ..settings import settings
 
 router = APIRouter()
 
-@router.get("/catalog")
-async def list_catalog(
-        program_code: Optional[str] = Query(None),
-        _user=Depends(require_current_user),
-):
+
+# Stored JSON is forwarded as text: ::text bypasses the jsonb codec of db.py (no
+# json.loads of the tree) and the response body is those bytes (no re-serialization).
+# The listing is assembled by json_agg in the same statement. fields= projections run in
+# SQL too (catalog_project*, sql/009_catalog_project.sql); their drop lists are the last
+# parameters, only passed when something is dropped.
+_PROGRAM_SQL = """
+  SELECT {catalog}::text, (SELECT version FROM catalog_version cv WHERE cv.program_id = v.program_id)
+  FROM {view} v
+  WHERE program_code = $1
+"""
+_LISTING_SQL = """
+  WITH page AS (
+    SELECT program_id, program_code, catalog
+    FROM {view}
+    WHERE ($1::text IS NULL OR program_code > $1)
+    ORDER BY program_code
+    LIMIT $2
+  )
+  SELECT
+    COALESCE(
+      json_agg(
+        json_build_object(
+          'program_id',   program_id::text,
+          'program_code', program_code,
+          'catalog',      {catalog}
+        )
+        ORDER BY program_code
+      ),
+      '[]'
+    )::text,
+    max(program_code),
+    EXISTS (SELECT 1 FROM {view} WHERE program_code > (SELECT max(program_code) FROM page))
+  FROM page
+"""
+_SUBJECT_SQL = """
+  SELECT {subject}::text
+  FROM {view} v, jsonb_array_elements(v.catalog) WITH ORDINALITY s
+  WHERE v.program_code = $1 AND s.value->>'exam_subject_code' = $2
+  ORDER BY s.ordinality
+  LIMIT 1
+"""
+_MODULE_SQL = """
+  SELECT {module}::text
+  FROM {view} v,
+       jsonb_array_elements(v.catalog) WITH ORDINALITY s,
+       jsonb_array_elements(s.value->'modules') WITH ORDINALITY m
+  WHERE v.program_code = $1 AND m.value->>'module_id' = $2
+  ORDER BY s.ordinality, m.ordinality
+  LIMIT 1
+"""
+# A course is listed under every module that contains it; the resource is its first
+# occurrence with the per-module is_core_to_module moved into a "modules" list.
+_COURSE_SQL = """
+  WITH hits AS (
+    SELECT c.value AS course, m.value AS module, s.ordinality AS so, m.ordinality AS mo, c.ordinality AS co
+    FROM {view} v,
+         jsonb_array_elements(v.catalog) WITH ORDINALITY s,
+         jsonb_array_elements(s.value->'modules') WITH ORDINALITY m,
+         jsonb_array_elements(m.value->'courses') WITH ORDINALITY c
+    WHERE v.program_code = $1 AND c.value->>'code' = $2
+  ),
+  modules AS (
+    SELECT DISTINCT ON (module->>'module_id')
+      jsonb_build_object(
+        'module_id',         module->'module_id',
+        'name',              module->'name',
+        'exam_subject_code', module->'module_exam_subject_code',
+        'is_core_to_module', course->'is_core_to_module'
+      ) AS entry, so, mo
+    FROM hits
+    ORDER BY module->>'module_id', so, mo
+  )
+  SELECT ((
+    ((SELECT course FROM hits ORDER BY so, mo, co LIMIT 1) - 'is_core_to_module')
+    || jsonb_build_object('modules', (SELECT jsonb_agg(entry ORDER BY so, mo) FROM modules))
+  ) - $3::text[])::text
+"""
+
+
+# Delta sync (since=), from catalog_node/catalog_version (sql/010_catalog_versions.sql).
+# Versions describe the materialized view, so full snapshots come from it as well; both
+# queries of a request run in one repeatable-read transaction.
+_VERSION_SQL = """
+  SELECT cv.version, cv.min_version,
+    (SELECT count(*) FROM catalog_node n WHERE n.program_id = cv.program_id AND n.version > $2) AS changed,
+    (SELECT count(*) FROM catalog_node n WHERE n.program_id = cv.program_id AND n.node IS NOT NULL) AS nodes
+  FROM catalog_version cv
+  JOIN study_program sp ON sp.id = cv.program_id
+  WHERE sp.code = $1
+"""
+_SNAPSHOT_SQL = """
+  SELECT json_build_object(
+    'program_code', $1::text, 'version', $2::bigint, 'since', $3::bigint, 'full', true,
+    'catalog', COALESCE((SELECT catalog FROM public.v_catalog_json_mat WHERE program_code = $1), '[]'::jsonb)
+  )::text
+"""
+_DELTA_SQL = """
+  SELECT json_build_object(
+    'program_code', $1::text, 'version', $2::bigint, 'since', $3::bigint, 'full', false,
+    {kinds}
+  )::text
+  FROM catalog_node n
+  JOIN study_program sp ON sp.id = n.program_id
+  WHERE sp.code = $1 AND n.version > $3
+""".format(kinds=",\n    ".join(
+    f"""'{name}', json_build_object(
+      'upsert', COALESCE(json_agg(n.node ORDER BY n.key) FILTER (WHERE n.kind = '{kind}' AND n.node IS NOT NULL), '[]'),
+      'remove', COALESCE(json_agg(n.ref ORDER BY n.key) FILTER (WHERE n.kind = '{kind}' AND n.node IS NULL), '[]'))"""
+    for name, kind in (("subjects", "subject"), ("modules", "module"), ("courses", "course"))
+))
+
+# A delta touching more than this share of the program's nodes is sent as a full snapshot.
+MAX_DELTA_SHARE = 0.5
+
+
+def _view() -> str:
+    return "public.v_catalog_json_mat" if settings.USE_CATALOG_MAT else "public.v_catalog_json"
+
+
+def _drops(fields: Optional[str], root: str, keys: Optional[Dict[str, Any]] = None) -> Dict[str, List[str]]:
+    try:
+        return catalog_fields.parse(fields, root, keys)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+async def _fetchrow(sql: str, *args: Any):
     pool = await get_pool()
-    view = "public.v_catalog_json_mat"
+    async with pool.acquire() as conn:
+        try:
+            return await conn.fetchrow(sql, *args)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Catalog query failed: {e}")
+
+
+async def _respond(
+        key: str,
+        build: Callable[[], Awaitable[catalog_cache.Entry]],
+        if_none_match: Optional[str],
+) -> Response:
+    if not settings.CATALOG_CACHE:
+        entry = await build()
+        return Response(content=entry.body, media_type="application/json", headers=dict(entry.headers))
+
+    # hit: no DB round trip, no JSON work - the bytes are kept from the first miss
+    entry = await catalog_cache.get_or_fill(key, build)
+    # private: behind auth; no-cache: clients revalidate, which is a 304 while unchanged
+    headers = {**dict(entry.headers), "ETag": entry.etag, "Cache-Control": "private, no-cache"}
+    if catalog_cache.etag_matches(if_none_match, entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
 
-    sql = f"""
-      SELECT program_id, program_code, catalog
-      FROM {view}
-      WHERE ($1::text IS NULL OR program_code = $1)
-      ORDER BY program_code
-    """
 
+async def _query_program(program_code: str, drop: Dict[str, List[str]]) -> catalog_cache.Entry:
+    catalog, args = "catalog", [program_code]
+    if any(drop.values()):
+        catalog = "catalog_project(catalog, $2, $3, $4)"
+        args += [drop["subject"], drop["module"], drop["course"]]
+    row = await _fetchrow(_PROGRAM_SQL.format(catalog=catalog, view=_view()), *args)
+    if row is None:
+        raise HTTPException(status_code=404, detail="Program not found in catalog view")
+    headers = {} if row[1] is None else {"Catalog-Version": str(row[1])}
+    return catalog_cache.make_entry((row[0] or "[]").encode("utf-8"), headers)
+
+
+async def _query_delta(program_code: str, since: int) -> catalog_cache.Entry:
+    pool = await get_pool()
     async with pool.acquire() as conn:
         try:
-            rows = await conn.fetch(sql, program_code)
+            async with conn.transaction(isolation="repeatable_read", readonly=True):
+                row = await conn.fetchrow(_VERSION_SQL, program_code, since)
+                if row is None:
+                    raise HTTPException(status_code=404, detail="Program has no recorded catalog version")
+                version = row["version"]
+                full = (
+                    since < row["min_version"]
+                    or since > version
+                    or row["changed"] > MAX_DELTA_SHARE * max(row["nodes"], 1)
+                )
+                body = await conn.fetchval(_SNAPSHOT_SQL if full else _DELTA_SQL, program_code, version, since)
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Catalog query failed: {e}")
+    return catalog_cache.make_entry(body.encode("utf-8"), {"Catalog-Version": str(version)})
+
+
+async def _query_listing(
+        request: Request, drop: Dict[str, List[str]], after: Optional[str], limit: Optional[int]
+) -> catalog_cache.Entry:
+    catalog, args = "COALESCE(catalog, '[]'::jsonb)", [after, limit]
+    if any(drop.values()):
+        catalog = f"catalog_project({catalog}, $3, $4, $5)"
+        args += [drop["subject"], drop["module"], drop["course"]]
+    body, last, more = await _fetchrow(_LISTING_SQL.format(catalog=catalog, view=_view()), *args)
+    headers = {}
+    if limit is not None and more:
+        # relative, since the entry is shared by requests to every host name
+        nxt = request.url.include_query_params(after=last)
+        headers["Link"] = f'<{nxt.path}?{nxt.query}>; rel="next"'
+    return catalog_cache.make_entry(body.encode("utf-8"), headers)
+
+
+@router.get("/catalog")
+async def list_catalog(
+        request: Request,
+        program_code: Optional[str] = Query(None),
+        fields: Optional[str] = Query(None, description='e.g. "exam_subject,modules.name,modules.courses.code"'),
+        limit: Optional[int] = Query(None, ge=1, le=100, description="programs per page (listing only)"),
+        after: Optional[str] = Query(None, description="last program_code of the previous page"),
+        since: Optional[int] = Query(None, ge=0, description="catalog version the client holds (Catalog-Version)"),
+        if_none_match: Optional[str] = Header(None),
+        _user=Depends(require_current_user),
+):
+    """
+    One program's catalog tree, or every program's. fields= keeps only the named keys
+    (dotted paths reach into modules and courses). The listing is paged with limit/after;
+    a Link header (rel="next") points to the following page. Single-program responses carry
+    the program's catalog version in a Catalog-Version header (that of the materialized
+    view, which may trail the live view by one refresh).
 
+    With since=<version>, the response is what changed after that version: per subjects,
+    modules and courses an "upsert" list (nodes without their children, with their parent
+    ids) and a "remove" list (ids). When the client is too far behind, it is a full
+    snapshot instead ("full": true, "catalog": [...]).
+    """
+    if since is not None:
+        if not program_code:
+            raise HTTPException(status_code=422, detail="since requires program_code")
+        if fields or limit or after:
+            raise HTTPException(status_code=422, detail="since cannot be combined with fields, limit or after")
+        return await _respond(f"delta|{program_code}|{since}", lambda: _query_delta(program_code, since), if_none_match)
+
+    drop = _drops(fields, "subject")
+    fields_key = catalog_fields.cache_key(fields)
     if program_code:
-        if not rows:
+        return await _respond(
+            f"catalog|{program_code}|{fields_key}",
+            lambda: _query_program(program_code, drop),
+            if_none_match,
+        )
+    return await _respond(
+        f"catalog|*|{fields_key}|{after or ''}|{limit or ''}",
+        lambda: _query_listing(request, drop, after, limit),
+        if_none_match,
+    )
+
+
+@router.get("/catalog/subjects/{subject_code}")
+async def get_catalog_subject(
+        subject_code: str,
+        program_code: str = Query(...),
+        fields: Optional[str] = Query(None, description='e.g. "exam_subject,modules.name"'),
+        if_none_match: Optional[str] = Header(None),
+        _user=Depends(require_current_user),
+):
+    """One exam subject of a program (by exam_subject_code) with its modules and courses."""
+    drop = _drops(fields, "subject")
+
+    async def build() -> catalog_cache.Entry:
+        subject, args = "s.value", [program_code, subject_code]
+        if any(drop.values()):
+            subject = "(catalog_project(jsonb_build_array(s.value), $3, $4, $5)->0)"
+            args += [drop["subject"], drop["module"], drop["course"]]
+        row = await _fetchrow(_SUBJECT_SQL.format(subject=subject, view=_view()), *args)
+        if row is None:
+            raise HTTPException(status_code=404, detail="Exam subject not found in catalog view")
+        return catalog_cache.make_entry(row[0].encode("utf-8"))
+
+    return await _respond(
+        f"subject|{program_code}|{subject_code}|{catalog_fields.cache_key(fields)}", build, if_none_match
+    )
+
+
+@router.get("/catalog/modules/{module_id}")
+async def get_catalog_module(
+        module_id: str,
+        program_code: str = Query(...),
+        fields: Optional[str] = Query(None, description='e.g. "name,ects,courses.code"'),
+        if_none_match: Optional[str] = Header(None),
+        _user=Depends(require_current_user),
+):
+    """
+    One module of a program (by module_id) with its courses, as listed under the first
+    exam subject it is grouped in.
+    """
+    drop = _drops(fields, "module")
+
+    async def build() -> catalog_cache.Entry:
+        module, args = "m.value", [program_code, module_id]
+        if any(drop.values()):
+            module = "(catalog_project_modules(jsonb_build_array(m.value), $3, $4)->0)"
+            args += [drop["module"], drop["course"]]
+        row = await _fetchrow(_MODULE_SQL.format(module=module, view=_view()), *args)
+        if row is None:
+            raise HTTPException(status_code=404, detail="Module not found in catalog view")
+        return catalog_cache.make_entry(row[0].encode("utf-8"))
+
+    return await _respond(
+        f"module|{program_code}|{module_id}|{catalog_fields.cache_key(fields)}", build, if_none_match
+    )
+
+
+@router.get("/catalog/courses/{course_code:path}")
+async def get_catalog_course(
+        course_code: str,
+        program_code: str = Query(...),
+        fields: Optional[str] = Query(None, description='e.g. "code,title,modules"'),
+        if_none_match: Optional[str] = Header(None),
+        _user=Depends(require_current_user),
+):
+    """
+    One course of a program (by code). "modules" lists every module containing it, with
+    the module's exam subject and is_core_to_module.
+    """
+    drop = _drops(fields, "course", {"course": catalog_fields.COURSE_RESOURCE_KEYS})
+
+    async def build() -> catalog_cache.Entry:
+        row = await _fetchrow(_COURSE_SQL.format(view=_view()), program_code, course_code, drop["course"])
+        if row is None or row[0] is None:
+            raise HTTPException(status_code=404, detail="Course not found in catalog view")
+        return catalog_cache.make_entry(row[0].encode("utf-8"))
+
+    return await _respond(
+        f"course|{program_code}|{course_code}|{catalog_fields.cache_key(fields)}", build, if_none_match
+    )
+
+
+async def _search_index(program_code: str) -> catalog_search.CatalogIndex:
+    """The program's search index; built once per catalog version (dropped with the cache)."""
+
+    async def build() -> catalog_search.CatalogIndex:
+        # decoded by the jsonb codec: the index needs the tree, not the text
+        row = await _fetchrow(f"SELECT catalog FROM {_view()} WHERE program_code = $1", program_code)
+        if row is None:
             raise HTTPException(status_code=404, detail="Program not found in catalog view")
-        # rows[0]["catalog"] is already a Python list (thanks to codecs)
-        return rows[0]["catalog"] or []
-
-    return [
-        {
-            "program_id": str(r["program_id"]),
-            "program_code": r["program_code"],
-            "catalog": r["catalog"] or [],  # already list
-        }
-        for r in rows
-    ]
+        return await run_in_threadpool(catalog_search.CatalogIndex, program_code, row["catalog"] or [])
+
+    if not settings.CATALOG_CACHE:
+        return await build()
+    # derived: kept per program until the next change, whatever responses are cached
+    return await catalog_cache.get_or_fill(f"search|{program_code}", build, derived=True)
+
+
+@router.get("/catalog/search")
+async def search_catalog(
+        program_code: str = Query(...),
+        q: str = Query("", description="matched against course code and title, typo-tolerant"),
+        exam_subject: Optional[List[str]] = Query(None),
+        category: Optional[List[str]] = Query(None),
+        type: Optional[List[str]] = Query(None),
+        language: Optional[List[str]] = Query(None),
+        ects: Optional[List[str]] = Query(None),
+        ects_min: Optional[float] = Query(None),
+        ects_max: Optional[float] = Query(None),
+        limit: int = Query(20, ge=1, le=200),
+        _user=Depends(require_current_user),
+):
+    """
+    Ranked course hits and facet counts (exam subject, module category, course type,
+    language, ECTS) in one call, from an in-memory index of the program's catalog.
+    Repeated facet parameters are alternatives; different facets must all match.
+    """
+    index = await _search_index(program_code)
+    filters = {"exam_subject": exam_subject, "category": category, "type": type, "language": language, "ects": ects}
+    return index.search(q, filters, ects_min, ects_max, limit)
+
+
+@router.get("/catalog/metrics")
+async def catalog_metrics(_user=Depends(require_current_user)):
+    """Refresh duration and staleness of the materialized catalog (services/catalog_refresh)."""
+    return await catalog_refresh.metrics()
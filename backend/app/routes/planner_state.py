@@ -1,10 +1,12 @@
 from typing import Any
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Response
 from pydantic import BaseModel, Field
 
 from ..db import get_pool
 from ..deps import require_current_user
+from ..services import cohort_analytics
+from ..settings import settings
 
 router = APIRouter(tags=["planner-state"])
 
@@ -17,25 +19,34 @@ class PlannerStatePayload(BaseModel):
 async def get_planner_state(user=Depends(require_current_user)):
     pool = await get_pool()
     async with pool.acquire() as conn:
-        row = await conn.fetchrow(
-            "SELECT state FROM planner_state WHERE user_id = $1",
+        # the stored jsonb as text, forwarded without decoding (JSON null reads as {})
+        state = await conn.fetchval(
+            "SELECT COALESCE(NULLIF(state, 'null'::jsonb), '{}'::jsonb)::text FROM planner_state WHERE user_id = $1",
             user["sub"],
         )
-    return {"state": (row["state"] if row else {}) or {}}
+    body = b'{"state":' + (state or "{}").encode("utf-8") + b"}"
+    return Response(content=body, media_type="application/json")
 
 
 @router.put("/planner-state")
 async def put_planner_state(payload: PlannerStatePayload, user=Depends(require_current_user)):
     pool = await get_pool()
     async with pool.acquire() as conn:
-        await conn.execute(
+        updated_at = await conn.fetchval(
             """
             INSERT INTO planner_state (user_id, state, updated_at)
             VALUES ($1, $2::jsonb, now())
             ON CONFLICT (user_id)
             DO UPDATE SET state = EXCLUDED.state, updated_at = now()
+            RETURNING updated_at
             """,
             user["sub"],
             payload.state or {},
         )
+        if settings.COHORT_SUMMARY_ON_SAVE:
+            try:
+                await cohort_analytics.refresh_user(conn, user["sub"], payload.state, updated_at)
+            except Exception as e:
+                # the state is saved; the summary catches up on the next save or rebuild
+                print(f"❌ cohort summary for {user['sub']}: {e}")
     return {"ok": True}
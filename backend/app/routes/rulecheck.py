@@ -1,15 +1,43 @@
-from typing import Any
+import json
+from contextlib import nullcontext
+from typing import Any, Callable
 from dataclasses import asdict, is_dataclass
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 
 from ..deps import require_current_user
-from ..services.rule_checker_master import RuleChecker as MasterRuleChecker
-from ..services.rule_checker_bachelor import RuleChecker as BachelorRuleChecker
+from ..services import (
+    admission,
+    batch_rulecheck,
+    curriculum_registry,
+    incremental_rulecheck,
+    phase_timing,
+    plan_completion,
+    plan_schedule,
+    result_cache,
+    result_delta,
+    rulecheck_executor,
+)
+from ..settings import settings
 
 router = APIRouter()
 
+_result_cache = result_cache.ResultCache(settings.RULECHECK_CACHE_SIZE, settings.RULECHECK_CACHE_TTL_SECONDS)
+_delta_bases = result_delta.BaseStore(settings.RULECHECK_DELTA_BASES)
+_executor = rulecheck_executor.RuleCheckExecutor(
+    settings.RULECHECK_EXECUTOR,
+    settings.RULECHECK_EXECUTOR_WORKERS,
+    settings.RULECHECK_MAX_IN_FLIGHT,
+    settings.RULECHECK_MAX_QUEUED,
+)
+
+
+@router.on_event("shutdown")
+async def _shutdown_executor():
+    _executor.shutdown()
+
 
 class RuleCheckPayload(BaseModel):
     programCode: str | None = None
@@ -17,35 +45,114 @@ class RuleCheckPayload(BaseModel):
     doneCourses: list[dict[str, Any]] = Field(default_factory=list)
     change: dict[str, Any] = Field(default_factory=dict)
     selectedFocus: str | None = None
+    baseResultId: str | None = None  # resultId of the last response the client holds
+    includeTimings: bool = False  # add stats.timings (phase -> ms) when RULECHECK_TIMING is on
+
+
+# Request options that do not change the evaluation (kept out of the cache key)
+_RESPONSE_OPTIONS = {"baseResultId", "includeTimings"}
+
 
+class RuleCheckBatchPayload(BaseModel):
+    plans: list[RuleCheckPayload] = Field(default_factory=list)
 
-def _normalize_program_code(value: str | None) -> str:
-    return (value or "").strip().replace(" ", "")
+
+class RuleCheckCompletePayload(RuleCheckPayload):
+    objective: str = "ects"  # "ects" (fewest ECTS) or "count" (fewest modules)
+    budgetMs: int | None = None
+
+
+class RuleCheckAdmissiblePayload(RuleCheckPayload):
+    laneIndex: int = 0  # target lane of the drop
+    status: str = "planned"  # "planned" or "done"
+    candidates: list[dict[str, Any]] | None = None  # default: every catalog course of the program
+
+
+class PlanSchedulePayload(BaseModel):
+    programCode: str | None = None
+    modules: list[str] = Field(default_factory=list)  # catalog module names, one plan item each
+    plannedCourses: list[dict[str, Any]] = Field(default_factory=list)  # further items; laneIndex is ignored
+    doneCourses: list[dict[str, Any]] = Field(default_factory=list)  # stay in their lanes
+    selectedFocus: str | None = None
+    startLane: int | None = None  # first lane for new items; default: after the last done lane
+    maxSemesters: int | None = None  # default: the program's limit (bachelor 10, master 8)
+    budgetMs: int | None = None
 
 
 def _select_checker(program_code: str | None):
-    normalized = _normalize_program_code(program_code)
-    if normalized == "066937":
-        return MasterRuleChecker()
-    if normalized == "033521":
-        return BachelorRuleChecker()
+    normalized = curriculum_registry.normalize_program_code(program_code)
     if not normalized:
         # keep backward compatibility if program code is missing
-        return MasterRuleChecker()
+        normalized = curriculum_registry.MASTER_PROGRAM_CODE
+    checker = curriculum_registry.get_checker(normalized)
+    if checker is not None:
+        return checker
+    expected = " or ".join(f"'{code}'" for code in curriculum_registry.display_program_codes())
     raise HTTPException(
         status_code=400,
-        detail=f"Unsupported programCode '{program_code}'. Expected '066 937' (master) or '033 521' (bachelor).",
+        detail=f"Unsupported programCode '{program_code}'. Expected {expected or 'a program from the catalog'}.",
     )
 
 
 @router.post("/rulecheck")
-async def rulecheck(payload: RuleCheckPayload, _user=Depends(require_current_user)):
+async def rulecheck(payload: RuleCheckPayload, response: Response, user=Depends(require_current_user)):
     checker = _select_checker(payload.programCode)
+
+    def compute(data: dict[str, Any]):
+        if _executor.remote:
+            # sessions would be spread over the workers, so no incremental evaluation here
+            return _executor.evaluate_remote(checker, data)
+        if settings.RULECHECK_INCREMENTAL:
+            session_key = (user["sub"], curriculum_registry.normalize_program_code(payload.programCode))
+            return incremental_rulecheck.evaluate(checker, session_key, data)
+        return checker.evaluate(data)
+
+    def respond(data: dict[str, Any]) -> dict[str, Any]:
+        # everything CPU-bound, so it all runs on the executor (RULECHECK_EXECUTOR)
+        if settings.RULECHECK_CACHE_SIZE > 0:
+            result = result_cache.evaluate(_result_cache, checker, data, compute)
+        else:
+            result = compute(data)
+
+        body = _result_body(result)
+        timer = phase_timing.active()
+        if timer is not None and payload.includeTimings:
+            body = {**body, "stats": {**(body.get("stats") or {}), "timings": timer.milliseconds()}}
+        if settings.RULECHECK_DELTA_BASES > 0:
+            # {"delta": true, "patch": [...], ...} against baseResultId when still held
+            body = _delta_bases.respond(user["sub"], body, payload.baseResultId)
+        return body
+
+    data = payload.model_dump(exclude=_RESPONSE_OPTIONS)
+    with phase_timing.recording() if settings.RULECHECK_TIMING else nullcontext() as timer:
+        try:
+            body = await _run_bounded(respond, data)
+        except HTTPException:
+            raise
+        except Exception as exc:
+            raise HTTPException(status_code=500, detail=f"Rulecheck evaluation failed: {exc}") from exc
+
+    if timer is not None:
+        timer.lap("respond")
+        phase_timing.histograms.observe(checker.curriculum.engine, timer)
+        response.headers["Server-Timing"] = phase_timing.server_timing(timer)
+    return body
+
+
+async def _run_bounded(fn: Callable[..., Any], *args: Any) -> Any:
+    """
+    fn(*args) on the bounded rulecheck executor (RULECHECK_MAX_IN_FLIGHT/_MAX_QUEUED),
+    so CPU-heavy endpoints share its slots and metrics; 503 when its queue is full.
+    """
     try:
-        result = checker.evaluate(payload.model_dump())
-    except Exception as exc:
-        raise HTTPException(status_code=500, detail=f"Rulecheck evaluation failed: {exc}") from exc
+        return await _executor.run(fn, *args)
+    except rulecheck_executor.Overloaded as exc:
+        raise HTTPException(
+            status_code=503, detail=f"Rulecheck is overloaded ({exc}); retry shortly.", headers={"Retry-After": "1"}
+        ) from exc
+
 
+def _result_body(result: Any) -> dict[str, Any]:
     if is_dataclass(result):
         return asdict(result)
     if isinstance(result, dict):
@@ -56,3 +163,167 @@ async def rulecheck(payload: RuleCheckPayload, _user=Depends(require_current_use
         return result.dict()
 
     return {"ok": True, "message": str(result)}
+
+
+@router.get("/rulecheck/metrics")
+async def rulecheck_metrics(user=Depends(require_current_user)):
+    """
+    Per-process counters of the /rulecheck pipeline, plus per-phase latency histograms
+    (per engine) when RULECHECK_TIMING is on.
+    """
+    return {
+        "timing": bool(settings.RULECHECK_TIMING),
+        "phases": phase_timing.histograms.snapshot(),
+        "bucketsMs": list(phase_timing.BUCKETS_MS),
+        "cache": _result_cache.stats(),
+        "deltas": _delta_bases.stats(),
+        "incremental": incremental_rulecheck.stats(),
+        "executor": _executor.stats(),
+    }
+
+
+@router.post("/rulecheck/batch")
+async def rulecheck_batch(payload: RuleCheckBatchPayload, user=Depends(require_current_user)):
+    """
+    Evaluate many plans in the worker pool. Streams NDJSON: one result per plan in input
+    order (each tagged with "index"), then a final {"stats": {...}} line with plans/s.
+    A batch holds one slot of the rulecheck executor while it streams (503 when its
+    queue is full), so batches count against RULECHECK_MAX_IN_FLIGHT like a /rulecheck.
+    """
+    if len(payload.plans) > settings.RULECHECK_BATCH_MAX_PLANS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Too many plans ({len(payload.plans)}); at most {settings.RULECHECK_BATCH_MAX_PLANS} per batch.",
+        )
+
+    plans = [plan.model_dump() for plan in payload.plans]
+    workers = batch_rulecheck.resolve_workers(settings.RULECHECK_BATCH_WORKERS)
+
+    try:
+        await _executor.acquire()
+    except rulecheck_executor.Overloaded as exc:
+        raise HTTPException(
+            status_code=503, detail=f"Rulecheck is overloaded ({exc}); retry shortly.", headers={"Retry-After": "1"}
+        ) from exc
+
+    async def lines():
+        try:
+            yield ""
+            async for row in batch_rulecheck.evaluate_stream(plans, workers):
+                yield json.dumps(row, ensure_ascii=False, separators=(",", ":")) + "\n"
+        finally:
+            _executor.release()
+
+    body = lines()
+    # started here: a started generator is closed (and the slot released) even if the
+    # response never streams, e.g. when the client is gone before the first chunk
+    await body.__anext__()
+    return StreamingResponse(body, media_type="application/x-ndjson")
+
+
+@router.post("/rulecheck/complete")
+async def rulecheck_complete(payload: RuleCheckCompletePayload, user=Depends(require_current_user)):
+    """
+    Cheapest set of catalog modules that completes the plan (see services/plan_completion).
+    The search stops after budgetMs (capped by RULECHECK_COMPLETE_BUDGET_MS); the best
+    completion found so far is returned then, with "optimal": false.
+    """
+    if payload.objective not in plan_completion.OBJECTIVES:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Unsupported objective '{payload.objective}'. Expected {' or '.join(plan_completion.OBJECTIVES)}.",
+        )
+    checker = _select_checker(payload.programCode)
+    if not hasattr(checker, "completion_problem"):
+        raise HTTPException(status_code=400, detail="Plan completion is not available for this program.")
+
+    budget_ms = settings.RULECHECK_COMPLETE_BUDGET_MS
+    if payload.budgetMs is not None:
+        budget_ms = max(1, min(payload.budgetMs, budget_ms))
+    data = payload.model_dump()
+
+    def run() -> tuple[Any, Any]:
+        # building the problem evaluates the plan, so it runs on the executor as well
+        problem, error = checker.completion_problem(data)
+        if problem is None:
+            return None, error
+        return plan_completion.solve(problem, payload.objective, budget_ms), None
+
+    result, error = await _run_bounded(run)
+    if result is None:
+        raise HTTPException(status_code=422, detail=error)
+    return result
+
+
+@router.post("/rulecheck/admissible")
+async def rulecheck_admissible(payload: RuleCheckAdmissiblePayload, user=Depends(require_current_user)):
+    """
+    For every catalog course (or the given candidates): would adding it to laneIndex be
+    accepted, and if not, why (see services/admission). Lets the planner grey out drop
+    targets instead of rolling back rejected drops.
+    """
+    if payload.status not in admission.STATUSES:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Unsupported status '{payload.status}'. Expected {' or '.join(admission.STATUSES)}.",
+        )
+    if payload.laneIndex < 0:
+        raise HTTPException(status_code=422, detail="laneIndex must be a non-negative integer.")
+    checker = _select_checker(payload.programCode)
+    # messages are about the candidate drop, not worded for the last change of the plan
+    plan = payload.model_dump(exclude={"laneIndex", "status", "candidates", "change", *_RESPONSE_OPTIONS})
+    return await _run_bounded(
+        admission.admissible_courses, checker, plan, payload.laneIndex, payload.status, payload.candidates
+    )
+
+
+@router.post("/plan/schedule")
+async def plan_schedule_route(payload: PlanSchedulePayload, user=Depends(require_current_user)):
+    """
+    Distribute modules and courses over semesters (see services/plan_schedule), around
+    the done courses. The local search stops after budgetMs (capped by
+    PLAN_SCHEDULE_BUDGET_MS). The schedule is then checked like a /rulecheck payload;
+    "check" carries that result (still-missing requirements do not make it fail).
+    """
+    checker = _select_checker(payload.programCode)
+    if not hasattr(checker, "schedule_problem"):
+        raise HTTPException(status_code=400, detail="Scheduling is not available for this program.")
+
+    planned = list(payload.plannedCourses)
+    unknown = []
+    for name in payload.modules:
+        course = checker.module_course(name)
+        if course is None:
+            unknown.append(name)
+        else:
+            planned.append(course)
+    if unknown:
+        raise HTTPException(status_code=422, detail=f"Unknown module(s): {', '.join(unknown)}.")
+
+    request = payload.model_dump(exclude={"modules", "budgetMs"})
+    request["plannedCourses"] = planned
+    problem, error = checker.schedule_problem(request)
+    if problem is None:
+        raise HTTPException(status_code=422, detail=error)
+
+    budget_ms = settings.PLAN_SCHEDULE_BUDGET_MS
+    if payload.budgetMs is not None:
+        budget_ms = max(1, min(payload.budgetMs, budget_ms))
+
+    def run() -> dict[str, Any]:
+        schedule = plan_schedule.solve(problem, budget_ms)
+        result = checker.evaluate({
+            "programCode": payload.programCode,
+            "plannedCourses": schedule["plannedCourses"],
+            "doneCourses": payload.doneCourses,
+            "selectedFocus": payload.selectedFocus,
+        })
+        schedule["check"] = {
+            "ok": result.ok,
+            "message": result.message,
+            "warnings": result.stats.get("warnings", []),
+            "missing": result.missing,
+        }
+        return schedule
+
+    return await _run_bounded(run)
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+# Where a candidate is added: appended to the plan's plannedCourses or doneCourses.
+STATUSES = ("planned", "done")
+
+
+def _with_course(payload: Dict[str, Any], course: Dict[str, Any], status: str) -> Dict[str, Any]:
+    list_name = "doneCourses" if status == "done" else "plannedCourses"
+    return {**payload, list_name: [*(payload.get(list_name) or []), course]}
+
+
+def _base_state(checker: Any, payload: Dict[str, Any], lane: int, status: str) -> Tuple[Any, Any, float]:
+    """
+    Evaluate the plan once. Returns its result, its PlanState (None when the plan is not
+    clean enough to share) and the parse order an appended course would take: between
+    the base records around it, so order-dependent messages come out as in evaluate.
+    """
+    probe: Dict[str, Any] = {"laneIndex": lane}
+    items = checker.plan_items(_with_course(payload, probe, status))
+    if items is None:
+        return checker.evaluate(payload), None, 0.0
+
+    records: List[Any] = []
+    order = 0.0
+    for course, item_status, item_lane in items:
+        if course is probe:
+            order = len(records) - 0.5
+            continue
+        rec = checker.parse_item(course, item_status, item_lane)
+        if rec is None:
+            return checker.evaluate(payload), None, 0.0
+        records.append(rec)
+    result, state = checker.evaluate_records(payload, records)
+    return result, state, order
+
+
+def admissible_courses(
+    checker: Any,
+    payload: Dict[str, Any],
+    lane: int,
+    status: str = "planned",
+    candidates: Optional[List[Dict[str, Any]]] = None,
+) -> Dict[str, Any]:
+    """
+    For each candidate course (default: every catalog course of the program), whether the
+    plan in `payload` with the course added to `lane` would be accepted, and evaluate's
+    message if not. "Added" means appended to plannedCourses, or doneCourses for status
+    "done"; every answer equals checker.evaluate on that plan.
+
+    The plan is parsed and aggregated once. Each candidate is added to that shared
+    PlanState, decided by the checker's state_verdict (the rejection checks of
+    evaluate_state without the dashboard) and removed again. Candidates the shared state
+    cannot take (already in the plan, unparsable) and plans it cannot hold are evaluated
+    in full.
+    """
+    if status not in STATUSES:
+        raise ValueError(f"status must be one of {', '.join(STATUSES)}")
+    started = time.perf_counter()
+    if candidates is None:
+        candidates = checker.catalog_courses()
+
+    base, state, order = _base_state(checker, payload, lane, status)
+
+    courses: List[Dict[str, Any]] = []
+    full = 0
+    for candidate in candidates:
+        course = {**candidate, "laneIndex": lane}
+        rec = checker.parse_item(course, status, lane) if state is not None else None
+        verdict: Optional[Tuple[bool, str]] = None
+        if rec is not None and state.can_add(rec):
+            state.set_order(rec, order)
+            state.add(rec)
+            try:
+                verdict = checker.state_verdict(state, payload)
+                if verdict is None:
+                    result = checker.evaluate_state(state, payload)
+                    verdict = (result.ok, result.message)
+            finally:
+                state.remove(rec)
+        else:
+            result = checker.evaluate(_with_course(payload, course, status))
+            verdict = (result.ok, result.message)
+            full += 1
+        courses.append({
+            "code": checker.course_key(candidate) or None,
+            "ok": verdict[0],
+            "message": None if verdict[0] else verdict[1],
+        })
+
+    return {
+        "laneIndex": lane,
+        "status": status,
+        "base": {"ok": base.ok, "message": base.message},
+        "courses": courses,
+        "stats": {
+            "candidates": len(candidates),
+            "shared": len(candidates) - full,
+            "full": full,
+            "elapsedMs": round((time.perf_counter() - started) * 1000, 2),
+        },
+    }
@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, is_dataclass
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Sequence, Tuple
+
+from . import curriculum_registry
+from .curriculum_compiler import Curriculum
+
+# Plans handed to a worker per task; amortizes pickling/IPC over several evaluations.
+CHUNK_SIZE = 16
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+_pool_version = ""
+_lock = threading.Lock()
+
+
+# ----------------------------
+# Worker side
+# ----------------------------
+
+def init_worker(curricula: List[Curriculum]) -> None:
+    # Build each curriculum once per worker process (from the parent's compiled
+    # curricula, so workers need no database) instead of once per task.
+    curriculum_registry.install(curricula)
+
+
+def _result_to_dict(result: Any) -> Dict[str, Any]:
+    if is_dataclass(result):
+        return asdict(result)
+    if isinstance(result, dict):
+        return result
+    return {"ok": True, "message": str(result)}
+
+
+def _evaluate_one(index: int, payload: Dict[str, Any]) -> Dict[str, Any]:
+    program_code = curriculum_registry.normalize_program_code(payload.get("programCode"))
+    checker = curriculum_registry.get_checker(program_code or curriculum_registry.MASTER_PROGRAM_CODE)
+    if checker is None:
+        return {"index": index, "ok": False, "error": f"Unsupported programCode '{payload.get('programCode')}'"}
+    try:
+        row = _result_to_dict(checker.evaluate(payload))
+    except Exception as exc:
+        return {"index": index, "ok": False, "error": f"Rulecheck evaluation failed: {exc}"}
+    return {"index": index, **row}
+
+
+def evaluate_chunk(items: Sequence[Tuple[int, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """Evaluate (index, payload) pairs; a failing plan yields an error row instead of aborting the chunk."""
+    return [_evaluate_one(index, payload) for index, payload in items]
+
+
+# ----------------------------
+# Pool management
+# ----------------------------
+
+def resolve_workers(configured: int) -> int:
+    """0 (or less) means one worker per CPU."""
+    if configured > 0:
+        return configured
+    return os.cpu_count() or 1
+
+
+def get_pool(workers: int) -> Optional[ProcessPoolExecutor]:
+    """
+    Return the shared process pool, started on first use and restarted when the installed
+    curricula change. A single worker needs no pool: the batch is then evaluated on one
+    thread outside the event loop.
+    """
+    global _pool, _pool_workers, _pool_version
+    if workers <= 1:
+        return None
+    version = curriculum_registry.version()
+    with _lock:
+        if _pool is None or _pool_workers != workers or _pool_version != version:
+            if _pool is not None:
+                # running batches keep their futures; the old workers exit once idle
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=init_worker,
+                initargs=(curriculum_registry.snapshot(),),
+            )
+            _pool_workers = workers
+            _pool_version = version
+        return _pool
+
+
+def shutdown() -> None:
+    global _pool, _pool_workers, _pool_version
+    with _lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+        _pool_workers = 0
+        _pool_version = ""
+
+
+# ----------------------------
+# Streaming
+# ----------------------------
+
+async def evaluate_stream(payloads: Sequence[Dict[str, Any]], workers: int) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Yield one row per payload, in input order and tagged with its input index, followed by
+    a final {"stats": ...} row with the batch throughput.
+
+    Chunks are submitted to the pool in order and at most 2 per worker are in flight, so
+    memory stays bounded while all workers are kept busy.
+    """
+    started = time.perf_counter()
+    loop = asyncio.get_running_loop()
+    pool = get_pool(workers)
+    window = 2 * workers if pool is not None else 1
+
+    chunks = (
+        [(i, payloads[i]) for i in range(start, min(start + CHUNK_SIZE, len(payloads)))]
+        for start in range(0, len(payloads), CHUNK_SIZE)
+    )
+    pending: Deque[asyncio.Future] = deque()
+
+    def submit_next() -> None:
+        chunk = next(chunks, None)
+        if chunk is not None:
+            pending.append(loop.run_in_executor(pool, evaluate_chunk, chunk))
+
+    for _ in range(window):
+        submit_next()
+
+    failed = 0
+    try:
+        while pending:
+            rows = await pending.popleft()
+            submit_next()
+            for row in rows:
+                if "error" in row:
+                    failed += 1
+                yield row
+    finally:
+        for future in pending:
+            future.cancel()
+
+    elapsed = time.perf_counter() - started
+    yield {
+        "stats": {
+            "plans": len(payloads),
+            "failed": failed,
+            "workers": workers if pool is not None else 1,
+            "elapsedMs": round(elapsed * 1000, 1),
+            "plansPerSecond": round(len(payloads) / elapsed, 1) if elapsed > 0 else None,
+        }
+    }
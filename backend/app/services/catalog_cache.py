@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+
+import asyncpg
+
+from ..settings import settings
+
+# Sent (pg_notify) whenever v_catalog_json_mat is rebuilt or refreshed; see
+# sql/007_catalog_notify.sql. Every worker listening on it drops its cached responses.
+CHANNEL = "catalog_changed"
+
+# Entries per process. Projections and pages make the keys client-chosen; past this many
+# the oldest entry is dropped.
+MAX_ENTRIES = 1024
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class Entry:
+    body: bytes
+    etag: str  # strong validator, quoted: '"<hex>"'
+    headers: Tuple[Tuple[str, str], ...] = ()  # sent along, e.g. Link of a listing page
+
+
+# Cache key (route and its normalized parameters) -> serialized response. Only successful
+# builds are stored.
+_entries: Dict[str, Any] = {}
+# Objects derived from the catalog, at most one per program (e.g. a search index): kept
+# apart from the responses, so client-chosen response keys cannot evict them.
+_derived: Dict[str, Any] = {}
+_generation = 0  # bumped on every invalidation; fills started before it are not stored
+_listening = False  # only while subscribed can a stored entry be trusted
+# Key -> the fill running for it; misses on the same key await it instead of building too.
+_inflight: Dict[str, asyncio.Future] = {}
+
+
+def make_entry(body: bytes, headers: Optional[Dict[str, str]] = None) -> Entry:
+    return Entry(
+        body,
+        '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"',
+        tuple((headers or {}).items()),
+    )
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match evaluation (weak comparison, as RFC 9110 prescribes for it)."""
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+async def get_or_fill(key: str, build: Callable[[], Awaitable[T]], derived: bool = False) -> T:
+    """
+    The cached value for `key` (a response, see make_entry), or build() it and store it.
+    Concurrent misses on the same key share one fill instead of all querying the view;
+    misses on other keys fill independently. Exceptions of build() propagate (to every
+    waiter) and nothing is stored. `derived` values are kept until the next invalidation
+    instead of counting against MAX_ENTRIES.
+    """
+    while True:
+        entry = (_derived if derived else _entries).get(key)
+        if entry is not None:
+            return entry
+        pending = _inflight.get(key)
+        if pending is None:
+            break
+        try:
+            # shielded: a waiter that goes away must not cancel the fill of the others
+            return await asyncio.shield(pending)
+        except asyncio.CancelledError:
+            if not pending.cancelled():
+                raise  # this waiter was cancelled
+            # the filling request was cancelled; the next one to get here fills instead
+
+    future = asyncio.get_running_loop().create_future()
+    _inflight[key] = future
+    generation = _generation
+    try:
+        entry = await build()
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except BaseException as e:
+        future.set_exception(e)
+        future.exception()  # retrieved here, so an unawaited failure is not logged again
+        raise
+    finally:
+        if _inflight.get(key) is future:
+            del _inflight[key]
+    # a NOTIFY that arrived while querying may describe a newer view than we read
+    if _listening and generation == _generation:
+        if derived:
+            _derived[key] = entry
+        else:
+            if len(_entries) >= MAX_ENTRIES:
+                del _entries[next(iter(_entries))]
+            _entries[key] = entry
+    future.set_result(entry)
+    return entry
+
+
+def invalidate() -> None:
+    global _entries, _derived, _generation, _inflight
+    _generation += 1
+    _entries = {}
+    _derived = {}
+    # fills already running read the old view: later misses must not join them
+    _inflight = {}
+
+
+def _on_notify(conn: Any, pid: int, channel: str, payload: str) -> None:
+    invalidate()
+
+
+async def listen(retry_seconds: float = 5.0) -> None:
+    """
+    Keep a dedicated connection LISTENing on CHANNEL and invalidate on each notification.
+
+    Not a pool connection: the pool resets connections on release, which would drop the
+    LISTEN. Responses are only stored while subscribed; a lost connection clears the
+    cache, since notifications sent until the reconnect are gone.
+    """
+    global _listening
+    while True:
+        conn: Optional[asyncpg.Connection] = None
+        try:
+            conn = await asyncpg.connect(dsn=settings.DATABASE_URL)
+            closed = asyncio.Event()
+            conn.add_termination_listener(lambda _conn: closed.set())
+            await conn.add_listener(CHANNEL, _on_notify)
+            invalidate()
+            _listening = True
+            await closed.wait()
+            print("❌ catalog listener: connection lost, reconnecting")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"❌ catalog listener: {e}")
+        finally:
+            _listening = False
+            invalidate()
+            if conn is not None and not conn.is_closed():
+                await conn.close()
+        await asyncio.sleep(retry_seconds)
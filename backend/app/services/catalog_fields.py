@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+from typing import Dict, List, Optional, Tuple
+
+# Keys of the catalog tree (sql/004_matview.sql), per level, and the key under which each
+# level holds the next one.
+LEVELS = ("subject", "module", "course")
+KEYS: Dict[str, Tuple[str, ...]] = {
+    "subject": ("exam_subject_id", "exam_subject", "exam_subject_code", "modules"),
+    "module": (
+        "module_id", "name", "ects", "category", "is_mandatory",
+        "module_exam_subject", "module_exam_subject_code", "courses",
+    ),
+    "course": ("course_id", "code", "title", "ects", "type", "language", "is_core_to_module", "tags"),
+}
+CHILD = {"subject": "modules", "module": "courses"}
+
+# GET /catalog/courses/{code}: the course keys, with the per-module is_core_to_module
+# replaced by the list of modules containing the course.
+COURSE_RESOURCE_KEYS = tuple(k for k in KEYS["course"] if k != "is_core_to_module") + ("modules",)
+
+
+def parse(fields: Optional[str], root: str = "subject", keys: Optional[Dict[str, Tuple[str, ...]]] = None) -> Dict[str, List[str]]:
+    """
+    Drop lists for the catalog_project* SQL functions, from a fields= parameter.
+
+    `fields` is a comma-separated list of keys of the returned node (`root` level), with
+    dotted paths into the levels below: "exam_subject,modules.name,modules.courses.code"
+    keeps the subject name, and per module only the name and the course codes. Naming a
+    child list without any path into it ("modules") keeps its nodes whole; a path into it
+    implies the list. Returns {level: keys to drop} for `root` and the levels below it
+    (empty lists keep everything). Raises ValueError for an unknown key.
+    """
+    keys = keys or KEYS
+    levels = LEVELS[LEVELS.index(root):]
+    keep: Dict[str, Optional[set]] = {level: None for level in levels}
+    for raw in (fields or "").split(","):
+        path = [part.strip() for part in raw.split(".")]
+        if not path[0]:
+            continue
+        for depth, key in enumerate(path):
+            if depth >= len(levels):
+                raise ValueError(f"Unknown field {raw.strip()!r}")
+            level = levels[depth]
+            if key not in keys[level]:
+                raise ValueError(
+                    f"Unknown field {raw.strip()!r}; {level} fields are: {', '.join(keys[level])}"
+                )
+            if depth + 1 < len(path) and key != CHILD.get(level):
+                if level not in CHILD:
+                    raise ValueError(f"Unknown field {raw.strip()!r}; {level} fields have no sub-fields")
+                raise ValueError(f"Unknown field {raw.strip()!r}; only {CHILD[level]} has fields below it")
+            keep[level] = (keep[level] or set()) | {key}
+    return {
+        level: [] if keep[level] is None else [k for k in keys[level] if k not in keep[level]]
+        for level in levels
+    }
+
+
+def cache_key(fields: Optional[str]) -> str:
+    """fields= in a canonical spelling, so equivalent projections share a cached response."""
+    return ",".join(sorted({p.replace(" ", "") for p in (fields or "").split(",") if p.strip()}))
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from ..db import get_pool
+from ..settings import settings
+
+# Any constant shared by all workers: only the one holding it drains catalog_dirty.
+_ADVISORY_LOCK = 0x63617461  # "cata"
+
+# Refreshes are due once the newest change is `debounce` seconds old (a burst of edits
+# costs one refresh), or at the latest `max_delay` seconds after the oldest pending one.
+_DUE_SQL = """
+  SELECT
+    max(last_marked_at)  < clock_timestamp() - make_interval(secs => $1)
+    OR min(first_marked_at) < clock_timestamp() - make_interval(secs => $2)
+  FROM catalog_dirty
+"""
+
+_lock = threading.Lock()
+_stats: Dict[str, Any] = {
+    "refreshes": 0,
+    "failures": 0,
+    "programs": 0,  # dirty programs covered by the refreshes
+    "lastRefreshAt": None,  # unix seconds
+    "lastDurationMs": None,
+    "maxDurationMs": None,
+    "lastStalenessMs": None,  # oldest change covered by the last refresh -> its commit
+    "maxStalenessMs": None,
+    "lastError": None,
+}
+
+
+def _record(**values: Any) -> None:
+    with _lock:
+        for name, value in values.items():
+            if name in ("refreshes", "failures", "programs"):
+                _stats[name] += value
+            elif name.startswith("max"):
+                _stats[name] = value if _stats[name] is None else max(_stats[name], value)
+            else:
+                _stats[name] = value
+
+
+async def refresh_due(debounce: float, max_delay: float) -> Optional[int]:
+    """
+    Refresh v_catalog_json_mat if catalog_dirty holds changes that are due; returns the
+    number of programs covered, or None when nothing was done (clean, not due yet, or
+    another worker is refreshing).
+
+    The dirty rows are deleted in the refresh's transaction, before the REFRESH takes its
+    snapshot: a failed refresh leaves them marked, and a change committed meanwhile marks
+    its program again for the next round. The view is kept current with USE_CATALOG_MAT=0
+    too (its notification still drops the cached live responses), so the setting can be
+    flipped without serving an old copy.
+    """
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            if not await conn.fetchval("SELECT pg_try_advisory_xact_lock($1)", _ADVISORY_LOCK):
+                return None
+            if not await conn.fetchval(_DUE_SQL, float(debounce), float(max_delay)):
+                return None
+            oldest = await conn.fetchval(
+                "SELECT extract(epoch FROM min(first_marked_at))::float8 FROM catalog_dirty"
+            )
+            programs = await conn.fetchval(
+                "WITH drained AS (DELETE FROM catalog_dirty RETURNING 1) SELECT count(*) FROM drained"
+            )
+            started = time.perf_counter()
+            try:
+                await conn.execute("SELECT refresh_catalog_json_mat()")
+            except Exception as e:
+                _record(failures=1, lastError=str(e))
+                raise
+    done = time.time()
+    duration_ms = round((time.perf_counter() - started) * 1000, 1)
+    staleness_ms = round((done - oldest) * 1000, 1)
+    _record(
+        refreshes=1, programs=programs, lastRefreshAt=round(done, 3), lastError=None,
+        lastDurationMs=duration_ms, maxDurationMs=duration_ms,
+        lastStalenessMs=staleness_ms, maxStalenessMs=staleness_ms,
+    )
+    return programs
+
+
+async def watch(interval: float) -> None:
+    """Check every `interval` seconds whether a refresh is due (see refresh_due)."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            programs = await refresh_due(
+                settings.CATALOG_REFRESH_DEBOUNCE_SECONDS, settings.CATALOG_REFRESH_MAX_DELAY_SECONDS
+            )
+            if programs is not None:
+                print(f"✅ catalog refreshed ({programs} programs)")
+        except Exception as e:
+            print(f"❌ catalog refresh: {e}")
+
+
+async def metrics() -> Dict[str, Any]:
+    """
+    This process's refresh counters and timings, plus the current staleness: how long the
+    oldest change not yet in the view has been waiting (None when the view is current).
+    """
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        row = await conn.fetchrow(
+            """
+            SELECT count(*) AS pending,
+                   extract(epoch FROM clock_timestamp() - min(first_marked_at))::float8 AS age
+            FROM catalog_dirty
+            """
+        )
+    with _lock:
+        out = dict(_stats)
+    out.update({
+        "source": "materialized" if settings.USE_CATALOG_MAT else "live",
+        "pendingPrograms": row["pending"],
+        "stalenessMs": None if row["age"] is None else round(row["age"] * 1000, 1),
+    })
+    return out
@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import heapq
+import re
+import time
+from collections import Counter, defaultdict
+from itertools import chain
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set
+
+from .text_norm import fold_key
+
+# Facets, in response order: keys of a hit and names of the filter parameters.
+FACETS = ("exam_subject", "category", "type", "language", "ects")
+
+# Share of the query's trigrams a course must contain to match (pg_trgm's
+# word_similarity_threshold is 0.6 as well); tolerates a typo or two in longer words.
+MIN_COVERAGE = 0.6
+
+_TYPE_PREFIX = re.compile(r"^[A-Za-z]{2,4}")
+
+
+def course_type(type_: Any, code: Any) -> Optional[str]:
+    """As GraphFilterEngine.normalizeCourseType: the type, else letters of the code prefix."""
+    raw = str(type_ or "").strip()
+    if raw:
+        return raw.upper()
+    token = _TYPE_PREFIX.match(str(code or "").strip().split("-")[0])
+    return token.group(0).upper() if token else None
+
+
+def trigrams(text: str, prefix: bool = False) -> Set[str]:
+    """
+    Trigrams of the folded words, padded as pg_trgm does ("  w", " wo", ..., "rd "). With
+    `prefix`, the last word gets no end padding, so a partly typed word still matches.
+    """
+    words = fold_key(text).split()
+    out: Set[str] = set()
+    for i, word in enumerate(words):
+        padded = "  " + word + ("" if prefix and i == len(words) - 1 else " ")
+        out.update(padded[j:j + 3] for j in range(len(padded) - 2))
+    return out
+
+
+def _bits(ids: Iterable[int], size: int) -> int:
+    """Bitset of `ids` (< size); built in a buffer, as OR-ing ints copies them every time."""
+    buf = bytearray((size + 7) // 8)
+    for i in ids:
+        buf[i >> 3] |= 1 << (i & 7)
+    return int.from_bytes(buf, "little")
+
+
+def _bit_string(mask: int) -> str:
+    """"1"/"0" per bit, bit 0 first: membership tests and scans without big-int shifts."""
+    return bin(mask)[:1:-1]
+
+
+def _ects_label(value: Any) -> Optional[str]:
+    try:
+        return f"{float(value):g}"
+    except (TypeError, ValueError):
+        return None
+
+
+class CatalogIndex:
+    """
+    Search index over one program's catalog tree (as GET /catalog returns it).
+
+    A document is a course as listed under one module of one exam subject, so facets can
+    count by subject and module category. Text matching uses an inverted index from the
+    trigrams of "code title" to documents; facets are bitsets over documents (bit i =
+    document i), so filtering is an AND of a few integers and each facet count one AND
+    plus a popcount. A query touches only the postings of its own trigrams.
+    """
+
+    __slots__ = ("program_code", "docs", "_sizes", "_postings", "_facets", "_all")
+
+    def __init__(self, program_code: str, catalog: Sequence[Dict[str, Any]]) -> None:
+        self.program_code = program_code
+        self.docs: List[Dict[str, Any]] = []
+        for subject in catalog or []:
+            for module in subject.get("modules") or []:
+                for course in module.get("courses") or []:
+                    self.docs.append({
+                        "code": course.get("code"),
+                        "title": course.get("title"),
+                        "ects": course.get("ects"),
+                        "type": course_type(course.get("type"), course.get("code")),
+                        "language": course.get("language"),
+                        "module_id": module.get("module_id"),
+                        "module": module.get("name"),
+                        "category": module.get("category"),
+                        "exam_subject": subject.get("exam_subject"),
+                        "exam_subject_code": subject.get("exam_subject_code"),
+                    })
+
+        postings: Dict[str, List[int]] = defaultdict(list)
+        facets: Dict[str, Dict[str, List[int]]] = {name: defaultdict(list) for name in FACETS}
+        self._sizes: List[int] = []
+        for i, doc in enumerate(self.docs):
+            grams = trigrams(f"{doc['code'] or ''} {doc['title'] or ''}")
+            self._sizes.append(len(grams))
+            for gram in grams:
+                postings[gram].append(i)
+            for name in FACETS:
+                value = _ects_label(doc["ects"]) if name == "ects" else doc[name]
+                if value is not None:
+                    facets[name][value].append(i)
+        self._postings: Dict[str, tuple] = {g: tuple(ids) for g, ids in postings.items()}
+        self._facets: Dict[str, Dict[str, int]] = {
+            name: {value: _bits(ids, len(self.docs)) for value, ids in values.items()}
+            for name, values in facets.items()
+        }
+        self._all = (1 << len(self.docs)) - 1
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    def _filter(self, name: str, selected: Optional[List[str]], ects_min: Optional[float], ects_max: Optional[float]) -> int:
+        values = self._facets[name]
+        mask = self._all
+        if selected:
+            mask = 0
+            for value in selected:
+                if name == "ects":
+                    value = _ects_label(value)
+                elif name == "type":
+                    value = course_type(value, None)
+                mask |= values.get(value, 0)
+        if name == "ects" and (ects_min is not None or ects_max is not None):
+            lo = float("-inf") if ects_min is None else ects_min
+            hi = float("inf") if ects_max is None else ects_max
+            in_range = 0
+            for value, bits in values.items():
+                if lo <= float(value) <= hi:
+                    in_range |= bits
+            mask &= in_range
+        return mask
+
+    def search(
+        self,
+        query: str = "",
+        filters: Optional[Dict[str, List[str]]] = None,
+        ects_min: Optional[float] = None,
+        ects_max: Optional[float] = None,
+        limit: int = 20,
+    ) -> Dict[str, Any]:
+        """
+        Courses matching `query` (all of them when empty) and the facet filters, best first:
+        by the share of the query's trigrams they contain, then by similarity of the whole
+        text, then in catalog order. Values within a facet are alternatives (OR), facets
+        combine with AND. Facet counts are disjunctive: each facet is counted under every
+        filter except its own, so a client can offer the other values of a selected facet.
+        """
+        started = time.perf_counter()
+        filters = filters or {}
+
+        grams = trigrams(query, prefix=True) if query.strip() else set()
+        scores: Dict[int, tuple] = {}
+        if grams:
+            # one C-level pass over the postings of the query's trigrams
+            shared = Counter(chain.from_iterable(self._postings.get(gram, ()) for gram in grams))
+            size, sizes = len(grams), self._sizes
+            need = MIN_COVERAGE * size
+            scores = {i: (n / size, n / (size + sizes[i] - n)) for i, n in shared.items() if n >= need}
+            matched = _bits(scores, len(self.docs))
+        else:
+            matched = self._all
+
+        masks = {name: self._filter(name, filters.get(name), ects_min, ects_max) for name in FACETS}
+        selected = matched
+        for mask in masks.values():
+            selected &= mask
+
+        facet_counts: Dict[str, Dict[str, int]] = {}
+        for name in FACETS:
+            others = matched
+            for other, mask in masks.items():
+                if other != name:
+                    others &= mask
+            counts = {value: (bits & others).bit_count() for value, bits in self._facets[name].items()}
+            facet_counts[name] = {
+                value: n for value, n in sorted(counts.items(), key=lambda kv: (-kv[1], kv[0])) if n
+            }
+
+        member = _bit_string(selected)
+        if grams:
+            ids = [i for i in scores if i < len(member) and member[i] == "1"]
+            top = heapq.nsmallest(limit, ids, key=lambda i: (-scores[i][0], -scores[i][1], i))
+        else:
+            top = []
+            pos = member.find("1")
+            while pos >= 0 and len(top) < limit:
+                top.append(pos)
+                pos = member.find("1", pos + 1)
+        hits = [{**self.docs[i], "score": round(scores[i][0], 3) if grams else None} for i in top]
+        return {
+            "program_code": self.program_code,
+            "query": query,
+            "total": selected.bit_count(),
+            "hits": hits,
+            "facets": facet_counts,
+            "stats": {
+                "documents": len(self.docs),
+                "elapsedMs": round((time.perf_counter() - started) * 1000, 3),
+            },
+        }
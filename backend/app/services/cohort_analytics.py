@@ -0,0 +1,508 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import re
+import sys
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from . import curriculum_registry, result_cache
+
+# Per-user summaries of the stored planner states (table planner_state_summary, sql/006).
+#
+# A summary is what the rule engine derives from one user's plan for one program. It is
+# refreshed on every PUT /planner-state for the programs whose plan (or curricula) changed,
+# and rebuilt in bulk by the CLI below, which streams planner_state through a server-side
+# cursor. Cohort reports aggregate the summaries in SQL and never touch the raw jsonb.
+
+# Rows fetched per round trip (and summaries written per transaction) when rebuilding.
+CHUNK_SIZE = 500
+
+# Course fields that only place the node in the graph view; they do not change the result.
+_VIEW_FIELDS = ("position", "subjectColor")
+
+# ECTS amounts and counts in missing lines ("need 24.0 more", "aktuell 5."), but not the
+# numbers in course titles ("Einführung in die Programmierung 1 (6.0 ECTS)").
+_AMOUNT = re.compile(r"\d+\.\d+|\d+(?=\s*(?:ECTS|Module|more|weitere|[).,]|$))")
+
+_SUMMARY_COLUMNS = (
+    "user_id", "program_code", "plan_fingerprint", "curricula_version", "state_updated_at",
+    "ok", "error", "total_ects", "ects_per_semester", "steop_complete", "focus",
+    "missing", "heavy_semesters", "overloaded_semesters",
+)
+
+# A newer evaluation never gets overwritten by one of an older state (a rebuild racing a save).
+_UPSERT_SQL = f"""
+    INSERT INTO planner_state_summary ({", ".join(_SUMMARY_COLUMNS)}, updated_at)
+    VALUES ({", ".join(f"${i}" for i in range(1, len(_SUMMARY_COLUMNS) + 1))}, now())
+    ON CONFLICT (user_id, program_code) DO UPDATE SET
+        {", ".join(f"{c} = EXCLUDED.{c}" for c in _SUMMARY_COLUMNS[2:])},
+        updated_at = now()
+    WHERE planner_state_summary.state_updated_at <= EXCLUDED.state_updated_at
+"""
+
+
+def requirement_key(line: str) -> str:
+    """A missing line with its amounts replaced by '#', so equal requirements group together."""
+    return _AMOUNT.sub("#", line)
+
+
+def plans_from_state(state: Any) -> Dict[str, Dict[str, Any]]:
+    """
+    Rulecheck payloads of a stored planner state (as the frontend builds them), by program
+    code without spaces. Programs without a checker or without any course are left out.
+    """
+    if not isinstance(state, dict):
+        return {}
+    by_program = state.get("coursesByProgram")
+    done_by_program = state.get("doneByProgram") or {}
+    focus_by_program = state.get("selectedFocusByProgram") or {}
+    if not isinstance(by_program, dict):
+        return {}
+
+    plans: Dict[str, Dict[str, Any]] = {}
+    for program, by_semester in by_program.items():
+        checker = curriculum_registry.get_checker(program)
+        if checker is None or not isinstance(by_semester, dict):
+            continue
+        done = done_by_program.get(program) if isinstance(done_by_program, dict) else None
+        done_codes = set(done) if isinstance(done, list) else set()
+
+        planned: List[Dict[str, Any]] = []
+        finished: List[Dict[str, Any]] = []
+        semesters = sorted((k for k in by_semester if str(k).isdigit()), key=int)
+        for semester in semesters:
+            courses = by_semester[semester]
+            if not isinstance(courses, list):
+                continue
+            for course in courses:
+                if not isinstance(course, dict) or not course.get("code"):
+                    continue
+                course = {k: v for k, v in course.items() if k not in _VIEW_FIELDS}
+                (finished if course["code"] in done_codes else planned).append(course)
+        if not planned and not finished:
+            continue
+
+        curriculum = checker.curriculum
+        focus = focus_by_program.get(program) if isinstance(focus_by_program, dict) else None
+        plans[curriculum_registry.normalize_program_code(program)] = {
+            "programCode": curriculum.program_code,
+            "plannedCourses": planned,
+            "doneCourses": finished,
+            "selectedFocus": (focus or None) if curriculum.engine == "bachelor" else None,
+        }
+    return plans
+
+
+def _semester_loads(per_semester: Any) -> List[float]:
+    loads: Dict[int, float] = {}
+    for key, ects in (per_semester or {}).items():
+        try:
+            lane = int(key)
+        except (TypeError, ValueError):
+            continue
+        if lane >= 0 and isinstance(ects, (int, float)):
+            loads[lane] = float(ects)
+    return [loads.get(i, 0.0) for i in range(max(loads) + 1)] if loads else []
+
+
+def summarize(checker: Any, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """The summary columns (ok .. overloaded_semesters) of one plan."""
+    try:
+        result = checker.evaluate(payload)
+    except Exception as exc:
+        return {
+            "ok": None, "error": f"{type(exc).__name__}: {exc}", "total_ects": None,
+            "ects_per_semester": [], "steop_complete": None, "focus": None,
+            "missing": [], "heavy_semesters": [], "overloaded_semesters": [],
+        }
+
+    stats = result.stats or {}
+    if checker.curriculum.engine == "bachelor":
+        total = stats.get("totalEcts")
+        loads = _semester_loads(stats.get("ectsPerSemester"))
+        steop = ((stats.get("steop") or {}).get("done") or {}).get("isComplete")
+        focus_stats = stats.get("focus") or {}
+        focus = focus_stats.get("selected") if focus_stats.get("recognized") else None
+    else:
+        total = (stats.get("ects") or {}).get("total")
+        loads = _semester_loads(stats.get("per_semester"))
+        steop = None
+        focus = None
+
+    recommended = checker.RECOMMENDED_ECTS_PER_SEMESTER + 1e-9
+    maximum = checker.MAX_ECTS_PER_SEMESTER + 1e-9
+    return {
+        "ok": bool(result.ok),
+        "error": None,
+        "total_ects": float(total) if isinstance(total, (int, float)) else None,
+        "ects_per_semester": loads,
+        "steop_complete": steop if isinstance(steop, bool) else None,
+        "focus": focus,
+        # a requirement counts once per user, in first-seen order
+        "missing": list(dict.fromkeys(requirement_key(m) for m in result.missing)),
+        "heavy_semesters": [i + 1 for i, ects in enumerate(loads) if recommended < ects <= maximum],
+        "overloaded_semesters": [i + 1 for i, ects in enumerate(loads) if ects > maximum],
+    }
+
+
+# ----------------------------
+# Refreshing summaries
+# ----------------------------
+
+def _summary_rows(
+    user_id: Any,
+    state_updated_at: Any,
+    state: Any,
+    current: Dict[str, Tuple[str, str]],
+) -> Tuple[List[Tuple[Any, ...]], List[str], int]:
+    """
+    (rows to upsert, program codes to delete, unchanged programs) for one user.
+
+    `current` maps the user's summarized programs to (plan_fingerprint, curricula_version);
+    only plans that differ from it are evaluated again.
+    """
+    version = curriculum_registry.version()
+    rows: List[Tuple[Any, ...]] = []
+    unchanged = 0
+    plans = plans_from_state(state)
+    for program, payload in plans.items():
+        fingerprint = result_cache.plan_fingerprint(payload)
+        if current.get(program) == (fingerprint, version):
+            unchanged += 1
+            continue
+        summary = summarize(curriculum_registry.get_checker(program), payload)
+        rows.append((user_id, program, fingerprint, version, state_updated_at,
+                     *(summary[c] for c in _SUMMARY_COLUMNS[5:])))
+    stale = [program for program in current if program not in plans]
+    return rows, stale, unchanged
+
+
+async def _current_summaries(conn: Any, user_ids: Sequence[Any]) -> Dict[str, Dict[str, Tuple[str, str]]]:
+    """user id (as text) -> program code -> (plan_fingerprint, curricula_version)"""
+    rows = await conn.fetch(
+        """
+        SELECT user_id, program_code, plan_fingerprint, curricula_version
+        FROM planner_state_summary WHERE user_id = ANY($1::uuid[])
+        """,
+        list(user_ids),
+    )
+    out: Dict[str, Dict[str, Tuple[str, str]]] = {}
+    for r in rows:
+        out.setdefault(str(r["user_id"]), {})[r["program_code"]] = (r["plan_fingerprint"], r["curricula_version"])
+    return out
+
+
+async def _write(conn: Any, rows: List[Tuple[Any, ...]], deletes: List[Tuple[Any, str, Any]]) -> None:
+    """Upsert summary rows and delete (user_id, program_code, state_updated_at) in one transaction."""
+    async with conn.transaction():
+        if rows:
+            await conn.executemany(_UPSERT_SQL, rows)
+        if deletes:
+            await conn.executemany(
+                "DELETE FROM planner_state_summary WHERE user_id = $1 AND program_code = $2 AND state_updated_at <= $3",
+                deletes,
+            )
+
+
+async def refresh_user(conn: Any, user_id: Any, state: Any, state_updated_at: Any) -> Dict[str, int]:
+    """
+    Bring one user's summaries in line with their just saved state. The rule engine runs in
+    a thread; only programs whose plan or curricula changed are evaluated. Does nothing
+    while no curricula are installed (every program would look removed).
+    """
+    if not curriculum_registry.version():
+        return {"evaluated": 0, "removed": 0, "unchanged": 0}
+    current = (await _current_summaries(conn, [user_id])).get(str(user_id), {})
+    rows, stale, unchanged = await asyncio.to_thread(_summary_rows, user_id, state_updated_at, state, current)
+    await _write(conn, rows, [(user_id, program, state_updated_at) for program in stale])
+    return {"evaluated": len(rows), "removed": len(stale), "unchanged": unchanged}
+
+
+async def rebuild(pool: Any, chunk_size: int = CHUNK_SIZE, progress: Optional[Any] = None) -> Dict[str, Any]:
+    """
+    Re-derive every user's summaries from planner_state.
+
+    The states are read through a server-side cursor, `chunk_size` rows per round trip, and
+    each chunk's summaries are written (on a second connection) before the next chunk is
+    fetched, so memory stays flat however many users there are. Only the plan parts of
+    the state are transferred; plans that are already summarized are skipped.
+    """
+    if not curriculum_registry.version():
+        raise RuntimeError("No curricula installed; load them before rebuilding summaries")
+    started = time.perf_counter()
+    totals = {"users": 0, "evaluated": 0, "removed": 0, "unchanged": 0}
+    async with pool.acquire() as reader, pool.acquire() as writer:
+        async with reader.transaction(readonly=True):
+            cursor = await reader.cursor(
+                """
+                SELECT user_id, updated_at,
+                       jsonb_build_object(
+                           'coursesByProgram', state->'coursesByProgram',
+                           'doneByProgram', state->'doneByProgram',
+                           'selectedFocusByProgram', state->'selectedFocusByProgram'
+                       ) AS plans
+                FROM planner_state
+                ORDER BY user_id
+                """
+            )
+            while True:
+                chunk = await cursor.fetch(chunk_size)
+                if not chunk:
+                    break
+                current = await _current_summaries(writer, [r["user_id"] for r in chunk])
+                rows: List[Tuple[Any, ...]] = []
+                deletes: List[Tuple[Any, str, Any]] = []
+                for r in chunk:
+                    user_rows, stale, unchanged = _summary_rows(
+                        r["user_id"], r["updated_at"], r["plans"], current.get(str(r["user_id"]), {})
+                    )
+                    rows.extend(user_rows)
+                    deletes.extend((r["user_id"], program, r["updated_at"]) for program in stale)
+                    totals["unchanged"] += unchanged
+                await _write(writer, rows, deletes)
+                totals["users"] += len(chunk)
+                totals["evaluated"] += len(rows)
+                totals["removed"] += len(deletes)
+                if progress is not None:
+                    progress(totals)
+
+        # users without a planner_state row any more
+        status = await writer.execute(
+            """
+            DELETE FROM planner_state_summary s
+            WHERE NOT EXISTS (SELECT 1 FROM planner_state p WHERE p.user_id = s.user_id)
+            """
+        )
+        totals["removed"] += int(status.split()[-1])
+    totals["elapsedMs"] = round((time.perf_counter() - started) * 1000, 1)
+    return totals
+
+
+# ----------------------------
+# Cohort report
+# ----------------------------
+
+# Quantiles of the ECTS distributions (percentile_cont)
+QUANTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+
+# Width of the total-ECTS histogram bins
+HISTOGRAM_ECTS = 10
+
+
+def _quantiles(values: Optional[Sequence[float]]) -> Dict[str, Optional[float]]:
+    values = values or [None] * len(QUANTILES)
+    return {f"p{round(q * 100)}": (round(v, 1) if v is not None else None) for q, v in zip(QUANTILES, values)}
+
+
+async def report(conn: Any, program_code: Optional[str] = None, top: int = 10, min_users: int = 1) -> Dict[str, Any]:
+    """
+    Per-program cohort distributions over planner_state_summary. Programs with fewer than
+    `min_users` users are left out, and so is every group below it (histogram bin,
+    semester, focus, missing requirement), so no figure describes a handful of plans:
+
+      users / ok / failed / stale   summarized users, accepted and failing plans, and
+                                    summaries of older curricula (refreshed on the next
+                                    save or rebuild)
+      totalEcts                     mean, quantiles and a histogram in HISTOGRAM_ECTS bins
+      semesters                     per semester with ECTS: users, mean and quantiles, and
+                                    how many are above the recommended (heavy) or maximum
+                                    (overloaded) load
+      steop                         completion rate among users of programs with a StEOP
+      focus                         users per recognized focus
+      missing                       the `top` most common missing requirements
+    """
+    program = curriculum_registry.normalize_program_code(program_code) or None
+    min_users = max(1, min_users)
+    args = (program, curriculum_registry.version(), list(QUANTILES), min_users)
+    where = "($1::text IS NULL OR program_code = $1)"
+
+    overview = await conn.fetch(
+        f"""
+        SELECT program_code,
+               count(*) AS users,
+               count(*) FILTER (WHERE ok) AS ok,
+               count(*) FILTER (WHERE ok IS NULL) AS failed,
+               count(*) FILTER (WHERE curricula_version <> $2) AS stale,
+               avg(total_ects) AS mean_ects,
+               percentile_cont($3::float8[]) WITHIN GROUP (ORDER BY total_ects) AS ects_quantiles,
+               count(steop_complete) AS steop_users,
+               count(*) FILTER (WHERE steop_complete) AS steop_complete,
+               count(*) FILTER (WHERE cardinality(overloaded_semesters) > 0) AS overloaded_users
+        FROM planner_state_summary
+        WHERE {where}
+        GROUP BY program_code
+        HAVING count(*) >= $4
+        ORDER BY program_code
+        """,
+        *args,
+    )
+    histogram = await conn.fetch(
+        f"""
+        SELECT program_code, floor(total_ects / {HISTOGRAM_ECTS})::int * {HISTOGRAM_ECTS} AS bin, count(*) AS users
+        FROM planner_state_summary
+        WHERE {where} AND total_ects IS NOT NULL
+        GROUP BY 1, 2 HAVING count(*) >= $2 ORDER BY 1, 2
+        """,
+        program,
+        min_users,
+    )
+    semesters = await conn.fetch(
+        f"""
+        SELECT program_code, s.semester::int AS semester, count(*) AS users, avg(s.ects) AS mean_ects,
+               percentile_cont($2::float8[]) WITHIN GROUP (ORDER BY s.ects) AS ects_quantiles,
+               count(*) FILTER (WHERE s.semester = ANY(heavy_semesters)) AS heavy,
+               count(*) FILTER (WHERE s.semester = ANY(overloaded_semesters)) AS overloaded
+        FROM planner_state_summary, unnest(ects_per_semester) WITH ORDINALITY AS s(ects, semester)
+        WHERE {where} AND s.ects > 0
+        GROUP BY 1, 2 HAVING count(*) >= $3 ORDER BY 1, 2
+        """,
+        program,
+        list(QUANTILES),
+        min_users,
+    )
+    focus = await conn.fetch(
+        f"""
+        SELECT program_code, focus, count(*) AS users
+        FROM planner_state_summary
+        WHERE {where} AND focus IS NOT NULL
+        GROUP BY 1, 2 HAVING count(*) >= $2 ORDER BY 1, 3 DESC, 2
+        """,
+        program,
+        min_users,
+    )
+    missing = await conn.fetch(
+        f"""
+        SELECT program_code, requirement, users FROM (
+            SELECT program_code, m.requirement, count(*) AS users,
+                   row_number() OVER (PARTITION BY program_code ORDER BY count(*) DESC, m.requirement) AS rank
+            FROM planner_state_summary, unnest(missing) AS m(requirement)
+            WHERE {where}
+            GROUP BY 1, 2
+            HAVING count(*) >= $3
+        ) ranked
+        WHERE rank <= $2
+        ORDER BY program_code, rank
+        """,
+        program,
+        top,
+        min_users,
+    )
+
+    programs: Dict[str, Any] = {}
+    for r in overview:
+        users = r["users"]
+        programs[r["program_code"]] = {
+            "users": users,
+            "ok": r["ok"],
+            "failed": r["failed"],
+            "stale": r["stale"],
+            "totalEcts": {
+                "mean": round(r["mean_ects"], 1) if r["mean_ects"] is not None else None,
+                **_quantiles(r["ects_quantiles"]),
+                "histogram": {},
+            },
+            "semesters": [],
+            "overloadedUsers": r["overloaded_users"],
+            "steop": {
+                "users": r["steop_users"],
+                "complete": r["steop_complete"],
+                "rate": round(r["steop_complete"] / r["steop_users"], 3) if r["steop_users"] else None,
+            },
+            "focus": {},
+            "missing": [],
+        }
+    for r in histogram:
+        if r["program_code"] not in programs:
+            continue  # below min_users
+        programs[r["program_code"]]["totalEcts"]["histogram"][str(r["bin"])] = r["users"]
+    for r in semesters:
+        if r["program_code"] not in programs:
+            continue  # below min_users
+        programs[r["program_code"]]["semesters"].append({
+            "semester": r["semester"],
+            "users": r["users"],
+            "meanEcts": round(r["mean_ects"], 1),
+            **_quantiles(r["ects_quantiles"]),
+            "heavy": r["heavy"],
+            "overloaded": r["overloaded"],
+        })
+    for r in focus:
+        if r["program_code"] not in programs:
+            continue  # below min_users
+        programs[r["program_code"]]["focus"][r["focus"]] = r["users"]
+    for r in missing:
+        if r["program_code"] not in programs:
+            continue  # below min_users
+        p = programs[r["program_code"]]
+        p["missing"].append({
+            "requirement": r["requirement"],
+            "users": r["users"],
+            "share": round(r["users"] / p["users"], 3),
+        })
+    return {"curricula": curriculum_registry.version()[:12], "minUsers": min_users, "programs": programs}
+
+
+# ----------------------------
+# CLI
+# ----------------------------
+
+def _print_report(data: Dict[str, Any]) -> None:
+    for program, p in data["programs"].items():
+        t = p["totalEcts"]
+        print(f"\n{program}: {p['users']} users ({p['ok']} ok, {p['failed']} failed, {p['stale']} stale)")
+        print(f"  total ECTS   mean {t['mean']}  p10 {t['p10']}  p50 {t['p50']}  p90 {t['p90']}")
+        if p["steop"]["users"]:
+            print(f"  StEOP        {p['steop']['complete']}/{p['steop']['users']} complete ({p['steop']['rate']:.1%})")
+        for s in p["semesters"]:
+            print(
+                f"  semester {s['semester']:<3} {s['users']:>7} users  p50 {s['p50']:>5}  p90 {s['p90']:>5}"
+                f"  heavy {s['heavy']:>6}  overloaded {s['overloaded']:>6}"
+            )
+        for name, users in p["focus"].items():
+            print(f"  focus        {users:>7}  {name}")
+        for m in p["missing"]:
+            print(f"  missing      {m['users']:>7}  ({m['share']:.0%}) {m['requirement']}")
+
+
+async def _run(args: argparse.Namespace) -> Dict[str, Any]:
+    from ..db import get_pool
+
+    pool = await get_pool()
+    await curriculum_registry.load(pool)
+    if args.rebuild:
+        def progress(t: Dict[str, Any]) -> None:
+            print(f"   {t['users']} users, {t['evaluated']} evaluated, {t['unchanged']} unchanged", file=sys.stderr, flush=True)
+
+        totals = await rebuild(pool, args.chunk, progress)
+        print(f"✅ summaries rebuilt: {totals}", file=sys.stderr)
+    async with pool.acquire() as conn:
+        data = await report(conn, args.program, args.top, args.min_users)
+    await pool.close()
+    return data
+
+
+def main(argv: List[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m app.services.cohort_analytics",
+        description="Cohort distributions over the stored planner states (needs DATABASE_URL).",
+    )
+    parser.add_argument("--program", help="only this program code (e.g. '033 521')")
+    parser.add_argument("--top", type=int, default=10, help="most common missing requirements per program")
+    parser.add_argument("--min-users", type=int, default=1, help="leave out programs and groups with fewer users")
+    parser.add_argument("--rebuild", action="store_true", help="first re-derive the summaries of all stored states")
+    parser.add_argument("--chunk", type=int, default=CHUNK_SIZE, help="states per cursor fetch when rebuilding")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    data = asyncio.run(_run(args))
+    if args.json:
+        print(json.dumps(data, indent=2, ensure_ascii=False))
+    else:
+        _print_report(data)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from dataclasses import asdict, dataclass, field, replace
+from typing import Any, Dict, List, Optional, Tuple
+
+import asyncpg
+
+# ----------------------------
+# Compiled curriculum
+# ----------------------------
+
+@dataclass(frozen=True)
+class CurriculumModule:
+    name: str
+    ects: float
+    category: str  # catalog module category: mandatory | core | elective
+    exam_subject: str  # name of the module's exam subject ("" if ungrouped)
+    exam_subject_code: str
+    is_mandatory: bool
+    courses: Tuple[Tuple[str, str, float], ...]  # (course code, course title, ECTS)
+
+
+@dataclass(frozen=True)
+class Curriculum:
+    """
+    One study program as the rule engines see it: the catalog tables of the program
+    plus its declarative rules (focus lists, StEOP, prerequisites, limits, ...).
+
+    Plain data only, so it pickles into batch worker processes unchanged.
+    """
+
+    program_code: str  # as stored in the catalog, e.g. "033 521"
+    title: str
+    degree_level: str
+    ects_total: float
+    exam_subjects: Tuple[Tuple[str, str], ...]  # (code, name)
+    modules: Tuple[CurriculumModule, ...]
+    rules: Dict[str, Any] = field(default_factory=dict)
+    # (prerequisite, course/module) names from the catalog's `attributes.prerequisites`
+    prerequisites: Tuple[Tuple[str, str], ...] = ()
+    fingerprint: str = ""
+
+    @property
+    def engine(self) -> str:
+        return str(self.rules.get("engine") or self.degree_level)
+
+
+# ----------------------------
+# Catalog access
+# ----------------------------
+
+CATALOG_QUERIES: Dict[str, str] = {
+    "study_program": """
+      SELECT id, code, title, degree_level, ects_total::float8 AS ects_total, attributes
+      FROM study_program
+      WHERE code IS NOT NULL
+    """,
+    "exam_subject": """
+      SELECT id, program_id, code, name
+      FROM exam_subject
+    """,
+    "module": """
+      SELECT id, program_id, name, ects::float8 AS ects, category::text AS category, attributes
+      FROM module
+    """,
+    "module_grouping": """
+      SELECT exam_subject_id, module_id, is_mandatory
+      FROM module_grouping
+    """,
+    "module_course": """
+      SELECT mc.module_id, c.code, c.title, c.ects::float8 AS ects, c.attributes
+      FROM module_course mc
+      JOIN course c ON c.id = mc.course_id
+    """,
+}
+
+
+async def fetch_catalog(conn: asyncpg.Connection) -> Dict[str, List[Dict[str, Any]]]:
+    """Read the catalog tables the curricula are compiled from, in one snapshot."""
+    tables: Dict[str, List[Dict[str, Any]]] = {}
+    async with conn.transaction(isolation="repeatable_read", readonly=True):
+        for name, sql in CATALOG_QUERIES.items():
+            tables[name] = [dict(r) for r in await conn.fetch(sql)]
+    return tables
+
+
+def load_rules(rules_dir: str, program_code: str, attributes: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Program-specific rules: `<rules_dir>/<code without spaces>.json`, overridden key by key
+    by the `rules` object in study_program.attributes (if any).
+    """
+    rules: Dict[str, Any] = {}
+    path = os.path.join(rules_dir, program_code.replace(" ", "") + ".json")
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            rules.update(json.load(f))
+    overrides = (attributes or {}).get("rules")
+    if isinstance(overrides, dict):
+        rules.update(overrides)
+    return rules
+
+
+def _prerequisite_names(attributes: Any) -> List[str]:
+    """`attributes.prerequisites` of a catalog row: a name or a list of course/module names."""
+    if isinstance(attributes, str):  # connections without the jsonb codec
+        attributes = json.loads(attributes or "{}")
+    value = (attributes or {}).get("prerequisites") if isinstance(attributes, dict) else None
+    if isinstance(value, str):
+        value = [value]
+    return [str(v) for v in value or () if isinstance(v, str) and v.strip()]
+
+
+def _fingerprint(curriculum: Curriculum) -> str:
+    data = asdict(curriculum)
+    data.pop("fingerprint")
+    canonical = json.dumps(data, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+# ----------------------------
+# Compilation
+# ----------------------------
+
+def _module_order(m: CurriculumModule) -> Tuple[Any, ...]:
+    ungrouped = not (m.exam_subject_code or m.exam_subject)
+    return (not m.is_mandatory, ungrouped, m.exam_subject_code, m.exam_subject, m.name, m.ects)
+
+
+def compile_catalog(tables: Dict[str, List[Dict[str, Any]]], rules_dir: str) -> List[Curriculum]:
+    """
+    Group the catalog rows per program into Curriculum objects.
+
+    Everything is sorted, so the same catalog always compiles to the same curriculum (and
+    fingerprint) regardless of row order. Modules are in curriculum order: those the
+    catalog marks mandatory for their exam subject first, then the others; each part by
+    exam subject (code, then name, as GET /catalog lists them) and by name within a
+    subject. The engines list missing and completed modules in this order.
+    """
+    subjects_by_id = {r["id"]: r for r in tables["exam_subject"]}
+
+    groupings: Dict[Any, List[Tuple[Dict[str, Any], bool]]] = {}
+    for r in tables["module_grouping"]:
+        subject = subjects_by_id.get(r["exam_subject_id"])
+        if subject is not None:
+            groupings.setdefault(r["module_id"], []).append((subject, bool(r["is_mandatory"])))
+
+    courses: Dict[Any, set] = {}
+    # module id -> (prerequisite, target) pairs of the module and its courses
+    prerequisites: Dict[Any, set] = {}
+    for r in tables["module_course"]:
+        courses.setdefault(r["module_id"], set()).add((r["code"] or "", r["title"] or "", float(r["ects"] or 0.0)))
+        for name in _prerequisite_names(r.get("attributes")):
+            prerequisites.setdefault(r["module_id"], set()).add((name, r["title"] or r["code"] or ""))
+    for r in tables["module"]:
+        for name in _prerequisite_names(r.get("attributes")):
+            prerequisites.setdefault(r["id"], set()).add((name, r["name"]))
+
+    # The seed scripts re-run on every boot and module has no unique (program, name) key,
+    # so one module may be stored as several rows: merge them by name.
+    rows_by_module: Dict[Tuple[Any, str], List[Dict[str, Any]]] = {}
+    for r in tables["module"]:
+        rows_by_module.setdefault((r["program_id"], r["name"]), []).append(r)
+
+    modules_by_program: Dict[Any, List[CurriculumModule]] = {}
+    prerequisites_by_program: Dict[Any, set] = {}
+    for (program_id, name), rows in rows_by_module.items():
+        for r in rows:
+            prerequisites_by_program.setdefault(program_id, set()).update(prerequisites.get(r["id"], ()))
+        groups = sorted(
+            {(g[0]["id"], g[1]): g for r in rows for g in groupings.get(r["id"], [])}.values(),
+            key=lambda g: (g[0]["code"] or "", g[0]["name"]),
+        )
+        subject = groups[0][0] if groups else None
+        first = min(rows, key=lambda r: (float(r["ects"]), r["category"] or ""))
+        modules_by_program.setdefault(program_id, []).append(
+            CurriculumModule(
+                name=name,
+                ects=float(first["ects"]),
+                category=first["category"] or "elective",
+                exam_subject=subject["name"] if subject else "",
+                exam_subject_code=(subject["code"] or "") if subject else "",
+                is_mandatory=any(mandatory for _, mandatory in groups),
+                courses=tuple(sorted(set().union(*(courses.get(r["id"], ()) for r in rows)))),
+            )
+        )
+
+    subjects_by_program: Dict[Any, List[Tuple[str, str]]] = {}
+    for r in tables["exam_subject"]:
+        subjects_by_program.setdefault(r["program_id"], []).append((r["code"] or "", r["name"]))
+
+    compiled: List[Curriculum] = []
+    for p in sorted(tables["study_program"], key=lambda r: r["code"]):
+        curriculum = Curriculum(
+            program_code=p["code"],
+            title=p["title"],
+            degree_level=p["degree_level"],
+            ects_total=float(p["ects_total"] or 0.0),
+            exam_subjects=tuple(sorted(subjects_by_program.get(p["id"], []))),
+            modules=tuple(sorted(modules_by_program.get(p["id"], []), key=_module_order)),
+            rules=load_rules(rules_dir, p["code"], p["attributes"]),
+            prerequisites=tuple(sorted(prerequisites_by_program.get(p["id"], ()))),
+        )
+        compiled.append(replace(curriculum, fingerprint=_fingerprint(curriculum)))
+    return compiled
@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import threading
+from collections.abc import Mapping
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from ..db import get_pool
+from ..settings import settings
+from . import curriculum_compiler, text_norm
+from .curriculum_compiler import Curriculum
+from .rule_checker_bachelor import RuleChecker as BachelorRuleChecker
+from .rule_checker_master import RuleChecker as MasterRuleChecker
+
+# Program used when a request does not name one (backward compatibility).
+MASTER_PROGRAM_CODE = "066937"
+
+# Curriculum.engine -> rule engine class. Programs only differ in their compiled
+# curriculum; adding one to the catalog needs no code here.
+_ENGINES: Dict[str, Callable[[Curriculum], Any]] = {
+    "master": MasterRuleChecker,
+    "bachelor": BachelorRuleChecker,
+}
+
+# Program code (without spaces) -> compiled curriculum / shared checker. Both dicts are
+# replaced as a whole on reload, so readers never see a half-built registry.
+_curricula: Dict[str, Curriculum] = {}
+_checkers: Dict[str, Any] = {}
+_version = ""
+_lock = threading.Lock()
+
+
+def normalize_program_code(value: Optional[str]) -> str:
+    return (value or "").strip().replace(" ", "")
+
+
+def supported_program_codes() -> list[str]:
+    return sorted(_checkers.keys())
+
+
+def display_program_codes() -> list[str]:
+    """Program codes as stored in the catalog (e.g. "066 937"), for messages."""
+    return sorted(c.program_code for c in _curricula.values())
+
+
+def _freeze(value: Any) -> Any:
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, set):
+        return frozenset(value)
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _freeze_tables(checker: Any) -> Any:
+    """
+    Turn the curriculum tables built in a checker's __init__ into read-only views.
+
+    The same instance is shared by every request and thread, so nothing may mutate it
+    after construction; evaluate() only keeps per-call state in locals.
+    """
+    for name, value in list(vars(checker).items()):
+        if isinstance(value, (dict, set, list)):
+            setattr(checker, name, _freeze(value))
+    return checker
+
+
+def _table_strings(value: Any) -> Iterator[str]:
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, Mapping):
+        for k, v in value.items():
+            yield from _table_strings(k)
+            yield from _table_strings(v)
+    elif isinstance(value, (tuple, frozenset)):
+        for v in value:
+            yield from _table_strings(v)
+
+
+def _build(curriculum: Curriculum) -> Optional[Any]:
+    engine = _ENGINES.get(curriculum.engine)
+    if engine is None:
+        print(f"❌ curriculum {curriculum.program_code}: no rule engine '{curriculum.engine}'")
+        return None
+    try:
+        checker = _freeze_tables(engine(curriculum))
+    except Exception as e:  # e.g. PrerequisiteCycle from catalog attributes
+        print(f"❌ curriculum {curriculum.program_code}: {e}")
+        return None
+    # Pre-intern every curriculum string so evaluate() only ever hits the cache for them.
+    text_norm.prime(_table_strings(vars(checker)))
+    return checker
+
+
+def install(curricula: Iterable[Curriculum]) -> bool:
+    """
+    Build checkers for compiled curricula and swap them in atomically. Checkers of
+    programs whose curriculum did not change are kept (and so are their incremental
+    sessions). A program whose checker cannot be built (e.g. a prerequisite cycle in
+    the catalog) keeps its previous curriculum and checker, or is left out if it had
+    none; the other programs are installed regardless. Returns whether anything changed.
+    """
+    global _curricula, _checkers, _version
+    curricula = list(curricula)
+    version = hashlib.sha256("".join(c.fingerprint for c in curricula).encode()).hexdigest()
+    with _lock:
+        if version == _version:
+            return False
+        new_curricula: Dict[str, Curriculum] = {}
+        new_checkers: Dict[str, Any] = {}
+        for curriculum in curricula:
+            code = normalize_program_code(curriculum.program_code)
+            old = _curricula.get(code)
+            if old is not None and old.fingerprint == curriculum.fingerprint:
+                checker = _checkers.get(code)
+            else:
+                checker = _build(curriculum)
+                if checker is None and old is not None:
+                    curriculum, checker = old, _checkers.get(code)
+            if checker is not None:
+                new_curricula[code] = curriculum
+                new_checkers[code] = checker
+        _curricula, _checkers, _version = new_curricula, new_checkers, version
+    return True
+
+
+async def load(pool: Any = None) -> bool:
+    """Compile the curricula from the catalog tables and install them (see install())."""
+    pool = pool or await get_pool()
+    async with pool.acquire() as conn:
+        tables = await curriculum_compiler.fetch_catalog(conn)
+    return install(curriculum_compiler.compile_catalog(tables, settings.CURRICULA_DIR))
+
+
+async def watch(interval: float) -> None:
+    """Recompile every `interval` seconds; checkers are hot-swapped when the catalog changed."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            if await load():
+                print(f"✅ curricula reloaded ({', '.join(display_program_codes())})")
+        except Exception as e:
+            print(f"❌ curricula reload: {e}")
+
+
+def get_checker(program_code: Optional[str]) -> Optional[Any]:
+    """Return the shared, compiled checker for a program code (spaces are ignored), or None."""
+    return _checkers.get(normalize_program_code(program_code))
+
+
+def snapshot() -> List[Curriculum]:
+    """The installed curricula, e.g. to install() them in a worker process."""
+    return list(_curricula.values())
+
+
+def version() -> str:
+    """Changes whenever a different set of curricula is installed."""
+    return _version
+
+
+def clear() -> None:
+    global _curricula, _checkers, _version
+    with _lock:
+        _curricula, _checkers, _version = {}, {}, ""
@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Set, Tuple
+
+from . import phase_timing
+
+# Sessions kept per process (LRU); one per user and program.
+MAX_SESSIONS = 4096
+
+
+class _Session:
+    """Last evaluated plan of one user/program: its PlanState plus course key -> (signature, record)."""
+
+    __slots__ = ("checker", "state", "entries")
+
+    def __init__(self, checker: Any, state: Any, entries: Dict[str, Tuple[Tuple[Any, ...], Dict[str, Any]]]) -> None:
+        self.checker = checker
+        self.state = state
+        self.entries = entries
+
+
+_sessions: "OrderedDict[Hashable, _Session]" = OrderedDict()
+_lock = threading.Lock()
+_counters: Dict[str, int] = {"incremental": 0, "full": 0, "fallback": 0}
+
+
+def evaluate(checker: Any, session_key: Hashable, payload: Dict[str, Any]) -> Any:
+    """
+    Evaluate `payload`, reusing the session's aggregates when its `change` delta explains
+    every difference to the previously evaluated plan. Falls back to (and re-seeds from)
+    a full evaluation otherwise; both paths share the checker's final evaluation step.
+    """
+    # Popping the session gives this call exclusive ownership while it mutates the state.
+    with _lock:
+        session = _sessions.pop(session_key, None)
+
+    result = None
+    if session is not None and session.checker is checker:
+        result = _evaluate_delta(session, payload)
+        if result is None:
+            session = None
+            _count("fallback")
+        else:
+            _count("incremental")
+
+    if result is None:
+        result, session = _evaluate_full(checker, payload)
+        _count("full")
+
+    if session is not None:
+        with _lock:
+            _sessions[session_key] = session
+            while len(_sessions) > MAX_SESSIONS:
+                _sessions.popitem(last=False)
+    return result
+
+
+def drop_sessions() -> None:
+    with _lock:
+        _sessions.clear()
+
+
+def stats() -> Dict[str, int]:
+    with _lock:
+        return {**_counters, "sessions": len(_sessions)}
+
+
+def _count(name: str) -> None:
+    with _lock:
+        _counters[name] += 1
+
+
+def _evaluate_full(checker: Any, payload: Dict[str, Any]) -> Tuple[Any, Optional[_Session]]:
+    items = checker.plan_items(payload)
+    if items is None:
+        return checker.evaluate(payload), None
+
+    records: List[Dict[str, Any]] = []
+    for course, status, lane in items:
+        rec = checker.parse_item(course, status, lane)
+        if rec is None:
+            return checker.evaluate(payload), None
+        records.append(rec)
+
+    timer = phase_timing.active()
+    if timer is not None:
+        timer.lap("parse")
+    result, state = checker.evaluate_records(payload, records)
+    if state is None:
+        return result, None
+
+    entries = {
+        checker.course_key(course): (checker.course_signature(course, status, lane), rec)
+        for (course, status, lane), rec in zip(items, records)
+    }
+    return result, _Session(checker, state, entries)
+
+
+def _claimed_keys(change: Any) -> Optional[Set[str]]:
+    """Course codes the client says were touched, or None if the change can't be applied as a delta."""
+    if not isinstance(change, dict):
+        return None
+    ctype = str(change.get("type") or change.get("action") or "").strip()
+
+    if ctype == "plan_updated":
+        keys: Set[str] = set()
+        for group in ("added", "removed", "moved", "updated"):
+            items = change.get(group)
+            if items is None:
+                continue
+            if not isinstance(items, list):
+                return None
+            for item in items:
+                code = str(item.get("code") or "").strip() if isinstance(item, dict) else ""
+                if not code:
+                    return None
+                keys.add(code)
+        return keys
+    if ctype == "course_status_toggled":
+        code = str(change.get("courseCode") or "").strip()
+        return {code} if code else None
+    if ctype == "focus_updated":
+        return set()
+    return None
+
+
+def _evaluate_delta(session: _Session, payload: Dict[str, Any]) -> Optional[Any]:
+    checker = session.checker
+    claimed = _claimed_keys(payload.get("change"))
+    if claimed is None:
+        return None
+    items = checker.plan_items(payload)
+    if items is None:
+        return None
+
+    # One cheap pass to match courses against the stored ones; only courses whose
+    # signature changed are parsed again, and each of them must be part of the delta.
+    entries = session.entries
+    seen: Set[str] = set()
+    changed: List[Tuple[int, str, Dict[str, Any], str, int, Tuple[Any, ...]]] = []
+    kept = 0
+    for order, (course, status, lane) in enumerate(items):
+        key = checker.course_key(course)
+        if key in seen:
+            return None
+        seen.add(key)
+        sig = checker.course_signature(course, status, lane)
+        entry = entries.get(key)
+        if entry is not None and entry[0] == sig:
+            session.state.set_order(entry[1], order)
+            kept += 1
+            continue
+        if key not in claimed:
+            return None
+        changed.append((order, key, course, status, lane, sig))
+
+    removed = [key for key in claimed if key in entries and key not in seen]
+    replaced = sum(1 for _, key, *_ in changed if key in entries)
+    if kept + replaced + len(removed) != len(entries):
+        # a stored course vanished without being part of the delta
+        return None
+
+    state = session.state
+    for key in removed:
+        state.remove(entries.pop(key)[1])
+    for _, key, *_ in changed:
+        old = entries.pop(key, None)
+        if old is not None:
+            state.remove(old[1])
+    for order, key, course, status, lane, sig in changed:
+        rec = checker.parse_item(course, status, lane)
+        if rec is None or not state.can_add(rec):
+            return None
+        state.set_order(rec, order)
+        state.add(rec)
+        entries[key] = (sig, rec)
+
+    timer = phase_timing.active()
+    if timer is not None:
+        timer.lap("delta")
+    return checker.evaluate_state(state, payload)
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Histogram bucket upper bounds in milliseconds; a last bucket catches everything above.
+BUCKETS_MS: Tuple[float, ...] = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 25.0, 50.0, 100.0)
+
+
+class PhaseTimer:
+    """
+    Lap timer for one evaluation: lap(name) books the time since the previous lap (or
+    since the timer started) to phase `name`. Phases may be booked more than once.
+    """
+
+    __slots__ = ("phases", "_last")
+
+    def __init__(self) -> None:
+        self.phases: Dict[str, float] = {}
+        self._last = time.perf_counter()
+
+    def lap(self, name: str) -> None:
+        now = time.perf_counter()
+        self.phases[name] = self.phases.get(name, 0.0) + (now - self._last)
+        self._last = now
+
+    def absorb(self, phases: Dict[str, float]) -> None:
+        """
+        Book phases timed elsewhere (e.g. in a worker process) since the last lap; the
+        next lap only gets the time not covered by them.
+        """
+        for name, seconds in phases.items():
+            self.phases[name] = self.phases.get(name, 0.0) + seconds
+            self._last += seconds
+
+    def milliseconds(self) -> Dict[str, float]:
+        return {name: round(seconds * 1000, 3) for name, seconds in self.phases.items()}
+
+
+# The rule engines look up the timer of the current request once per call and only lap
+# when there is one, so timing costs a None check per phase when it is off.
+_current: ContextVar[Optional[PhaseTimer]] = ContextVar("phase_timer", default=None)
+
+
+def active() -> Optional[PhaseTimer]:
+    return _current.get()
+
+
+@contextmanager
+def recording() -> Iterator[PhaseTimer]:
+    """Time the phases of everything evaluated inside the block (same thread/task)."""
+    timer = PhaseTimer()
+    token = _current.set(timer)
+    try:
+        yield timer
+    finally:
+        _current.reset(token)
+
+
+def server_timing(timer: PhaseTimer) -> str:
+    """Server-Timing header value (durations in ms), in phase order."""
+    return ", ".join(f"{name};dur={seconds * 1000:.3f}" for name, seconds in timer.phases.items())
+
+
+# ----------------------------
+# Per-phase histograms (process-wide)
+# ----------------------------
+
+class PhaseHistograms:
+    def __init__(self, buckets_ms: Tuple[float, ...] = BUCKETS_MS) -> None:
+        self.buckets_ms = buckets_ms
+        self._data: Dict[Tuple[str, str], List[Any]] = {}  # (engine, phase) -> [counts, count, sum_ms]
+        self._lock = threading.Lock()
+
+    def observe(self, engine: str, timer: PhaseTimer) -> None:
+        with self._lock:
+            for phase, seconds in timer.phases.items():
+                ms = seconds * 1000
+                entry = self._data.get((engine, phase))
+                if entry is None:
+                    entry = self._data[(engine, phase)] = [[0] * (len(self.buckets_ms) + 1), 0, 0.0]
+                idx = next((i for i, bound in enumerate(self.buckets_ms) if ms <= bound), len(self.buckets_ms))
+                entry[0][idx] += 1
+                entry[1] += 1
+                entry[2] += ms
+
+    def snapshot(self) -> Dict[str, Any]:
+        """{engine: {phase: {count, meanMs, buckets: {"le_<ms>": n, ..., "inf": n}}}}"""
+        labels = [f"le_{b:g}" for b in self.buckets_ms] + ["inf"]
+        out: Dict[str, Any] = {}
+        with self._lock:
+            for (engine, phase), (counts, count, total) in sorted(self._data.items()):
+                out.setdefault(engine, {})[phase] = {
+                    "count": count,
+                    "meanMs": round(total / count, 3) if count else 0.0,
+                    "buckets": dict(zip(labels, counts)),
+                }
+        return out
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+histograms = PhaseHistograms()
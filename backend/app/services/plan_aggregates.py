@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+
+def exact_ects(value: float) -> bool:
+    """
+    True if `value` is a multiple of 1/1024 ECTS.
+
+    Sums of such values are exact in binary floating point, so adding and later
+    subtracting them again yields the same total as summing from scratch.
+    """
+    return (value * 1024.0).is_integer()
+
+
+def bump(counter: Dict[Any, int], key: Any, delta: int) -> None:
+    n = counter.get(key, 0) + delta
+    if n:
+        counter[key] = n
+    else:
+        counter.pop(key, None)
+
+
+class EctsBucket:
+    """Keyed ECTS sums whose entries can be removed again (a key vanishes at count 0)."""
+
+    __slots__ = ("sums", "counts")
+
+    def __init__(self) -> None:
+        self.sums: Dict[Any, float] = {}
+        self.counts: Dict[Any, int] = {}
+
+    def add(self, key: Any, ects: float) -> None:
+        self.sums[key] = self.sums.get(key, 0.0) + ects
+        self.counts[key] = self.counts.get(key, 0) + 1
+
+    def remove(self, key: Any, ects: float) -> None:
+        n = self.counts[key] - 1
+        if n:
+            self.counts[key] = n
+            self.sums[key] -= ects
+        else:
+            del self.counts[key]
+            del self.sums[key]
+
+    def get(self, key: Any, default: float = 0.0) -> float:
+        return self.sums.get(key, default)
+
+    def items(self) -> Iterator[Tuple[Any, float]]:
+        return iter(self.sums.items())
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self.sums
+
+    def __len__(self) -> int:
+        return len(self.sums)
+
+
+class LaneMultiset:
+    """key -> multiset of lane indices, answering "earliest lane of key"."""
+
+    __slots__ = ("lanes",)
+
+    def __init__(self) -> None:
+        self.lanes: Dict[Any, Dict[int, int]] = {}
+
+    def add(self, key: Any, lane: int) -> None:
+        d = self.lanes.setdefault(key, {})
+        d[lane] = d.get(lane, 0) + 1
+
+    def remove(self, key: Any, lane: int) -> None:
+        d = self.lanes[key]
+        bump(d, lane, -1)
+        if not d:
+            del self.lanes[key]
+
+    def earliest(self, key: Any) -> Optional[int]:
+        d = self.lanes.get(key)
+        return min(d) if d else None
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self.lanes
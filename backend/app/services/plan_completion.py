@@ -0,0 +1,332 @@
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+# Modules are scored on one scale: the objective's unit plus a small tie-break on the other
+# (fewest ECTS -> fewest modules among equal ECTS, and vice versa).
+OBJECTIVES = ("ects", "count")
+_MODULE_TIE = 1e-3  # per module when minimizing ECTS
+_ECTS_TIE = 1e-4  # per ECTS when minimizing the module count (total ECTS stay far below 1e4)
+_EPS = 1e-6
+
+# Nodes between two looks at the clock.
+_CLOCK_EVERY = 256
+
+
+# ----------------------------
+# Problem description (built by the rule engines)
+# ----------------------------
+
+@dataclass(frozen=True)
+class Candidate:
+    """A catalog module the plan could still add."""
+
+    title: str
+    ects: float  # ECTS the plan gains by completing the module
+    kind: str  # engine label: mandatory, core, narrow_elective, diploma_thesis, ...
+    exam_subject: str = ""
+
+
+@dataclass(frozen=True)
+class Requirement:
+    """
+    An open gap: at least `count` of `members`, and/or at least `ects` ECTS from `members`.
+
+    With `filler`, free-choice courses (not modules) may close the ECTS gap as well, e.g.
+    Transferable Skills or the total. With a `trigger`, the requirement only applies once
+    one of the trigger modules is chosen (core modules needed by an elective).
+    """
+
+    label: str
+    members: FrozenSet[int] = frozenset()
+    count: int = 0
+    ects: float = 0.0
+    filler: bool = False
+    trigger: FrozenSet[int] = frozenset()
+
+
+@dataclass
+class CompletionProblem:
+    candidates: List[Candidate] = field(default_factory=list)
+    requirements: List[Requirement] = field(default_factory=list)
+
+
+# ----------------------------
+# Branch and bound
+# ----------------------------
+
+class _Timeout(Exception):
+    pass
+
+
+class _Search:
+    def __init__(self, problem: CompletionProblem, objective: str, budget_s: float) -> None:
+        self.cands = problem.candidates
+        self.reqs = problem.requirements
+        self.deadline = time.perf_counter() + budget_s
+        self.nodes = 0
+
+        if objective == "count":
+            self.cost = [1.0 + c.ects * _ECTS_TIE for c in self.cands]
+            self.filler_rate = _ECTS_TIE
+        else:
+            self.cost = [c.ects + _MODULE_TIE for c in self.cands]
+            self.filler_rate = 1.0
+
+        self.members = [sorted(r.members, key=lambda i: (self.cost[i], i)) for r in self.reqs]
+        # members by cost per ECTS, for the fractional (knapsack) bound of ECTS gaps
+        self.by_ratio = [
+            sorted((i for i in r.members if self.cands[i].ects > _EPS), key=lambda i: self.cost[i] / self.cands[i].ects)
+            for r in self.reqs
+        ]
+        self.trigger_mask = [sum(1 << i for i in r.trigger) for r in self.reqs]
+        self.reqs_of: List[List[int]] = [[] for _ in self.cands]
+        for ri, r in enumerate(self.reqs):
+            for i in r.members:
+                self.reqs_of[i].append(ri)
+        self.triggered_by: List[List[int]] = [[] for _ in self.cands]
+        for ri, r in enumerate(self.reqs):
+            for i in r.trigger:
+                self.triggered_by[i].append(ri)
+
+        # Interchangeable modules (same cost, ECTS and requirements): only the first unchosen
+        # one of a class is ever branched on.
+        classes: Dict[Tuple[Any, ...], int] = {}
+        self.class_of = [
+            classes.setdefault(
+                (self.cost[i], c.ects, tuple(self.reqs_of[i]), tuple(self.triggered_by[i])), len(classes)
+            )
+            for i, c in enumerate(self.cands)
+        ]
+
+        self.count = [0] * len(self.reqs)
+        self.got = [0.0] * len(self.reqs)
+        self.mask = 0
+        self.banned = 0
+        self.spent = 0.0
+        self.seen: Dict[int, int] = {}  # chosen mask -> banned mask it was explored with
+
+        self.best_cost = float("inf")
+        self.best_mask: Optional[int] = None
+
+    # --- state ---
+    def choose(self, i: int) -> None:
+        self.mask |= 1 << i
+        self.spent += self.cost[i]
+        for ri in self.reqs_of[i]:
+            self.count[ri] += 1
+            self.got[ri] += self.cands[i].ects
+
+    def unchoose(self, i: int) -> None:
+        self.mask &= ~(1 << i)
+        self.spent -= self.cost[i]
+        for ri in self.reqs_of[i]:
+            self.count[ri] -= 1
+            self.got[ri] -= self.cands[i].ects
+
+    def active(self, ri: int) -> bool:
+        return not self.reqs[ri].trigger or bool(self.mask & self.trigger_mask[ri])
+
+    def open_gap(self, ri: int) -> Tuple[int, float]:
+        r = self.reqs[ri]
+        return max(0, r.count - self.count[ri]), max(0.0, r.ects - self.got[ri])
+
+    def filler_ects(self) -> float:
+        need = 0.0
+        for ri, r in enumerate(self.reqs):
+            if r.filler and self.active(ri):
+                need = max(need, self.open_gap(ri)[1])
+        return need
+
+    # --- bounds ---
+    def _free(self, i: int) -> bool:
+        return not (self.mask >> i) & 1 and not (self.banned >> i) & 1
+
+    def requirement_bound(self, ri: int) -> float:
+        """Cheapest way to close requirement `ri` on its own (inf if it cannot be closed)."""
+        r = self.reqs[ri]
+        need_count, need_ects = self.open_gap(ri)
+        bound = 0.0
+        if need_count:
+            for i in self.members[ri]:
+                if need_count == 0:
+                    break
+                if self._free(i):
+                    bound += self.cost[i]
+                    need_count -= 1
+            if need_count:
+                return float("inf")
+        if need_ects > _EPS:
+            ects_bound = 0.0
+            left = need_ects
+            for i in self.by_ratio[ri]:
+                if left <= _EPS:
+                    break
+                if self._free(i):
+                    take = min(1.0, left / self.cands[i].ects)
+                    ects_bound += take * self.cost[i]
+                    left -= take * self.cands[i].ects
+            if left > _EPS:
+                ects_bound = float("inf")
+            if r.filler:
+                ects_bound = min(ects_bound, need_ects * self.filler_rate)
+            bound = max(bound, ects_bound)
+        return bound
+
+    def lower_bound(self) -> float:
+        bound = 0.0
+        for ri in range(len(self.reqs)):
+            if self.active(ri):
+                bound = max(bound, self.requirement_bound(ri))
+        return self.spent + bound
+
+    # --- search ---
+    def branch_requirement(self) -> Optional[int]:
+        """The open hard requirement with the fewest ways to progress (None if all closed)."""
+        best: Optional[int] = None
+        best_options = 0
+        for ri, r in enumerate(self.reqs):
+            if not self.active(ri):
+                continue
+            need_count, need_ects = self.open_gap(ri)
+            if not need_count and (r.filler or need_ects <= _EPS):
+                continue
+            options = sum(1 for i in r.members if self._free(i))
+            if best is None or options < best_options:
+                best, best_options = ri, options
+        return best
+
+    def record(self) -> None:
+        total = self.spent + self.filler_ects() * self.filler_rate
+        if total < self.best_cost - _EPS:
+            self.best_cost = total
+            self.best_mask = self.mask
+
+    def tick(self) -> None:
+        self.nodes += 1
+        if self.nodes % _CLOCK_EVERY == 0 and time.perf_counter() > self.deadline:
+            raise _Timeout
+
+    def greedy(self) -> None:
+        """Quick first solution: close requirements in order with their cheapest members."""
+        picked: List[int] = []
+        while True:
+            ri = next(
+                (
+                    ri for ri, r in enumerate(self.reqs)
+                    if self.active(ri)
+                    and (self.open_gap(ri)[0] or (not r.filler and self.open_gap(ri)[1] > _EPS))
+                ),
+                None,
+            )
+            if ri is None:
+                self.record()
+                break
+            free = [i for i in self.members[ri] if self._free(i)]
+            if not free:
+                break
+            self.choose(free[0])
+            picked.append(free[0])
+        for i in reversed(picked):
+            self.unchoose(i)
+
+    def dfs(self) -> None:
+        self.tick()
+        seen_banned = self.seen.get(self.mask)
+        if seen_banned is not None and seen_banned & ~self.banned == 0:
+            return
+        self.seen[self.mask] = self.banned
+
+        if self.lower_bound() >= self.best_cost - _EPS:
+            return
+        ri = self.branch_requirement()
+        if ri is None:
+            self.record()
+            return
+
+        banned_before = self.banned
+        offered = set()
+        for i in self.members[ri]:
+            if not self._free(i) or self.class_of[i] in offered:
+                continue
+            offered.add(self.class_of[i])
+            self.choose(i)
+            try:
+                self.dfs()
+            finally:
+                self.unchoose(i)
+            # siblings after `i` never choose it again (their subtrees would repeat this one)
+            self.banned |= 1 << i
+        self.banned = banned_before
+
+
+def solve(problem: CompletionProblem, objective: str = "ects", budget_ms: int = 250) -> Dict[str, Any]:
+    """
+    Cheapest set of candidate modules closing every requirement, by the objective "ects"
+    (fewest ECTS) or "count" (fewest modules). Requirements no set can close are reported
+    as unsatisfiable and left out of the search.
+
+    Depth-first branch and bound: each node branches on the open requirement with the
+    fewest options, bounded by the dearest single requirement still open. When the time
+    budget runs out, the best solution found so far is returned with "optimal": False.
+    """
+    if objective not in OBJECTIVES:
+        raise ValueError(f"objective must be one of {', '.join(OBJECTIVES)}")
+
+    started = time.perf_counter()
+    unsatisfiable: List[str] = []
+    feasible: List[Requirement] = []
+    for r in problem.requirements:
+        member_ects = sum(problem.candidates[i].ects for i in r.members)
+        if len(r.members) < r.count or (not r.filler and member_ects + _EPS < r.ects):
+            unsatisfiable.append(r.label)
+        else:
+            feasible.append(r)
+
+    search = _Search(CompletionProblem(problem.candidates, feasible), objective, budget_ms / 1000.0)
+    optimal = True
+    root_bound = search.lower_bound()
+    try:
+        search.greedy()
+        if search.best_cost > root_bound + _EPS:
+            search.dfs()
+    except _Timeout:
+        optimal = False
+
+    modules: List[Dict[str, Any]] = []
+    filler = 0.0
+    if search.best_mask is not None:
+        mask = search.best_mask
+        for i, c in enumerate(problem.candidates):
+            if (mask >> i) & 1:
+                search.choose(i)
+                modules.append({
+                    "title": c.title,
+                    "ects": c.ects,
+                    "kind": c.kind,
+                    "examSubject": c.exam_subject or None,
+                    "covers": [feasible[ri].label for ri in search.reqs_of[i]],
+                })
+        filler = search.filler_ects()
+
+    module_ects = sum(m["ects"] for m in modules)
+    return {
+        "ok": search.best_mask is not None and not unsatisfiable,
+        "objective": objective,
+        "optimal": optimal and search.best_mask is not None,
+        "modules": modules,
+        "moduleCount": len(modules),
+        "moduleEcts": round(module_ects, 2),
+        "freeEcts": round(filler, 2),
+        "totalEcts": round(module_ects + filler, 2),
+        "requirements": [r.label for r in feasible],
+        "unsatisfiable": unsatisfiable,
+        "stats": {
+            "candidates": len(problem.candidates),
+            "nodes": search.nodes,
+            "elapsedMs": round((time.perf_counter() - started) * 1000, 1),
+            "budgetMs": budget_ms,
+        },
+    }
@@ -0,0 +1,350 @@
+from __future__ import annotations
+
+import heapq
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, FrozenSet, List, Optional, Sequence, Tuple
+
+from .prereq_graph import PrereqGraph
+
+_EPS = 1e-6
+
+# Local-search moves between two looks at the clock.
+_CLOCK_EVERY = 32
+# Penalty per ordering or StEOP violation, on the ECTS scale of overloads.
+_VIOLATION = 100.0
+
+
+# ----------------------------
+# Problem description (built by the rule engines)
+# ----------------------------
+
+@dataclass(frozen=True)
+class Task:
+    """A course or module to place; `course` is emitted as a planned course with its laneIndex."""
+
+    course: Dict[str, Any]
+    label: str
+    ects: float
+    steop_tags: FrozenSet[str] = frozenset()
+    steop_pool: bool = False
+    allowed_before_steop: bool = True  # may precede StEOP completion (courses outside StEOP only)
+
+    @property
+    def steop_any(self) -> bool:
+        return bool(self.steop_tags) or self.steop_pool
+
+
+@dataclass(frozen=True)
+class Steop:
+    """
+    Open StEOP of a bachelor plan. Lanes before its completion lane hold StEOP courses,
+    and at most `max_ects_before` ECTS of allowed courses outside it (done ones included).
+    """
+
+    required_tags: FrozenSet[str]
+    pool_min_ects: float
+    max_ects_before: float
+    done_tags: Dict[int, FrozenSet[str]] = field(default_factory=dict)  # lane -> tags
+    done_pool: Dict[int, float] = field(default_factory=dict)  # lane -> pool ECTS
+    done_outside: Dict[int, float] = field(default_factory=dict)  # lane -> ECTS outside StEOP
+
+
+@dataclass
+class ScheduleProblem:
+    tasks: List[Task] = field(default_factory=list)
+    lane_load: Dict[int, float] = field(default_factory=dict)  # ECTS of done courses per lane
+    first_lane: int = 0  # tasks go into first_lane .. lanes - 1
+    lanes: int = 8
+    max_ects: float = 42.0
+    recommended_ects: float = 30.0
+    # (i, j): task i is a (direct or indirect) prerequisite of task j and belongs in an earlier lane
+    before: List[Tuple[int, int]] = field(default_factory=list)
+    # per task: first lane after its done prerequisites
+    earliest: List[int] = field(default_factory=list)
+    # whether a prerequisite in a later lane is rejected (master) or only a warning (bachelor)
+    order_hard: bool = True
+    steop: Optional[Steop] = None
+    warnings: List[str] = field(default_factory=list)
+
+
+def prerequisite_order(
+    graph: PrereqGraph, task_keys: Sequence[Sequence[str]], done_lanes: Dict[str, int]
+) -> Tuple[List[Tuple[int, int]], List[int]]:
+    """
+    Ordering constraints of the tasks from a compiled PrereqGraph: (i, j) pairs where task
+    i is a direct or indirect prerequisite of task j, and per task the lane after its
+    latest done prerequisite. `task_keys` lists the graph keys each task may appear
+    under (e.g. course and module key); `done_lanes` maps keys of done courses to lanes.
+    """
+    nodes = [next((graph.index[k] for k in keys if k in graph.index), None) for keys in task_keys]
+    done_nodes = [(graph.index[k], lane) for k, lane in done_lanes.items() if k in graph.index]
+    before: List[Tuple[int, int]] = []
+    earliest = [0] * len(nodes)
+    for j, nj in enumerate(nodes):
+        if nj is None:
+            continue
+        ancestors = graph.ancestors[nj]
+        for i, ni in enumerate(nodes):
+            if ni is not None and i != j and ancestors >> ni & 1:
+                before.append((i, j))
+        for nd, lane in done_nodes:
+            if ancestors >> nd & 1:
+                earliest[j] = max(earliest[j], lane + 1)
+    return before, earliest
+
+
+# ----------------------------
+# Scoring
+# ----------------------------
+
+class _Schedule:
+    """Evaluates lane assignments of one problem; lower cost tuples are better."""
+
+    def __init__(self, problem: ScheduleProblem) -> None:
+        self.p = problem
+        self.n = len(problem.tasks)
+        self.ects = [t.ects for t in problem.tasks]
+        top = problem.lanes - 1
+        self.low = [min(max(problem.first_lane, e), top) for e in (problem.earliest or [0] * self.n)]
+        self.base = [problem.lane_load.get(li, 0.0) for li in range(problem.lanes)]
+        self.preds: List[List[int]] = [[] for _ in range(self.n)]
+        for i, j in problem.before:
+            self.preds[j].append(i)
+
+    def loads(self, lane: List[int]) -> List[float]:
+        load = list(self.base)
+        for i, li in enumerate(lane):
+            load[li] += self.ects[i]
+        return load
+
+    def steop_lane(self, lane: List[int], placed: Optional[List[bool]] = None) -> Optional[int]:
+        """First lane by which StEOP is complete, from done courses and (placed) tasks."""
+        st = self.p.steop
+        if st is None:
+            return None
+        tags: Dict[int, set] = {li: set(t) for li, t in st.done_tags.items()}
+        pool: Dict[int, float] = dict(st.done_pool)
+        for i, t in enumerate(self.p.tasks):
+            if t.steop_any and (placed is None or placed[i]):
+                tags.setdefault(lane[i], set()).update(t.steop_tags)
+                if t.steop_pool:
+                    pool[lane[i]] = pool.get(lane[i], 0.0) + t.ects
+        have: set = set()
+        acc = 0.0
+        for li in sorted(set(tags) | set(pool)):
+            have |= tags.get(li, set())
+            acc += pool.get(li, 0.0)
+            if have >= st.required_tags and acc >= st.pool_min_ects - _EPS:
+                return li
+        return None
+
+    def cost(self, lane: List[int]) -> Tuple[float, int, int, float, float]:
+        """
+        (hard, order, span, heavy, balance): penalties of what evaluate would reject
+        (overloads, prerequisites in later lanes when they are hard) and of the StEOP
+        rules; prerequisite pairs not in strictly increasing lanes; lanes used; ECTS above
+        the recommended load; and the sum of squared loads, which favors even semesters.
+        """
+        p = self.p
+        load = self.loads(lane)
+        span = max(lane) + 1 if lane else 0
+        hard = 0.0
+        heavy = 0.0
+        balance = 0.0
+        for li in range(span):
+            s = load[li]
+            if s > p.max_ects + _EPS:
+                hard += s - p.max_ects
+            if s > p.recommended_ects + _EPS:
+                heavy += s - p.recommended_ects
+            balance += s * s
+
+        order = 0
+        for i, j in p.before:
+            if lane[i] >= lane[j]:
+                order += 1
+                if p.order_hard and lane[i] > lane[j]:
+                    hard += _VIOLATION
+
+        if p.steop is not None:
+            c = self.steop_lane(lane)
+            outside = sum(e for li, e in p.steop.done_outside.items() if c is None or li < c)
+            for i, t in enumerate(p.tasks):
+                if t.steop_any or (c is not None and lane[i] >= c):
+                    continue
+                if not t.allowed_before_steop:
+                    hard += _VIOLATION
+                outside += t.ects
+            if outside > p.steop.max_ects_before + _EPS:
+                hard += outside - p.steop.max_ects_before
+        return (round(hard, 6), order, span, round(heavy, 6), round(balance, 6))
+
+    def violations(self, lane: List[int]) -> List[str]:
+        """What keeps `lane` from satisfying the hard constraints, as messages (cf. cost)."""
+        p = self.p
+        out: List[str] = []
+        for li, s in enumerate(self.loads(lane)):
+            if s > p.max_ects + _EPS:
+                out.append(f"Semester {li + 1} exceeds max load ({s:.1f} ECTS > {p.max_ects:.1f}).")
+        for i, j in p.before:
+            if p.order_hard and lane[i] > lane[j]:
+                out.append(
+                    f"'{p.tasks[j].label}' is in semester {lane[j] + 1}, "
+                    f"but its prerequisite '{p.tasks[i].label}' is in semester {lane[i] + 1}."
+                )
+        if p.steop is not None:
+            c = self.steop_lane(lane)
+            outside = sum(e for li, e in p.steop.done_outside.items() if c is None or li < c)
+            for i, t in enumerate(p.tasks):
+                if t.steop_any or (c is not None and lane[i] >= c):
+                    continue
+                if not t.allowed_before_steop:
+                    out.append(f"'{t.label}' (semester {lane[i] + 1}) is not allowed before completing StEOP.")
+                outside += t.ects
+            if outside > p.steop.max_ects_before + _EPS:
+                out.append(
+                    f"Before completing StEOP, {outside:.1f} ECTS outside StEOP are planned "
+                    f"(max {p.steop.max_ects_before:g})."
+                )
+        return out
+
+    # ----------------------------
+    # Construction
+    # ----------------------------
+    def greedy(self) -> List[int]:
+        """
+        List scheduling: tasks in prerequisite order (StEOP first, then the longest
+        remaining chain, then the largest), each into the first lane its constraints
+        allow that stays within the recommended load, else within the maximum load.
+        """
+        p = self.p
+        succs: List[List[int]] = [[] for _ in range(self.n)]
+        indegree = [0] * self.n
+        for i, j in p.before:
+            succs[i].append(j)
+            indegree[j] += 1
+
+        # the before pairs are transitive: succs[i] are all tasks that wait for task i
+        def priority(i: int) -> Tuple[bool, int, float, int]:
+            return (not p.tasks[i].steop_any, -len(succs[i]), -self.ects[i], i)
+
+        ready = [priority(i) for i in range(self.n) if indegree[i] == 0]
+        heapq.heapify(ready)
+        lane = [self.low[i] for i in range(self.n)]
+        placed = [False] * self.n
+        load = list(self.base)
+        outside = sum(p.steop.done_outside.values()) if p.steop is not None else 0.0
+        top = p.lanes - 1
+
+        while ready:
+            i = heapq.heappop(ready)[-1]
+            t = p.tasks[i]
+            lo = max([self.low[i]] + [lane[k] + 1 for k in self.preds[i]])
+            c: Optional[int] = None
+            gated = p.steop is not None and not t.steop_any
+            if gated:
+                c = self.steop_lane(lane, placed)
+                if not t.allowed_before_steop or outside + t.ects > p.steop.max_ects_before + _EPS:
+                    lo = max(lo, c if c is not None else lo)
+            lo = min(lo, top)
+            fits = [li for li in range(lo, p.lanes) if load[li] + t.ects <= p.recommended_ects + _EPS]
+            fits = fits or [li for li in range(lo, p.lanes) if load[li] + t.ects <= p.max_ects + _EPS]
+            li = fits[0] if fits else lo
+            lane[i] = li
+            placed[i] = True
+            load[li] += t.ects
+            if gated and (c is None or li < c):
+                outside += t.ects
+            for j in succs[i]:
+                indegree[j] -= 1
+                if indegree[j] == 0:
+                    heapq.heappush(ready, priority(j))
+        return lane
+
+
+def solve(problem: ScheduleProblem, budget_ms: int = 200, seed: int = 0) -> Dict[str, Any]:
+    """
+    Assign every task a lane: respect the maximum load per semester, prerequisites and
+    the StEOP rules, then use as few semesters as possible, keep them within the
+    recommended load and balanced.
+
+    A greedy list schedule is improved by local search (move one task to another lane,
+    or swap the lanes of two) that accepts moves not worse by the cost tuple, until the
+    time budget runs out or nothing improved for a while. "ok" is False when hard
+    constraints are still violated; "violations" says which.
+    """
+    started = time.perf_counter()
+    deadline = started + budget_ms / 1000.0
+    sched = _Schedule(problem)
+    n = sched.n
+
+    lane = sched.greedy() if n else []
+    cost = sched.cost(lane)
+    best, best_cost = list(lane), cost
+    rng = random.Random(seed)
+    iterations = 0
+    stall = 0
+    stall_limit = 50 * max(1, n) * max(1, problem.lanes - problem.first_lane)
+
+    while n and stall < stall_limit:
+        iterations += 1
+        if iterations % _CLOCK_EVERY == 0 and time.perf_counter() > deadline:
+            break
+        i = rng.randrange(n)
+        old_i = lane[i]
+        j = -1
+        if n > 1 and rng.random() < 0.3:
+            j = rng.randrange(n)
+            old_j = lane[j]
+            if old_i == old_j or old_j < sched.low[i] or old_i < sched.low[j]:
+                stall += 1
+                continue
+            lane[i], lane[j] = old_j, old_i
+        else:
+            target = rng.randrange(sched.low[i], problem.lanes)
+            if target == old_i:
+                stall += 1
+                continue
+            lane[i] = target
+
+        new_cost = sched.cost(lane)
+        if new_cost <= cost:
+            cost = new_cost
+            if new_cost < best_cost:
+                best, best_cost = list(lane), new_cost
+                stall = 0
+            else:
+                stall += 1
+        else:
+            lane[i] = old_i
+            if j >= 0:
+                lane[j] = old_j
+            stall += 1
+
+    load = sched.loads(best)
+    span = max([problem.first_lane] + [li + 1 for li in best]) if best else problem.first_lane
+    semesters = [
+        {
+            "laneIndex": li,
+            "ects": round(load[li], 2),
+            "courses": [problem.tasks[i].label for i in range(n) if best[i] == li],
+        }
+        for li in range(span)
+    ]
+    violations = sched.violations(best)
+    return {
+        "ok": not violations,
+        "plannedCourses": [dict(t.course, laneIndex=best[i]) for i, t in enumerate(problem.tasks)],
+        "semesters": semesters,
+        "semesterCount": span,
+        "violations": violations,
+        "warnings": list(problem.warnings),
+        "stats": {
+            "tasks": n,
+            "iterations": iterations,
+            "elapsedMs": round((time.perf_counter() - started) * 1000, 1),
+            "budgetMs": budget_ms,
+        },
+    }
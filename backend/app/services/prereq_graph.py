@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import heapq
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+
+class PrerequisiteCycle(ValueError):
+    """The prerequisites of a program contain a cycle; `cycle` lists it (first == last)."""
+
+    def __init__(self, cycle: List[str]) -> None:
+        super().__init__("Prerequisite cycle: " + " -> ".join(cycle))
+        self.cycle = cycle
+
+
+@dataclass(frozen=True)
+class OrderViolation:
+    target: str  # display names (as first written in the rules)
+    prereq: str
+    target_lane: int
+    prereq_lane: Optional[int]  # None: a direct prerequisite that is not in the plan at all
+    via: Tuple[str, ...] = ()  # courses between prereq and target; () for a direct prerequisite
+
+
+class PrereqGraph:
+    """
+    Prerequisite DAG of one program, compiled once per curriculum.
+
+    Nodes are normalized keys (the checker's key function), edges point from a prerequisite
+    to the course/module that needs it. Compilation orders the nodes topologically
+    (rejecting cycles) and stores, per node, the bitset of all its direct and indirect
+    prerequisites. A plan is then validated in one pass over the nodes: the prerequisites
+    planned in a later lane are one AND of two bitsets per planned node, so a request costs
+    one lane lookup per node plus word-sized bit operations, not a walk over every
+    (direct or indirect) prerequisite pair.
+    """
+
+    __slots__ = ("keys", "names", "index", "direct", "ancestors", "_successors")
+
+    def __init__(self, edges: Iterable[Tuple[str, str]], key: Callable[[str], str]) -> None:
+        """`edges`: (prerequisite, target) name pairs; later duplicates are ignored."""
+        self.keys: List[str] = []  # topological order after compilation
+        self.names: List[str] = []
+        self.index: Dict[str, int] = {}
+
+        order: Dict[str, int] = {}
+        display: Dict[str, str] = {}
+        succ: Dict[str, List[str]] = {}
+        for prereq, target in edges:
+            p, t = key(prereq), key(target)
+            if not p or not t:
+                continue
+            for k, name in ((p, prereq), (t, target)):
+                if k not in order:
+                    order[k] = len(order)
+                    display[k] = name
+                    succ[k] = []
+            if p == t:
+                raise PrerequisiteCycle([prereq, target])
+            if t not in succ[p]:
+                succ[p].append(t)
+
+        # Kahn's algorithm; ties keep the order of first mention, so output is stable
+        indegree = {k: 0 for k in order}
+        for targets in succ.values():
+            for t in targets:
+                indegree[t] += 1
+        ready = [(order[k], k) for k in order if indegree[k] == 0]
+        topo: List[str] = []
+        while ready:
+            _, k = heapq.heappop(ready)
+            topo.append(k)
+            for t in succ[k]:
+                indegree[t] -= 1
+                if indegree[t] == 0:
+                    heapq.heappush(ready, (order[t], t))
+        if len(topo) != len(order):
+            raise PrerequisiteCycle([display[k] for k in _find_cycle(succ, {k for k in order if indegree[k] > 0})])
+
+        self.keys = topo
+        self.names = [display[k] for k in topo]
+        self.index = {k: i for i, k in enumerate(topo)}
+        self._successors: List[Tuple[int, ...]] = [tuple(sorted(self.index[t] for t in succ[k])) for k in topo]
+
+        # direct[i] / ancestors[i]: bitsets over node indexes (bit j = node j)
+        self.direct: List[int] = [0] * len(topo)
+        for i, targets in enumerate(self._successors):
+            for t in targets:
+                self.direct[t] |= 1 << i
+        self.ancestors: List[int] = [0] * len(topo)
+        for i in range(len(topo)):  # prerequisites come first in topological order
+            bits = self.direct[i]
+            closure = bits
+            while bits:
+                low = bits & -bits
+                closure |= self.ancestors[low.bit_length() - 1]
+                bits ^= low
+            self.ancestors[i] = closure
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def requires(self, target: str, prereq: str) -> bool:
+        """Whether `prereq` (a key) is a direct or indirect prerequisite of `target`."""
+        t, p = self.index.get(target), self.index.get(prereq)
+        return t is not None and p is not None and bool(self.ancestors[t] >> p & 1)
+
+    def _path(self, src: int, dst: int) -> Tuple[str, ...]:
+        """Nodes strictly between src and dst on one prerequisite chain (src is an ancestor of dst)."""
+        via: List[str] = []
+        node = src
+        while True:
+            # every successor of a node on the chain is reachable from src
+            nxt = next(s for s in self._successors[node] if s == dst or self.ancestors[dst] >> s & 1)
+            if nxt == dst:
+                return tuple(via)
+            via.append(self.names[nxt])
+            node = nxt
+
+    def validate(self, lane_of: Callable[[str], Optional[int]]) -> List[OrderViolation]:
+        """
+        Check a plan, given the earliest lane of each key (None when not in the plan).
+
+        Reports every planned course/module whose direct prerequisite is not planned at all
+        (prereq_lane None) or whose direct or indirect prerequisite is in a later lane (the
+        same lane is fine); indirect ones carry the chain in between. Targets come in
+        topological order, each with its missing prerequisites first.
+        """
+        lanes: List[Optional[int]] = [lane_of(k) for k in self.keys]
+        present = 0
+        by_lane: Dict[int, int] = {}
+        for i, lane in enumerate(lanes):
+            if lane is not None:
+                present |= 1 << i
+                by_lane[lane] = by_lane.get(lane, 0) | 1 << i
+        if not present:
+            return []
+
+        # later[l]: nodes in a lane after l
+        later: Dict[int, int] = {}
+        acc = 0
+        for lane in sorted(by_lane, reverse=True):
+            later[lane] = acc
+            acc |= by_lane[lane]
+
+        violations: List[OrderViolation] = []
+        for i, lane in enumerate(lanes):
+            if lane is None:
+                continue
+            absent = self.direct[i] & ~present
+            while absent:
+                low = absent & -absent
+                violations.append(OrderViolation(self.names[i], self.names[low.bit_length() - 1], lane, None))
+                absent ^= low
+            late = self.ancestors[i] & later[lane]
+            while late:
+                low = late & -late
+                j = low.bit_length() - 1
+                via = () if self.direct[i] & low else self._path(j, i)
+                violations.append(OrderViolation(self.names[i], self.names[j], lane, lanes[j], via))
+                late ^= low
+        return violations
+
+
+def _find_cycle(succ: Dict[str, List[str]], candidates: set) -> List[str]:
+    """
+    One cycle among the nodes Kahn's algorithm could not order. Each of them still has a
+    prerequisite among them, so walking prerequisites backwards must revisit a node.
+    """
+    pred: Dict[str, str] = {}
+    for k, targets in succ.items():
+        if k in candidates:
+            for t in targets:
+                if t in candidates:
+                    pred.setdefault(t, k)
+    seen: Dict[str, int] = {}
+    path: List[str] = []
+    node = min(candidates)
+    while node not in seen:
+        seen[node] = len(path)
+        path.append(node)
+        node = pred[node]
+    cycle = path[seen[node]:] + [node]
+    cycle.reverse()
+    return cycle
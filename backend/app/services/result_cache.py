@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from . import phase_timing
+
+# Course lists whose order does not matter to the plan (courses carry their own laneIndex).
+_COURSE_LISTS = ("plannedCourses", "doneCourses")
+
+_dump = json.JSONEncoder(sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str).encode
+
+
+def _update_courses(h: Any, items: Any, ordered: bool) -> None:
+    if not isinstance(items, list):
+        h.update(_dump(items).encode("utf-8"))
+        return
+    dumped = (_dump(c) for c in items)
+    # JSON escapes control characters, so NUL separates items unambiguously
+    for item in (dumped if ordered else sorted(dumped)):
+        h.update(item.encode("utf-8"))
+        h.update(b"\0")
+
+
+def plan_fingerprint(payload: Dict[str, Any], ordered: bool = False) -> str:
+    """
+    Content hash of a rulecheck payload: everything but `change`, with the course lists
+    (top-level and per lane) taken as multisets, or in their order with `ordered`.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    for key in sorted(payload):
+        if key == "change":
+            continue
+        value = payload[key]
+        h.update(b"\1" + key.encode("utf-8") + b"\1")
+        if key in _COURSE_LISTS:
+            _update_courses(h, value, ordered)
+        elif key == "lanes" and isinstance(value, list):
+            for lane in value:
+                if not isinstance(lane, dict):
+                    h.update(_dump(lane).encode("utf-8"))
+                    continue
+                for lane_key in sorted(lane):
+                    h.update(b"\2" + lane_key.encode("utf-8") + b"\2")
+                    if lane_key in _COURSE_LISTS:
+                        _update_courses(h, lane[lane_key], ordered)
+                    else:
+                        h.update(_dump(lane[lane_key]).encode("utf-8"))
+                h.update(b"\3")
+        else:
+            h.update(_dump(value).encode("utf-8"))
+    return h.hexdigest()
+
+
+class ResultCache:
+    """
+    LRU + TTL cache of rulecheck results, keyed by (curriculum fingerprint, plan fingerprint).
+
+    The curriculum fingerprint makes entries of a replaced curriculum unreachable; they
+    age out like any other entry. Plans are keyed with their course order: results name
+    the first offending course and list violations and hints in payload order. Results are stored as computed for some `change`; the
+    checker re-words them for the change of each request (RuleChecker.rebase_result).
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters: Dict[str, int] = {"hits": 0, "misses": 0, "evictions": 0, "expired": 0}
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < now:
+                del self._entries[key]
+                self._counters["expired"] += 1
+                entry = None
+            if entry is None:
+                self._counters["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counters["hits"] += 1
+            return entry[1]
+
+    def put(self, key: Hashable, result: Any) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counters["evictions"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._counters, "size": len(self._entries)}
+
+
+def evaluate(cache: ResultCache, checker: Any, payload: Dict[str, Any], compute: Callable[[Dict[str, Any]], Any]) -> Any:
+    """`compute(payload)` through the cache; hits are re-worded for the payload's change."""
+    key = (checker.curriculum.fingerprint, plan_fingerprint(payload, ordered=True))
+    cached = cache.get(key)
+    timer = phase_timing.active()
+    if timer is not None:
+        timer.lap("cache")
+    if cached is not None:
+        return checker.rebase_result(cached, payload)
+    result = compute(payload)
+    cache.put(key, result)
+    return result
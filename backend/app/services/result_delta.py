@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+from collections import Counter, OrderedDict
+from typing import Any, Dict, Hashable, List, Optional
+
+# Line lists sent as added/removed lines instead of JSON Patch operations:
+# (name in the delta, key path in the result body).
+LINE_LISTS = (("missing", ("missing",)), ("warnings", ("stats", "warnings")))
+
+_dump = json.JSONEncoder(sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str).encode
+
+
+def result_id(body: Dict[str, Any]) -> str:
+    """Content hash of a result body; equal bodies get equal ids."""
+    return hashlib.blake2b(_dump(body).encode("utf-8"), digest_size=12).hexdigest()
+
+
+# ----------------------------
+# Diffing
+# ----------------------------
+
+def _pointer(path: List[str]) -> str:
+    return "".join("/" + str(p).replace("~", "~0").replace("/", "~1") for p in path)
+
+
+def _same(a: Any, b: Any) -> bool:
+    # JSON distinguishes 1, 1.0 and true; Python's == does not
+    return type(a) is type(b) and a == b
+
+
+def _diff(a: Any, b: Any, path: List[str], skip: set, ops: List[Dict[str, Any]]) -> None:
+    if isinstance(a, dict) and isinstance(b, dict):
+        for k in a:
+            if k not in b and (*path, k) not in skip:
+                ops.append({"op": "remove", "path": _pointer([*path, k])})
+        for k, v in b.items():
+            if (*path, k) in skip:
+                continue
+            if k not in a:
+                ops.append({"op": "add", "path": _pointer([*path, k]), "value": v})
+            else:
+                _diff(a[k], v, [*path, k], skip, ops)
+    elif isinstance(a, list) and isinstance(b, list) and len(a) == len(b):
+        # same shape (e.g. moduleProgress): patch element-wise
+        for i, (x, y) in enumerate(zip(a, b)):
+            _diff(x, y, [*path, str(i)], skip, ops)
+    elif not _same(a, b):
+        ops.append({"op": "replace", "path": _pointer(path), "value": b})
+
+
+def _get(body: Dict[str, Any], keys: tuple) -> List[Any]:
+    value: Any = body
+    for k in keys:
+        value = value.get(k) if isinstance(value, dict) else None
+    return value if isinstance(value, list) else []
+
+
+def _lines(old: List[Any], new: List[Any]) -> Dict[str, List[Any]]:
+    old_count = Counter(_dump(x) for x in old)
+    new_count = Counter(_dump(x) for x in new)
+    added, removed = new_count - old_count, old_count - new_count
+    out: Dict[str, List[Any]] = {"added": [], "removed": []}
+    for x in new:
+        if added[_dump(x)] > 0:
+            added[_dump(x)] -= 1
+            out["added"].append(x)
+    for x in old:
+        if removed[_dump(x)] > 0:
+            removed[_dump(x)] -= 1
+            out["removed"].append(x)
+    return out
+
+
+def make_delta(base: Dict[str, Any], body: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    `body` relative to `base`: a JSON Patch (RFC 6902) for everything but the line lists
+    (missing, stats.warnings), which are sent as added/removed lines.
+    """
+    ops: List[Dict[str, Any]] = []
+    _diff(base, body, [], {keys for _, keys in LINE_LISTS}, ops)
+    delta: Dict[str, Any] = {"ok": body.get("ok"), "message": body.get("message"), "patch": ops}
+    for name, keys in LINE_LISTS:
+        delta[name] = _lines(_get(base, keys), _get(body, keys))
+    return delta
+
+
+# ----------------------------
+# Bases held for clients
+# ----------------------------
+
+class BaseStore:
+    """Recently sent result bodies, per client (LRU), so later responses can be deltas."""
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._bodies: "OrderedDict[Hashable, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters: Dict[str, int] = {"delta": 0, "full": 0, "unknown_base": 0}
+
+    def respond(self, client: Hashable, body: Dict[str, Any], base_id: Optional[str]) -> Dict[str, Any]:
+        """
+        The response for `body`: a delta against the client's `base_id` when that body is
+        still held, else the full body. Both carry the "resultId" to pass next time.
+        """
+        rid = result_id(body)
+        with self._lock:
+            base = self._bodies.get((client, base_id)) if base_id else None
+            self._bodies[(client, rid)] = body
+            self._bodies.move_to_end((client, rid))
+            while len(self._bodies) > self.max_entries:
+                self._bodies.popitem(last=False)
+            if base_id and base is None:
+                self._counters["unknown_base"] += 1
+            self._counters["delta" if base is not None else "full"] += 1
+
+        if base is None:
+            return {**body, "resultId": rid}
+        return {"delta": True, "baseResultId": base_id, "resultId": rid, **make_delta(base, body)}
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._counters, "bases": len(self._bodies)}
@@ -2,7 +2,14 @@ from __future__ import annotations
 
 from dataclasses import dataclass, field
 from typing import Any, List, Dict, Tuple, Optional, Set
-import unicodedata
+
+from . import phase_timing
+from .curriculum_compiler import Curriculum
+from .plan_aggregates import EctsBucket, LaneMultiset, bump, exact_ects
+from .plan_completion import Candidate, CompletionProblem, Requirement
+from .plan_schedule import ScheduleProblem, Steop, Task, prerequisite_order
+from .prereq_graph import PrereqGraph
+from .text_norm import fold_key
 
 
 @dataclass
@@ -13,9 +20,224 @@ class RuleCheckResult:
     missing: List[str] = field(default_factory=list)
 
 
+@dataclass(slots=True)
+class CourseRecord:
+    """
+    One parsed course: everything the checks need, derived once per course.
+
+    Built by RuleChecker.parse_course; `order` is the course's position in the payload.
+    """
+
+    code: str
+    code_key: str
+    status: str
+    lane: int
+    ects: Optional[float]
+    ects_raw: Any
+    error: Optional[str]
+    counted: bool
+    module_title: str
+    module_key: str
+    category: str
+    category_hint: Optional[str]
+    subj_key: str
+    steop_tag: Optional[str]
+    steop_pool: bool
+    steop_any: bool
+    allowed_before_steop: bool
+    thesis: bool
+    order: int = 0
+
+
+@dataclass(frozen=True, slots=True)
+class FocusGroup:
+    """A "pick at least `min` of these modules" list, as a module bitmask."""
+
+    mask: int
+    min: int
+    items: Tuple[Tuple[str, int], ...]  # (title as listed, module bit)
+
+
+@dataclass(frozen=True, slots=True)
+class FocusMask:
+    """
+    A focus (Vertiefung) compiled against RuleChecker.module_bits, so its progress on a
+    plan is a few AND/popcounts of the plan's completed-modules mask.
+    """
+
+    key: str
+    name: str
+    required: FocusGroup  # min == number of required modules
+    choose: Optional[FocusGroup]
+    groups: Tuple[FocusGroup, ...]
+
+    @property
+    def choice_groups(self) -> Tuple[FocusGroup, ...]:
+        return (self.choose, *self.groups) if self.choose is not None else self.groups
+
+    def missing_count(self, done: int) -> int:
+        """Modules the focus still needs on a plan whose complete modules are `done`."""
+        n = self.required.min - (self.required.mask & done).bit_count()
+        for grp in self.choice_groups:
+            n += max(0, grp.min - (grp.mask & done).bit_count())
+        return n
+
+
+class PlanState:
+    """
+    Running aggregates over the parsed course records of one plan.
+
+    Records can be removed again, so the incremental rulecheck keeps one per session
+    and applies only the change delta; a full evaluation builds it from scratch.
+    Both paths finish in RuleChecker._evaluate_state, which reads nothing else.
+    """
+
+    def __init__(self) -> None:
+        # id(record) -> record, for every parsed item (also rejected ones)
+        self.records: Dict[int, CourseRecord] = {}
+        self.total_ects = 0.0
+
+        # StEOP tags/pool over all items (done + planned) and over done items only
+        self.steop_plan_tags: Dict[str, int] = {}
+        self.steop_plan_pool = 0.0
+        self.steop_done_tags: Dict[str, int] = {}
+        self.steop_done_pool = 0.0
+        # Per lane, DONE items only: StEOP tags, pool ECTS and ECTS outside StEOP.
+        # Prefix sums over these (in lane order) give the StEOP completion lane and
+        # the non-StEOP load before it.
+        self.done_lane_tags: Dict[int, Dict[str, int]] = {}
+        self.done_lane_pool = EctsBucket()
+        self.done_lane_non_steop = EctsBucket()
+        # lane -> {id(record): record} of DONE items outside StEOP (pre-StEOP rule)
+        self.non_steop_done_by_lane: Dict[int, Dict[int, CourseRecord]] = {}
+        self.thesis_done_lanes = LaneMultiset()
+
+        # Only items that passed the per-course checks count towards these
+        self.lane_ects = EctsBucket()
+        self.mod_all = EctsBucket()
+        self.mod_done = EctsBucket()
+        self.cat_ects = EctsBucket()
+        self.subj_ects = EctsBucket()
+        self.course_lanes = LaneMultiset()
+        self.module_lanes = LaneMultiset()
+        self.code_keys: Dict[str, int] = {}
+        self.hinted: Dict[int, CourseRecord] = {}
+
+    def can_add(self, rec: CourseRecord) -> bool:
+        """Whether `rec` keeps the state clean (valid, unique, exactly summable)."""
+        return rec.error is None and rec.code_key not in self.code_keys and exact_ects(rec.ects)
+
+    @staticmethod
+    def set_order(rec: CourseRecord, order: int) -> None:
+        rec.order = order
+
+    def add(self, rec: CourseRecord) -> None:
+        self._apply(rec, 1)
+
+    def remove(self, rec: CourseRecord) -> None:
+        self._apply(rec, -1)
+
+    def steop_prefix(
+        self, mandatory_tags: frozenset, pool_min_ects: float
+    ) -> Tuple[Optional[int], List[Tuple[int, float]]]:
+        """
+        One pass over the DONE lanes in order, accumulating StEOP tags and pool ECTS.
+
+        Returns the earliest lane at which StEOP is complete (None if never) and, for
+        every lane before it, (lane, non-StEOP DONE ECTS accumulated up to that lane).
+        """
+        tags: Set[str] = set()
+        pool = 0.0
+        non_steop = 0.0
+        before: List[Tuple[int, float]] = []
+        for lane in sorted(set(self.done_lane_tags) | set(self.done_lane_pool.sums) | set(self.done_lane_non_steop.sums)):
+            tags.update(self.done_lane_tags.get(lane, ()))
+            pool += self.done_lane_pool.get(lane)
+            if tags >= mandatory_tags and pool >= pool_min_ects - 1e-6:
+                return lane, before
+            non_steop += self.done_lane_non_steop.get(lane)
+            before.append((lane, non_steop))
+        return None, before
+
+    def _apply(self, rec: CourseRecord, sign: int) -> None:
+        rid = id(rec)
+        ects = rec.ects
+        lane = rec.lane
+        done = rec.status == "done"
+        tag = rec.steop_tag
+
+        if sign > 0:
+            self.records[rid] = rec
+        else:
+            del self.records[rid]
+        self.total_ects += sign * ects
+
+        if tag:
+            bump(self.steop_plan_tags, tag, sign)
+        if rec.steop_pool:
+            self.steop_plan_pool += sign * ects
+
+        if done:
+            if tag:
+                bump(self.steop_done_tags, tag, sign)
+                lane_tags = self.done_lane_tags.setdefault(lane, {})
+                bump(lane_tags, tag, sign)
+                if not lane_tags:
+                    del self.done_lane_tags[lane]
+            if rec.steop_pool:
+                self.steop_done_pool += sign * ects
+                if sign > 0:
+                    self.done_lane_pool.add(lane, ects)
+                else:
+                    self.done_lane_pool.remove(lane, ects)
+            if not rec.steop_any:
+                if sign > 0:
+                    self.done_lane_non_steop.add(lane, ects)
+                    self.non_steop_done_by_lane.setdefault(lane, {})[rid] = rec
+                else:
+                    self.done_lane_non_steop.remove(lane, ects)
+                    members = self.non_steop_done_by_lane[lane]
+                    del members[rid]
+                    if not members:
+                        del self.non_steop_done_by_lane[lane]
+            if rec.thesis:
+                if sign > 0:
+                    self.thesis_done_lanes.add(None, lane)
+                else:
+                    self.thesis_done_lanes.remove(None, lane)
+
+        if not rec.counted:
+            return
+
+        if sign > 0:
+            self.lane_ects.add(lane, ects)
+            self.mod_all.add(rec.module_key, ects)
+            if done:
+                self.mod_done.add(rec.module_key, ects)
+            self.cat_ects.add(rec.category, ects)
+            self.subj_ects.add(rec.subj_key, ects)
+            self.course_lanes.add(rec.code_key, lane)
+            self.module_lanes.add(rec.module_key, lane)
+            if rec.category_hint:
+                self.hinted[rid] = rec
+        else:
+            self.lane_ects.remove(lane, ects)
+            self.mod_all.remove(rec.module_key, ects)
+            if done:
+                self.mod_done.remove(rec.module_key, ects)
+            self.cat_ects.remove(rec.category, ects)
+            self.subj_ects.remove(rec.subj_key, ects)
+            self.course_lanes.remove(rec.code_key, lane)
+            self.module_lanes.remove(rec.module_key, lane)
+            self.hinted.pop(rid, None)
+        bump(self.code_keys, rec.code_key, sign)
+
+
 class RuleChecker:
     """
-    Rule engine for TU Wien Bachelorstudium Informatik (180 ECTS) based on the provided text.
+    Rule engine for bachelor programs like TU Wien Bachelorstudium Informatik (033 521).
+    The curriculum itself (modules, StEOP, focus lists, limits) comes from a compiled
+    Curriculum; see services/curriculum_compiler.
 
     Key fixes vs your version:
       - StEOP: compute BOTH done-based completion (for gating) and planned+done progress (for UI),
@@ -25,31 +247,35 @@ class RuleChecker:
       - Pre-StEOP extra: use canonical category (not just incoming) so FWTS/TS are handled correctly.
     """
 
+    # Defaults; a curriculum's ects_total and rules["limits"] override them per instance.
     TOTAL_ECTS = 180.0
     MIN_NARROW_ELECTIVE_MODULES = 7
     TRANSFERABLE_SKILLS_MIN_ECTS = 6.0
-    BACHELORARBEIT_ECTS = 13.0
 
     MAX_ECTS_PER_SEMESTER = 42.0
     RECOMMENDED_ECTS_PER_SEMESTER = 30.0
+    MAX_SEMESTERS = 10  # lanes the auto-scheduler may fill
+
+    # Catalog module category -> module kind (rules["module_kinds"] overrides per module)
+    KIND_BY_CATEGORY = {
+        "mandatory": "mandatory",
+        "core": "narrow_elective",
+        "elective": "broad_elective",
+    }
+    # Module kind -> canonical category of its courses
+    CATEGORY_BY_KIND = {
+        "mandatory": "mandatory",
+        "narrow_elective": "narrow_elective",
+        "broad_elective": "broad_elective",
+        "fwts": "free",
+        "thesis": "thesis",
+    }
 
     # ----------------------------
     # Helpers: normalization/parsing
     # ----------------------------
-    @staticmethod
-    def _norm(text: Optional[str]) -> str:
-        if not text:
-            return ""
-        t = unicodedata.normalize("NFKD", str(text))
-        t = "".join(ch for ch in t if not unicodedata.combining(ch))
-        t = t.lower().strip()
-        out = []
-        for ch in t:
-            if ch.isalnum() or ch.isspace():
-                out.append(ch)
-            else:
-                out.append(" ")
-        return " ".join("".join(out).split())
+    # Shared, cached folding (accents, case, punctuation); see services/text_norm.
+    _norm = staticmethod(fold_key)
 
     @staticmethod
     def _to_float(x: Any) -> float:
@@ -75,350 +301,144 @@ class RuleChecker:
     # ----------------------------
     # Init curriculum model
     # ----------------------------
-    def __init__(self) -> None:
-        self.program_code = "033 521"
-
+    def __init__(self, curriculum: Curriculum) -> None:
+        """
+        Build the lookup tables from a compiled curriculum: modules and the course ->
+        module mapping come from the catalog, StEOP/focus/limits from curriculum.rules.
+        """
+        rules = curriculum.rules
+        self.curriculum = curriculum
+        self.program_code = curriculum.program_code
+
+        limits = rules.get("limits") or {}
+        self.TOTAL_ECTS = float(curriculum.ects_total or self.TOTAL_ECTS)
+        self.MIN_NARROW_ELECTIVE_MODULES = int(limits.get("min_narrow_elective_modules", self.MIN_NARROW_ELECTIVE_MODULES))
+        self.TRANSFERABLE_SKILLS_MIN_ECTS = float(limits.get("transferable_skills_min_ects", self.TRANSFERABLE_SKILLS_MIN_ECTS))
+        self.MAX_ECTS_PER_SEMESTER = float(limits.get("max_ects_per_semester", self.MAX_ECTS_PER_SEMESTER))
+        self.RECOMMENDED_ECTS_PER_SEMESTER = float(
+            limits.get("recommended_ects_per_semester", self.RECOMMENDED_ECTS_PER_SEMESTER)
+        )
+        self.MAX_SEMESTERS = int(limits.get("max_semesters", self.MAX_SEMESTERS))
+
+        # Exam subject code (e.g. "ap") -> normalized name
         self.exam_subject_aliases: Dict[str, str] = {
-            "ap": "algorithmen und programmierung",
-            "cs": "computersysteme",
-            "cgvc": "computergraphik und visual computing",
-            "hcc": "human centered computing",
-            "ie": "information engineering",
-            "log": "logik",
-            "mi": "medizinische informatik",
-            "sec": "security",
-            "stw": "strukturwissenschaften",
-            "se": "software engineering",
-            "ti": "theoretische informatik",
-            "fwts": "freie wahlfacher und transferable skills",
-            "thesis": "bachelorarbeit",
+            self._norm(code): self._norm(name) for code, name in curriculum.exam_subjects if code
         }
 
-        self.modules: Dict[str, Dict[str, Any]] = {}
-
-        def add_module(
-            title: str,
-            ects: float,
-            kind: str,
-            exam_subject: Optional[str] = None,
-            min_ects: Optional[float] = None,
-        ) -> None:
-            key = self._norm(title)
-            self.modules[key] = {
-                "title": title,
-                "ects": float(ects),
-                "min_ects": float(min_ects) if min_ects is not None else None,
-                "kind": kind,
-                "examSubject": exam_subject,
-            }
-
-        # Pflichtmodule
-        add_module("Algorithmen und Datenstrukturen", 8.0, "mandatory", "Algorithmen und Programmierung")
-        add_module("Einführung in die Programmierung", 9.5, "mandatory", "Algorithmen und Programmierung")
-        add_module("Programmierparadigmen", 6.0, "mandatory", "Algorithmen und Programmierung")
-        add_module("Grundzüge digitaler Systeme", 6.0, "mandatory", "Computersysteme")
-        add_module("Denkweisen der Informatik", 6.5, "mandatory", "Human-Centered Computing")
-        add_module("Datenbanksysteme", 6.0, "mandatory", "Information Engineering")
-        add_module("Einführung in Security", 6.0, "mandatory", "Security")
-        add_module("Algebra und Diskrete Mathematik", 9.0, "mandatory", "Strukturwissenschaften")
-        add_module("Analysis", 6.0, "mandatory", "Strukturwissenschaften")
-        add_module("Mathematisches Arbeiten", 2.0, "mandatory", "Strukturwissenschaften")
-        add_module("Statistik und Wahrscheinlichkeitstheorie", 6.0, "mandatory", "Strukturwissenschaften")
-        add_module("Theoretische Informatik", 6.0, "mandatory", "Theoretische Informatik")
-
-        add_module("Bachelorarbeit", 13.0, "thesis", "Bachelorarbeit")
-        add_module("Freie Wahlfächer und Transferable Skills", 18.0, "fwts", "Freie Wahlfächer und Transferable Skills")
-
-        # Wahlmodule der engen Wahl (+)
-        narrow = [
-            ("Betriebssysteme", 6.0, "Computersysteme"),
-            ("Computersysteme", 6.0, "Computersysteme"),
-            ("Einführung in Visual Computing", 6.0, "Computergraphik und Visual Computing"),
-            ("Interface und Interaction Design", 6.0, "Human-Centered Computing"),
-            ("Einführung in Artificial Intelligence", 6.0, "Logik"),
-            ("Logic and Reasoning in Computer Science", 6.0, "Logik"),
-            ("Daten- und Informatikrecht", 6.0, "Security"),
-            ("Software Engineering", 6.0, "Software Engineering"),
-            ("Software Engineering Projekt", 6.0, "Software Engineering"),
-            ("Verteilte Systeme", 6.0, "Software Engineering"),
-        ]
-        for t, e, es in narrow:
-            add_module(t, e, "narrow_elective", es)
-
-        # Broad electives needed for focus rules (default 6 unless specified)
-        broad_for_focus = [
-            "Einführung in Machine Learning",
-            "Attacks and Defenses in Computer Security",
-            "Foundations of System and Application Security",
-            "Privacy-Enhancing Technologies",
-            "Programm- und Systemverifikation",
-            "Software-Qualitätssicherung",
-            "Argumentieren und Beweisen",
-            "Deklaratives Problemlösen",
-            "Eﬀiziente Algorithmen",
-            "Effiziente Algorithmen",  # accept spelled-out ligature variant
-            "Introduction to Cryptography",
-            "Einführung in Quantencomputing",
-            "Logik für Wissensrepräsentation",
-            "Logik und Grundlagen der Mathematik",
-            "Multimedia",
-            "Programmiertechniken für Visual Computing",
-            "Grundlagen der Computergraphik",
-            "Grundlagen der Computer Vision",
-            "Grundlagen der Visualisierung",
-            "Semistrukturierte Daten",
-            "Übersetzerbau",
-            "Usability Engineering and Mobile Interaction",
-            "Web Engineering",
-            "Parallel Computing",
-            "Einführung in wissensbasierte Systeme",
-            "Einführung in Information Retrieval",
-            "Menschzentrierte Künstliche Intelligenz",
-            "Sozio-technische Systeme",
-            "Access Computing",
-            "Design und Fertigung",
-            "Human Augmentation",
-            "Methods for Data Generation and Analytics in Medicine and Life Sciences",
-            "Bio-Medical Visualization and Visual Analytics",
-            "Design und Entwicklung von Anwendungen im Gesundheitswesen",
-            "Informationssysteme des Gesundheitswesens",
-            "Datenanalyse",
-            "Methoden der Angewandten Statistik",
-            "Computational Statistics",
-            "Multivariate Statistik",
-            "Numerical Computation",
-        ]
-        for t in broad_for_focus:
-            if self._norm(t) == self._norm("Computational Statistics"):
-                add_module("Computational Statistics", 6.0, "broad_elective", "Strukturwissenschaften", min_ects=6.0)
-            else:
-                add_module(t, 6.0, "broad_elective", None)
-
-        # Special ECTS cases
-        add_module("Zuverlässige Echtzeitsysteme", 5.0, "broad_elective", "Computersysteme", min_ects=5.0)
-
         # ----------------------------
-        # Course-to-module mapping
+        # Modules and course-to-module mapping (catalog)
         # ----------------------------
+        module_kinds = {self._norm(k): v for k, v in (rules.get("module_kinds") or {}).items()}
+        self.modules: Dict[str, Dict[str, Any]] = {}
         self.course_to_module: Dict[str, str] = {}
-
-        def map_course_to_module(course_title_or_code: str, module_title: str) -> None:
-            self.course_to_module[self._norm(course_title_or_code)] = module_title
-        def map_codes(module_title: str, *codes: str) -> None:
-            for code in codes:
-                map_course_to_module(code, module_title)
-
-        # EIDI split
-        map_course_to_module("Einführung in die Programmierung 1", "Einführung in die Programmierung")
-        map_course_to_module("Einführung in die Programmierung 2", "Einführung in die Programmierung")
-        map_course_to_module("EIDI1-VU", "Einführung in die Programmierung")
-        map_course_to_module("EIDI2-VU", "Einführung in die Programmierung")
-
-        # Orientation: keep module mapping for ECTS, BUT StEOP checks it by course code/title.
-        map_course_to_module("Orientierung Informatik und Wirtschaftsinformatik", "Denkweisen der Informatik")
-        map_course_to_module("ORI-VU", "Denkweisen der Informatik")
-        map_course_to_module("DWI-VU", "Denkweisen der Informatik")
-
-        # Algebra/Analysis variants
-        for c in ["ADM-VO", "ADM-UE", "ADM-VU"]:
-            map_course_to_module(c, "Algebra und Diskrete Mathematik")
-        for c in ["ANL-VO", "ANL-UE", "ANL-VU"]:
-            map_course_to_module(c, "Analysis")
-        for c in ["SWT-VO", "SWT-UE", "SWT-VU"]:
-            map_course_to_module(c, "Statistik und Wahrscheinlichkeitstheorie")
-
-        # Thesis split
-        map_course_to_module("BA-PR", "Bachelorarbeit")
-        map_course_to_module("WISS-SE", "Bachelorarbeit")
-        map_course_to_module("Bachelorarbeit für Informatik und Wirtschaftsinformatik", "Bachelorarbeit")
-        map_course_to_module("Wissenschaftliches Arbeiten", "Bachelorarbeit")
-
-        # DB course-code mapping (from 003_bachelorcatalog.sql) to keep code usage consistent
-        map_codes("Effiziente Algorithmen", "EA-VU")
-        map_codes("Funktionale Programmierung", "FP-VU")
-        map_codes("Logikprogrammierung und Constraints", "LPC-VU")
-        map_codes("Abstrakte Maschinen", "AM-VU")
-        map_codes("Parallel Computing", "PC-VU")
-        map_codes("Übersetzerbau", "UB-VU")
-        map_codes("Zuverlässige Echtzeitsysteme", "RTS-VO", "DSYS-VU")
-        map_codes("Audio and Video Production", "AVP-VU")
-        map_codes("Computermusik", "CMUS-VU")
-        map_codes("Creative Media Production", "CMP-VU")
-        map_codes("Grundlagen der Computergraphik", "GCG-VU")
-        map_codes("Grundlagen der Computer Vision", "GCV-VU")
-        map_codes("Grundlagen der Visualisierung", "GVIS-VU")
-        map_codes("Multimedia", "MM-VU")
-        map_codes("Programmiertechniken für Visual Computing", "PTVC-PR")
-        map_codes("Access Computing", "ACC-VU")
-        map_codes("Design und Fertigung", "DUF-VU")
-        map_codes("Menschzentrierte Künstliche Intelligenz", "MKAI-VU")
-        map_codes("Sozio-technische Systeme", "STS-VU")
-        map_codes("Usability Engineering and Mobile Interaction", "UEMI-VU")
-        map_codes("Einführung in wissensbasierte Systeme", "EWS-VU")
-        map_codes("Einführung in Information Retrieval", "IR-VU")
-        map_codes("Semistrukturierte Daten", "SSD-VU")
-        map_codes("Web Engineering", "WEBE-VU")
-        map_codes("Argumentieren und Beweisen", "AUB-VU")
-        map_codes("Deklaratives Problemlösen", "DPR-VU")
-        map_codes("Einführung in Machine Learning", "EML-VU")
-        map_codes("Logik und Grundlagen der Mathematik", "LGM-VO", "LGM-UE")
-        map_codes("Logik für Wissensrepräsentation", "LWR-VU")
-        map_codes("Bio-Medical Visualization and Visual Analytics", "BMVVA-VU")
-        map_codes("Design und Entwicklung von Anwendungen im Gesundheitswesen", "DEAG-VU")
-        map_codes("Human Augmentation", "HAUG-VU")
-        map_codes("Informationssysteme des Gesundheitswesens", "ISG-VU")
-        map_codes("Methods for Data Generation and Analytics in Medicine and Life Sciences", "MDGAM-VU")
-        map_codes("Attacks and Defenses in Computer Security", "ADCS-UE")
-        map_codes("Foundations of System and Application Security", "FSAS-VU")
-        map_codes("Privacy-Enhancing Technologies", "PET-VU")
-        map_codes("Computational Statistics", "CSTAT-VU", "SCOMP-VU", "SIM-VU")
-        map_codes("Datenanalyse", "DA-VU")
-        map_codes("Methoden der Angewandten Statistik", "MAS-VO", "MAS-UE")
-        map_codes("Multivariate Statistik", "MVS-VO", "MVS-UE")
-        map_codes("Numerical Computation", "NUMC-VU")
-        map_codes("Programm- und Systemverifikation", "PSV-VU")
-        map_codes("Software-Qualitätssicherung", "SQS-VU")
-        map_codes("Introduction to Cryptography", "ITC-VU")
-        map_codes("Einführung in Quantencomputing", "EQC-VU")
+        for m in curriculum.modules:
+            key = self._norm(m.name)
+            self.modules.setdefault(key, {
+                "title": m.name,
+                "ects": m.ects,
+                "kind": module_kinds.get(key) or self.KIND_BY_CATEGORY.get(m.category, "broad_elective"),
+                "examSubject": m.exam_subject or None,
+            })
+            for code, title, _ in m.courses:
+                for value in (code, title):
+                    if value:
+                        self.course_to_module.setdefault(self._norm(value), m.name)
+
+        # Course codes/titles the catalog does not list (old LV codes, split courses)
+        for module_title, aliases in (rules.get("course_aliases") or {}).items():
+            for alias in aliases:
+                self.course_to_module[self._norm(alias)] = module_title
+
+        self.thesis_module_keys: Set[str] = {k for k, m in self.modules.items() if m["kind"] == "thesis"}
+        self.thesis_course_keys: Set[str] = {
+            k for k, title in self.course_to_module.items() if self._norm(title) in self.thesis_module_keys
+        }
+        self.fwts_module_keys: Set[str] = {k for k, m in self.modules.items() if m["kind"] == "fwts"}
+        self.thesis_ects = sum(self.modules[k]["ects"] for k in self.thesis_module_keys)
 
         # ----------------------------
         # StEOP definition (LV-level!)
         # ----------------------------
-        # Mandatory StEOP LVs:
-        self.steop_mandatory_lv_keys: Dict[str, float] = {
-            self._norm("Einführung in die Programmierung 1"): 5.5,
-            self._norm("EIDI1-VU"): 5.5,
-            self._norm("Mathematisches Arbeiten für Informatik und Wirtschaftsinformatik 1"): 2.0,
-            self._norm("Mathematisches Arbeiten"): 2.0,
-            self._norm("MA-VU"): 2.0,
-            self._norm("Orientierung Informatik und Wirtschaftsinformatik"): 1.0,
-            self._norm("ORI-VU"): 1.0,
+        steop = rules.get("steop") or {}
+        # Mandatory StEOP LVs: (tag, label, ects) and course code/title -> tag
+        self.steop_mandatory: List[Tuple[str, str, float]] = [
+            (e["tag"], e["label"], float(e["ects"])) for e in steop.get("mandatory", [])
+        ]
+        self.steop_mandatory_tags: Dict[str, str] = {
+            self._norm(course): e["tag"] for e in steop.get("mandatory", []) for course in e["courses"]
         }
+        self.steop_required_tags = frozenset(tag for tag, _, _ in self.steop_mandatory)
 
-        # Pool LVs / modules (>= 8 ECTS)
+        # Pool LVs / modules (>= min_ects)
+        pool = steop.get("pool") or {}
+        self.steop_pool_min_ects = float(pool.get("min_ects", 0.0))
+        self.steop_pool_label = pool.get("label") or ", ".join(pool.get("modules", []))
         self.steop_pool_keys: Set[str] = {
-            self._norm("Algebra und Diskrete Mathematik"),
-            self._norm("Analysis"),
-            self._norm("Denkweisen der Informatik"),
-            self._norm("Grundzüge digitaler Systeme"),
-            # allow LV codes
-            self._norm("ADM-VO"), self._norm("ADM-UE"), self._norm("ADM-VU"),
-            self._norm("ANL-VO"), self._norm("ANL-UE"), self._norm("ANL-VU"),
-            self._norm("DWI-VU"),
-            self._norm("GDS-VU"),
+            self._norm(v) for v in [*pool.get("modules", []), *pool.get("courses", [])]
         }
 
         # Allowed extra BEFORE StEOP completion (§7) – besides FWTS
         self.allowed_before_steop_extra: Set[str] = {
-            self._norm("Algorithmen und Datenstrukturen"),
-            self._norm("Datenbanksysteme"),
-            self._norm("Daten- und Informatikrecht"),
-            self._norm("Einführung in die Programmierung 2"),
-            self._norm("Einführung in Visual Computing"),
-            # DB-ish codes
-            self._norm("AD-VU"),
-            self._norm("DBS-VU"),
-            self._norm("DIR-VU"),
-            self._norm("EIDI2-VU"),
-            self._norm("EVC-VU"),
+            self._norm(v) for v in steop.get("allowed_before_completion", [])
         }
+        self.steop_max_ects_before = float(steop.get("max_ects_before_completion", 0.0))
+        # Module -> StEOP tags of its LVs; a module-level plan item stands for all of them
+        self.module_steop_tags: Dict[str, frozenset] = {}
+        for m in curriculum.modules:
+            tags = {
+                self.steop_mandatory_tags[k]
+                for code, title, _ in m.courses for k in (self._norm(code), self._norm(title))
+                if k in self.steop_mandatory_tags
+            }
+            if tags:
+                self.module_steop_tags.setdefault(self._norm(m.name), frozenset(tags))
 
         # ----------------------------
         # Focus (Vertiefung) definitions
         # ----------------------------
         self.focuses: Dict[str, Dict[str, Any]] = {
-            self._norm("Artificial Intelligence und Machine Learning"): {
-                "required": ["Einführung in Artificial Intelligence", "Einführung in Machine Learning"],
-                "choose": {"min": 4, "from": [
-                    "Datenanalyse", "Deklaratives Problemlösen", "Effiziente Algorithmen",
-                    "Einführung in Information Retrieval", "Einführung in wissensbasierte Systeme",
-                    "Logikprogrammierung und Constraints", "Menschzentrierte Künstliche Intelligenz",
-                    "Methoden der Angewandten Statistik", "Grundlagen der Visualisierung",
-                ]},
-            },
-            self._norm("Cybersecurity"): {
-                "choose_groups": [
-                    {"min": 2, "from": ["Betriebssysteme", "Einführung in Artificial Intelligence", "Logic and Reasoning in Computer Science", "Verteilte Systeme"]},
-                    {"min": 4, "from": ["Attacks and Defenses in Computer Security", "Foundations of System and Application Security",
-                                        "Introduction to Cryptography", "Privacy-Enhancing Technologies", "Programm- und Systemverifikation"]},
-                ]
-            },
-            self._norm("Digital Health"): {
-                "required": ["Daten- und Informatikrecht", "Einführung in Visual Computing", "Interface und Interaction Design", "Software Engineering",
-                             "Methods for Data Generation and Analytics in Medicine and Life Sciences"],
-                "choose": {"min": 4, "from": [
-                    "Bio-Medical Visualization and Visual Analytics", "Datenanalyse", "Design und Fertigung",
-                    "Design und Entwicklung von Anwendungen im Gesundheitswesen", "Einführung in Machine Learning",
-                    "Grundlagen der Computer Vision", "Human Augmentation", "Informationssysteme des Gesundheitswesens",
-                    "Privacy-Enhancing Technologies", "Sozio-technische Systeme", "Grundlagen der Visualisierung",
-                ]},
-            },
-            self._norm("Human-Centered Computing"): {
-                "required": ["Einführung in Visual Computing", "Interface und Interaction Design", "Software Engineering"],
-                "choose": {"min": 4, "from": [
-                    "Access Computing", "Daten- und Informatikrecht", "Design und Fertigung",
-                    "Human Augmentation", "Menschzentrierte Künstliche Intelligenz", "Sozio-technische Systeme",
-                ]},
-            },
-            self._norm("Software Engineering"): {
-                "required": ["Interface und Interaction Design", "Software Engineering", "Software Engineering Projekt", "Verteilte Systeme", "Software-Qualitätssicherung"],
-                "choose": {"min": 4, "from": [
-                    "Einführung in wissensbasierte Systeme", "Funktionale Programmierung", "Logikprogrammierung und Constraints",
-                    "Parallel Computing", "Programm- und Systemverifikation", "Semistrukturierte Daten", "Übersetzerbau",
-                    "Usability Engineering and Mobile Interaction", "Web Engineering",
-                ]},
-            },
-            self._norm("Theoretische Informatik und Logik"): {
-                "required": ["Logic and Reasoning in Computer Science"],
-                "choose": {"min": 5, "from": [
-                    "Argumentieren und Beweisen", "Deklaratives Problemlösen", "Effiziente Algorithmen",
-                    "Introduction to Cryptography", "Einführung in Quantencomputing", "Logik für Wissensrepräsentation",
-                    "Logik und Grundlagen der Mathematik", "Programm- und Systemverifikation",
-                ]},
-            },
-            self._norm("Visual Computing"): {
-                "required": ["Einführung in Visual Computing", "Software Engineering", "Grundlagen der Computergraphik", "Grundlagen der Computer Vision"],
-                "choose": {"min": 3, "from": ["Multimedia", "Programmiertechniken für Visual Computing", "Grundlagen der Visualisierung"]},
-            },
+            self._norm(name): spec for name, spec in (rules.get("focuses") or {}).items()
         }
 
         # Focus aliases (robust UI input)
         self.focus_aliases: Dict[str, str] = {
-            self._norm("ai"): self._norm("Artificial Intelligence und Machine Learning"),
-            self._norm("ml"): self._norm("Artificial Intelligence und Machine Learning"),
-            self._norm("aiml"): self._norm("Artificial Intelligence und Machine Learning"),
-            self._norm("ai ml"): self._norm("Artificial Intelligence und Machine Learning"),
-            self._norm("artificial intelligence"): self._norm("Artificial Intelligence und Machine Learning"),
-            self._norm("machine learning"): self._norm("Artificial Intelligence und Machine Learning"),
-
-            self._norm("cyber"): self._norm("Cybersecurity"),
-            self._norm("security"): self._norm("Cybersecurity"),
-            self._norm("cybersecurity"): self._norm("Cybersecurity"),
-
-            self._norm("digital health"): self._norm("Digital Health"),
-            self._norm("dh"): self._norm("Digital Health"),
-
-            self._norm("hcc"): self._norm("Human-Centered Computing"),
-            self._norm("human centered computing"): self._norm("Human-Centered Computing"),
-            self._norm("human-centered computing"): self._norm("Human-Centered Computing"),
-
-            self._norm("se"): self._norm("Software Engineering"),
-            self._norm("software engineering"): self._norm("Software Engineering"),
-
-            self._norm("til"): self._norm("Theoretische Informatik und Logik"),
-            self._norm("theory"): self._norm("Theoretische Informatik und Logik"),
-            self._norm("theoretische informatik"): self._norm("Theoretische Informatik und Logik"),
-            self._norm("logik"): self._norm("Theoretische Informatik und Logik"),
-
-            self._norm("vc"): self._norm("Visual Computing"),
-            self._norm("visual computing"): self._norm("Visual Computing"),
+            self._norm(alias): self._norm(name) for alias, name in (rules.get("focus_aliases") or {}).items()
         }
 
+        # Dense module ids: module_bits[key] is the module's bit in a completed-modules mask.
+        # Focus titles missing from the catalog get bits too (they are never complete).
+        self.module_bits: Dict[str, int] = {k: 1 << i for i, k in enumerate(self.modules)}
+
+        def group(titles: List[str], need: int) -> FocusGroup:
+            items = []
+            for t in titles:
+                key = self._norm(t)
+                if key not in self.module_bits:
+                    self.module_bits[key] = 1 << len(self.module_bits)
+                items.append((t, self.module_bits[key]))
+            mask = 0
+            for _, b in items:
+                mask |= b
+            return FocusGroup(mask=mask, min=need, items=tuple(items))
+
+        self.focus_masks: Dict[str, FocusMask] = {}
+        for name, spec in (rules.get("focuses") or {}).items():
+            required = list(spec.get("required", []))
+            choose = spec.get("choose")
+            self.focus_masks[self._norm(name)] = FocusMask(
+                key=self._norm(name),
+                name=name,
+                required=group(required, len(required)),
+                choose=group(choose["from"], int(choose["min"])) if choose else None,
+                groups=tuple(group(g["from"], int(g["min"])) for g in spec.get("choose_groups", [])),
+            )
+
         # Soft prerequisite suggestions (warnings only)
         self.soft_prereqs: List[Tuple[str, str]] = [
-            ("Einführung in die Programmierung 1", "Einführung in die Programmierung 2"),
-            ("Software Engineering", "Software Engineering Projekt"),
+            (prereq, target) for prereq, target in (rules.get("soft_prereqs") or [])
         ]
+        # ... plus the catalog's; raises PrerequisiteCycle on a cycle
+        self.prereq_graph = PrereqGraph(self.soft_prereqs + list(curriculum.prerequisites), self._norm)
 
     # ----------------------------
     # Internal: canonicalization
@@ -484,13 +504,7 @@ class RuleChecker:
         if kind is None:
             return incoming
 
-        expected = {
-            "mandatory": "mandatory",
-            "narrow_elective": "narrow_elective",
-            "broad_elective": "broad_elective",
-            "fwts": "free",
-            "thesis": "thesis",
-        }.get(kind, incoming)
+        expected = self.CATEGORY_BY_KIND.get(kind, incoming)
 
         if incoming != expected:
             code = self._course_code(course)
@@ -521,45 +535,149 @@ class RuleChecker:
         return out
 
     # ----------------------------
-    # StEOP helpers (LV-level)
+    # Pre-StEOP helpers
     # ----------------------------
-    def _steop_mandatory_tag(self, course: dict[str, Any]) -> Optional[str]:
-        """
-        Identify the 3 mandatory StEOP LVs by LV code/title (not module mapping).
-        """
-        k = self._norm(self._course_code(course))
-        if k in (self._norm("Einführung in die Programmierung 1"), self._norm("EIDI1-VU")):
-            return "eidi1"
-        if k in (self._norm("Mathematisches Arbeiten"), self._norm("Mathematisches Arbeiten für Informatik und Wirtschaftsinformatik 1"), self._norm("MA-VU")):
-            return "ma"
-        if k in (self._norm("Orientierung Informatik und Wirtschaftsinformatik"), self._norm("ORI-VU")):
-            return "ori"
-        return None
+    def _is_fwts_like(self, canonical_cat: str, module_key: str) -> bool:
+        if canonical_cat in ("free", "transferable_skills"):
+            return True
+        return module_key in self.fwts_module_keys
 
-    def _is_steop_pool_item(self, course: dict[str, Any]) -> bool:
-        code_k = self._norm(self._course_code(course))
-        mod_k = self._norm(self._infer_module_title(course))
-        return (code_k in self.steop_pool_keys) or (mod_k in self.steop_pool_keys)
 
-    def _is_steop_any_item(self, course: dict[str, Any]) -> bool:
-        # mandatory LVs OR pool
-        if self._steop_mandatory_tag(course) is not None:
-            return True
-        return self._is_steop_pool_item(course)
+    # ----------------------------
+    # Per-course records (shared by full and incremental evaluation)
+    # ----------------------------
+    def plan_items(self, payload: dict[str, Any]) -> List[Tuple[dict[str, Any], str, int]]:
+        return [(c, s, self._lane_index_of(c, fallback=0)) for c, s in self._extract_courses(payload)]
 
-    def _is_fwts_like(self, canonical_cat: str, module_title: str) -> bool:
-        if canonical_cat in ("free", "transferable_skills"):
-            return True
-        return self._norm(module_title) == self._norm("Freie Wahlfächer und Transferable Skills")
+    def course_key(self, course: dict[str, Any]) -> str:
+        return self._course_code(course)
+
+    @staticmethod
+    def course_signature(course: dict[str, Any], status: str, lane: int) -> Tuple[Any, ...]:
+        # Everything _parse_course reads from a course; equal signatures parse identically.
+        mod = course.get("module")
+        return (
+            status,
+            lane,
+            course.get("code"),
+            course.get("name"),
+            course.get("title"),
+            course.get("ects"),
+            course.get("category"),
+            course.get("examSubject"),
+            mod.get("title") if isinstance(mod, dict) else None,
+        )
+
+    def parse_course(self, course: dict[str, Any], status: str, lane: int) -> CourseRecord:
+        code = self._course_code(course)
+        code_key = self._norm(code)
+
+        try:
+            ects: Optional[float] = self._to_float(course.get("ects"))
+        except Exception:
+            ects = None
+
+        error: Optional[str] = None
+        if not code:
+            error = "rejected: a course is missing 'code'"
+        elif ects is None:
+            error = f"rejected: invalid ects for '{code}'"
+        elif ects <= 0 or ects > 60:
+            error = f"rejected: implausible ects={ects} for '{code}'"
+
+        module_title = self._infer_module_title(course)
+        module_key = self._norm(module_title)
+        hints: List[str] = []
+        canonical_cat = self._canonical_category(course, module_title, hints)
+
+        subj = self._canonical_exam_subject(course.get("examSubject") or "")
+        # StEOP membership is identified at LV level (code/title), the pool also by module
+        steop_tag = self.steop_mandatory_tags.get(code_key)
+        steop_pool = code_key in self.steop_pool_keys or module_key in self.steop_pool_keys
+
+        return CourseRecord(
+            code=code,
+            code_key=code_key,
+            status=status,
+            lane=lane,
+            ects=ects,
+            ects_raw=course.get("ects"),
+            error=error,
+            counted=error is None,
+            module_title=module_title,
+            module_key=module_key,
+            category=canonical_cat,
+            category_hint=hints[0] if hints else None,
+            subj_key=self._norm(subj) or "(none)",
+            steop_tag=steop_tag,
+            steop_pool=steop_pool,
+            steop_any=steop_tag is not None or steop_pool,
+            allowed_before_steop=code_key in self.allowed_before_steop_extra
+            or self._is_fwts_like(canonical_cat, module_key),
+            thesis=module_key in self.thesis_module_keys or code_key in self.thesis_course_keys,
+            order=0,
+        )
+
+    def parse_item(self, course: dict[str, Any], status: str, lane: int) -> CourseRecord:
+        return self.parse_course(course, status, lane)
 
     # ----------------------------
     # Evaluate
     # ----------------------------
     def evaluate(self, payload: dict[str, Any]) -> RuleCheckResult:
-        warnings: List[str] = []
-        errors: List[str] = []
-        missing: List[str] = []
+        records = [self.parse_course(c, s, li) for c, s, li in self.plan_items(payload)]
+        timer = phase_timing.active()
+        if timer is not None:
+            timer.lap("parse")
+        return self.evaluate_records(payload, records)[0]
+
+    def evaluate_records(
+        self, payload: dict[str, Any], records: List[CourseRecord]
+    ) -> Tuple[RuleCheckResult, Optional[PlanState]]:
+        """
+        Full evaluation of parsed records (in payload order). Also returns the built
+        PlanState when it is clean enough to be updated incrementally afterwards.
+        """
+        rejected = self._check_program(payload)
+        if rejected is not None:
+            return rejected, None
 
+        errors: List[str] = []
+        seen: Dict[str, str] = {}
+        state = PlanState()
+        clean = True
+
+        for order, rec in enumerate(records):
+            rec.order = order
+            code = rec.code
+            if code:
+                code_key = rec.code_key
+                if code_key in seen:
+                    errors.append(f"rejected: duplicate course '{code}' (already present as '{seen[code_key]}').")
+                else:
+                    seen[code_key] = code
+            if rec.error:
+                errors.append(rec.error)
+            if rec.ects is None:
+                # same failure as summing the plan's ECTS with an unparsable value
+                self._to_float(rec.ects_raw)
+            clean = clean and not errors and exact_ects(rec.ects)
+            state.add(rec)
+
+        timer = phase_timing.active()
+        if timer is not None:
+            timer.lap("aggregate")
+        result = self._evaluate_state(state, payload, errors)
+        return result, (state if clean else None)
+
+    def evaluate_state(self, state: PlanState, payload: dict[str, Any]) -> RuleCheckResult:
+        """Evaluate an incrementally maintained, clean PlanState."""
+        rejected = self._check_program(payload)
+        if rejected is not None:
+            return rejected
+        return self._evaluate_state(state, payload, [])
+
+    def _check_program(self, payload: dict[str, Any]) -> Optional[RuleCheckResult]:
         program = str(payload.get("programCode") or "").strip()
         if program and program != self.program_code:
             return RuleCheckResult(
@@ -568,248 +686,158 @@ class RuleChecker:
                 stats={"programCode": program, "expectedProgramCode": self.program_code},
                 missing=[],
             )
+        return None
 
-        items = self._extract_courses(payload)
-        if not items:
-            # Continue with empty items so dashboard sections (StEOP, narrow electives, etc.)
-            # are still fully populated on initial load.
-            warnings.append("No courses in plan.")
-
-        seen: Dict[str, str] = {}
-        lane_ects: Dict[int, float] = {}
-
-        mod_done: Dict[str, float] = {}
-        mod_planned: Dict[str, float] = {}
-        mod_all: Dict[str, float] = {}
-
-        cat_ects: Dict[str, float] = {}
-        subj_ects: Dict[str, float] = {}
-
-        earliest_lane_for_course: Dict[str, int] = {}
-        earliest_lane_for_module: Dict[str, int] = {}
+    def _overload_errors(self, state: PlanState) -> List[str]:
+        return [
+            f"rejected: semester {li+1} exceeds max load ({s:.1f} ECTS > {self.MAX_ECTS_PER_SEMESTER:.1f})."
+            for li, s in sorted(state.lane_ects.items())
+            if s > self.MAX_ECTS_PER_SEMESTER + 1e-6
+        ]
 
-        # Store per-course canonical category (used later for StEOP pre-check)
-        per_course_canonical_cat: Dict[str, str] = {}
-        per_course_module_title: Dict[str, str] = {}
+    def _gating_errors(
+        self, state: PlanState, steop_complete_lane_done: Optional[int], non_steop_before: List[Tuple[int, float]]
+    ) -> List[str]:
+        """Pre-StEOP and Bachelorarbeit rejections, given state.steop_prefix()."""
+        errors: List[str] = []
+        # -----------------------------------------
+        # Pre-StEOP rule: before DONE StEOP completion:
+        #   - max steop_max_ects_before ECTS outside StEOP (DONE)
+        #   - only allowed extra list + FWTS/TS
+        # -----------------------------------------
+        non_steop_ects_before = non_steop_before[-1][1] if non_steop_before else 0.0
+        illegal_non_steop: List[str] = []
 
-        # Parse all courses
-        for course, status in items:
-            code = self._course_code(course)
-            if not code:
-                errors.append("rejected: a course is missing 'code'")
-                continue
+        for li, _ in non_steop_before:
+            for rec in sorted(state.non_steop_done_by_lane.get(li, {}).values(), key=lambda r: r.order):
+                if not rec.allowed_before_steop:
+                    illegal_non_steop.append(f"{rec.code} (Semester {li+1})")
 
-            code_key = self._norm(code)
-            if code_key in seen:
-                errors.append(f"rejected: duplicate course '{code}' (already present as '{seen[code_key]}').")
-            else:
-                seen[code_key] = code
-
-            try:
-                ects = self._to_float(course.get("ects"))
-            except Exception:
-                errors.append(f"rejected: invalid ects for '{code}'")
-                continue
+        if non_steop_ects_before > self.steop_max_ects_before + 1e-6:
+            errors.append(
+                f"rejected: before completing StEOP, {non_steop_ects_before:.1f} ECTS outside StEOP are DONE (max {self.steop_max_ects_before:g})."
+            )
+        if illegal_non_steop:
+            errors.append(
+                "rejected: before completing StEOP you marked DONE courses that are not allowed: "
+                + ", ".join(illegal_non_steop)
+            )
 
-            if ects <= 0 or ects > 60:
-                errors.append(f"rejected: implausible ects={ects} for '{code}'")
-                continue
+        # -----------------------------------------
+        # Bachelorarbeit gating: ONLY if thesis is DONE
+        # -----------------------------------------
+        thesis_done_lane = state.thesis_done_lanes.earliest(None)
 
-            li = self._lane_index_of(course, fallback=0)
-            lane_ects[li] = lane_ects.get(li, 0.0) + ects
+        if thesis_done_lane is not None:
+            if steop_complete_lane_done is None:
+                errors.append("rejected: Bachelorarbeit is DONE, but StEOP is not completed (DONE) yet.")
+            elif thesis_done_lane < steop_complete_lane_done:
+                errors.append("rejected: Bachelorarbeit is DONE before StEOP completion.")
+        return errors
 
-            module_title = self._infer_module_title(course)
-            module_key = self._norm(module_title)
-            per_course_module_title[code_key] = module_title
+    def _evaluate_state(self, state: PlanState, payload: dict[str, Any], errors: List[str]) -> RuleCheckResult:
+        timer = phase_timing.active()
+        warnings: List[str] = []
+        missing: List[str] = []
 
-            canonical_cat = self._canonical_category(course, module_title, warnings)
-            per_course_canonical_cat[code_key] = canonical_cat
-            cat_ects[canonical_cat] = cat_ects.get(canonical_cat, 0.0) + ects
+        def in_order(recs: Any) -> List[CourseRecord]:
+            return sorted(recs, key=lambda r: r.order)
 
-            raw_subj = course.get("examSubject") or ""
-            subj = self._canonical_exam_subject(raw_subj)
-            subj_key = self._norm(subj) or "(none)"
-            subj_ects[subj_key] = subj_ects.get(subj_key, 0.0) + ects
+        if not state.records:
+            # Continue with empty items so dashboard sections (StEOP, narrow electives, etc.)
+            # are still fully populated on initial load.
+            warnings.append("No courses in plan.")
 
-            if status == "done":
-                mod_done[module_key] = mod_done.get(module_key, 0.0) + ects
-            else:
-                mod_planned[module_key] = mod_planned.get(module_key, 0.0) + ects
-            mod_all[module_key] = mod_all.get(module_key, 0.0) + ects
+        for rec in in_order(state.hinted.values()):
+            warnings.append(rec.category_hint)
 
-            # earliest lane tracking (for warnings)
-            if code_key not in earliest_lane_for_course or li < earliest_lane_for_course[code_key]:
-                earliest_lane_for_course[code_key] = li
-            if module_key not in earliest_lane_for_module or li < earliest_lane_for_module[module_key]:
-                earliest_lane_for_module[module_key] = li
+        lane_ects = state.lane_ects
+        mod_all = state.mod_all
+        cat_ects = state.cat_ects
 
-        # Per-semester overload check (hard)
+        # Per-semester overload check (hard), reported in semester order
         if not errors:
-            for li, s in lane_ects.items():
-                if s > self.MAX_ECTS_PER_SEMESTER + 1e-6:
-                    errors.append(f"rejected: semester {li+1} exceeds max load ({s:.1f} ECTS > {self.MAX_ECTS_PER_SEMESTER:.1f}).")
+            errors.extend(self._overload_errors(state))
+        if timer is not None:
+            timer.lap("semester_load")
 
         # -----------------------------------------
         # StEOP: compute DONE (for gating) AND DONE+PLANNED (for progress)
         # -----------------------------------------
-        def compute_steop(courses: List[Tuple[dict[str, Any], str]]) -> Dict[str, Any]:
-            tags: Set[str] = set()
-            pool_ects = 0.0
-
-            for c, _status in courses:
-                tag = self._steop_mandatory_tag(c)
-                if tag:
-                    tags.add(tag)
-                if self._is_steop_pool_item(c):
-                    pool_ects += self._to_float(c.get("ects"))
-
-            mandatory_ok = {"eidi1", "ma", "ori"}.issubset(tags)
-            pool_ok = pool_ects >= 8.0 - 1e-6
+        def steop_summary(tags: Any, pool_ects: float) -> Dict[str, Any]:
+            mandatory_ok = self.steop_required_tags.issubset(tags)
+            pool_ok = pool_ects >= self.steop_pool_min_ects - 1e-6
 
             return {
-                "mandatoryPresent": sorted(list(tags)),
+                "mandatoryPresent": sorted(tags),
                 "poolEcts": round(pool_ects, 2),
                 "mandatoryOk": mandatory_ok,
                 "poolOk": pool_ok,
                 "isComplete": bool(mandatory_ok and pool_ok),
             }
 
-        items_done = [(c, s) for (c, s) in items if s == "done"]
-        steop_done = compute_steop(items_done)
-        steop_plan = compute_steop(items)  # done + planned
+        steop_done = steop_summary(set(state.steop_done_tags), state.steop_done_pool)
+        steop_plan = steop_summary(set(state.steop_plan_tags), state.steop_plan_pool)  # done + planned
 
         # --- Add StEOP missing items to RuleCheckResult.missing (only if missed) ---
         if not steop_plan["isComplete"]:
             present = set(steop_plan["mandatoryPresent"])
 
-            if "eidi1" not in present:
-                missing.append("StEOP Pflicht-LV fehlt: Einführung in die Programmierung 1 (5.5 ECTS)")
-            if "ma" not in present:
-                missing.append("StEOP Pflicht-LV fehlt: Mathematisches Arbeiten 1 (2.0 ECTS)")
-            if "ori" not in present:
-                missing.append("StEOP Pflicht-LV fehlt: Orientierung Informatik und Wirtschaftsinformatik (1.0 ECTS)")
+            for tag, label, ects in self.steop_mandatory:
+                if tag not in present:
+                    missing.append(f"StEOP Pflicht-LV fehlt: {label} ({ects:.1f} ECTS)")
 
-            # Pool (>= 8 ECTS) — cannot know “which” exact LVs you want, so report the ECTS gap + pool menu.
-            pool_missing = max(0.0, 8.0 - float(steop_plan["poolEcts"]))
+            # Pool (>= min ECTS) — cannot know “which” exact LVs you want, so report the ECTS gap + pool menu.
+            pool_missing = max(0.0, self.steop_pool_min_ects - float(steop_plan["poolEcts"]))
             if pool_missing > 1e-6:
                 missing.append(
-                    f"StEOP Pool: {pool_missing:.1f} ECTS fehlen (mind. 8 ECTS aus: Algebra & Diskrete Mathematik, Analysis, Denkweisen der Informatik, Grundzüge digitaler Systeme)."
+                    f"StEOP Pool: {pool_missing:.1f} ECTS fehlen (mind. {self.steop_pool_min_ects:g} ECTS aus: {self.steop_pool_label})."
                 )
 
-        # Determine completion lane index for DONE StEOP (earliest lane where done completeness holds)
-        steop_complete_lane_done: Optional[int] = None
-        if items_done:
-            # accumulate by lane
-            by_lane_done: Dict[int, List[dict[str, Any]]] = {}
-            for c, _ in items_done:
-                li = self._lane_index_of(c, 0)
-                by_lane_done.setdefault(li, []).append(c)
-
-            tags: Set[str] = set()
-            pool_ects = 0.0
-            for li in sorted(by_lane_done.keys()):
-                for c in by_lane_done[li]:
-                    tag = self._steop_mandatory_tag(c)
-                    if tag:
-                        tags.add(tag)
-                    if self._is_steop_pool_item(c):
-                        pool_ects += self._to_float(c.get("ects"))
-
-                if {"eidi1", "ma", "ori"}.issubset(tags) and pool_ects >= 8.0 - 1e-6:
-                    steop_complete_lane_done = li
-                    break
-
-        # -----------------------------------------
-        # Pre-StEOP rule: before DONE StEOP completion:
-        #   - max 22 ECTS outside StEOP (DONE)
-        #   - only allowed extra list + FWTS/TS
-        # -----------------------------------------
-        non_steop_ects_before = 0.0
-        illegal_non_steop: List[str] = []
-
-        if items_done:
-            # group done by lane for correct "before completion" semantics
-            by_lane_done: Dict[int, List[dict[str, Any]]] = {}
-            for c, _ in items_done:
-                li = self._lane_index_of(c, 0)
-                by_lane_done.setdefault(li, []).append(c)
-
-            for li in sorted(by_lane_done.keys()):
-                if steop_complete_lane_done is not None and li >= steop_complete_lane_done:
-                    break
-                for c in by_lane_done[li]:
-                    if self._is_steop_any_item(c):
-                        continue
+        # Earliest lane where DONE StEOP is complete, and the DONE load outside StEOP before it
+        steop_complete_lane_done, non_steop_before = state.steop_prefix(
+            self.steop_required_tags, self.steop_pool_min_ects
+        )
+        if timer is not None:
+            timer.lap("steop")
 
-                    ects = self._to_float(c.get("ects"))
-                    non_steop_ects_before += ects
-
-                    code_k = self._norm(self._course_code(c))
-                    module_title = self._infer_module_title(c)
-
-                    # Use canonical category (not incoming)
-                    canonical_cat = self._canonical_category(c, module_title, warnings)
-
-                    if (code_k not in self.allowed_before_steop_extra) and (not self._is_fwts_like(canonical_cat, module_title)):
-                        illegal_non_steop.append(f"{self._course_code(c)} (Semester {li+1})")
-
-        if non_steop_ects_before > 22.0 + 1e-6:
-            errors.append(
-                f"rejected: before completing StEOP, {non_steop_ects_before:.1f} ECTS outside StEOP are DONE (max 22)."
-            )
-        if illegal_non_steop:
-            errors.append(
-                "rejected: before completing StEOP you marked DONE courses that are not allowed: "
-                + ", ".join(illegal_non_steop)
-            )
-
-        # -----------------------------------------
-        # Bachelorarbeit gating: ONLY if thesis is DONE
-        # -----------------------------------------
-        thesis_done_lane: Optional[int] = None
-        if items_done:
-            for c, _ in items_done:
-                mod_title = self._infer_module_title(c)
-                if self._norm(mod_title) == self._norm("Bachelorarbeit") or self._norm(self._course_code(c)) in (self._norm("BA-PR"), self._norm("WISS-SE")):
-                    li = self._lane_index_of(c, 0)
-                    thesis_done_lane = li if thesis_done_lane is None else min(thesis_done_lane, li)
-
-        if thesis_done_lane is not None:
-            if steop_complete_lane_done is None:
-                errors.append("rejected: Bachelorarbeit is DONE, but StEOP is not completed (DONE) yet.")
-            elif thesis_done_lane < steop_complete_lane_done:
-                errors.append("rejected: Bachelorarbeit is DONE before StEOP completion.")
+        non_steop_ects_before = non_steop_before[-1][1] if non_steop_before else 0.0
+        errors.extend(self._gating_errors(state, steop_complete_lane_done, non_steop_before))
+        if timer is not None:
+            timer.lap("gating")
 
         # -----------------------------------------
         # Soft order warnings (fix lane=0 bug)
         # -----------------------------------------
-        for prereq, target in self.soft_prereqs:
-            prereq_k = self._norm(prereq)
-            target_k = self._norm(target)
-
-            prereq_lane = earliest_lane_for_course.get(prereq_k)
-            if prereq_lane is None:
-                prereq_lane = earliest_lane_for_module.get(prereq_k)
-
-            target_lane = earliest_lane_for_course.get(target_k)
-            if target_lane is None:
-                target_lane = earliest_lane_for_module.get(target_k)
-
-            if prereq_lane is not None and target_lane is not None and target_lane < prereq_lane:
+        def earliest(key: str) -> Optional[int]:
+            lane = state.course_lanes.earliest(key)
+            return lane if lane is not None else state.module_lanes.earliest(key)
+
+        for v in self.prereq_graph.validate(earliest):
+            if v.prereq_lane is None:
+                continue  # advisory only: a missing prerequisite is not an ordering issue
+            if v.via:
+                chain = " → ".join(f"'{name}'" for name in (v.prereq, *v.via, v.target))
                 warnings.append(
-                    f"Reihenfolge-Hinweis: '{target}' ist vor '{prereq}' geplant. Das ist erlaubt, aber normalerweise wird '{prereq}' davor empfohlen."
+                    f"Reihenfolge-Hinweis: '{v.target}' ist vor '{v.prereq}' geplant ({chain}). Das ist erlaubt, aber normalerweise wird '{v.prereq}' davor empfohlen."
                 )
+            else:
+                warnings.append(
+                    f"Reihenfolge-Hinweis: '{v.target}' ist vor '{v.prereq}' geplant. Das ist erlaubt, aber normalerweise wird '{v.prereq}' davor empfohlen."
+                )
+        if timer is not None:
+            timer.lap("order")
 
         # ----------------------------
         # Dashboard + missing requirements
         # ----------------------------
-        total_ects = sum(self._to_float(c.get("ects")) for c, _ in items)
+        total_ects = state.total_ects
 
         def required_ects_for_module(module_key: str) -> Optional[float]:
             m = self.modules.get(module_key)
             if not m:
                 return None
-            return float(m["min_ects"] if m["min_ects"] is not None else m["ects"])
+            return float(m["ects"])
 
         def module_is_complete(module_key: str) -> bool:
             req = required_ects_for_module(module_key)
@@ -833,18 +861,21 @@ class RuleChecker:
                     missing.append(f"Pflichtmodul fehlt: {m['title']} ({req - have:.1f} ECTS)")
 
         # Bachelorarbeit missing
-        thesis_key = self._norm("Bachelorarbeit")
-        thesis_have = mod_all.get(thesis_key, 0.0)
-        if thesis_have + 1e-6 < self.BACHELORARBEIT_ECTS:
-            missing.append(f"Bachelorarbeit fehlt: {self.BACHELORARBEIT_ECTS - thesis_have:.1f} ECTS")
+        thesis_have = sum(mod_all.get(k, 0.0) for k in self.thesis_module_keys)
+        if thesis_have + 1e-6 < self.thesis_ects:
+            missing.append(f"Bachelorarbeit fehlt: {self.thesis_ects - thesis_have:.1f} ECTS")
 
-        # Narrow elective count
+        # Narrow elective count (+ the completed-modules mask for the focus checks)
         narrow_completed: List[str] = []
         narrow_all: List[str] = []
+        done_mask = 0
         for mk, m in self.modules.items():
+            complete = module_is_complete(mk)
+            if complete:
+                done_mask |= self.module_bits[mk]
             if m["kind"] == "narrow_elective":
                 narrow_all.append(m["title"])
-                if module_is_complete(mk):
+                if complete:
                     narrow_completed.append(m["title"])
 
         if len(narrow_completed) < self.MIN_NARROW_ELECTIVE_MODULES:
@@ -860,6 +891,8 @@ class RuleChecker:
         # Total ECTS
         if total_ects + 1e-6 < self.TOTAL_ECTS:
             missing.append(f"Gesamtumfang: {self.TOTAL_ECTS - total_ects:.1f} ECTS fehlen bis {self.TOTAL_ECTS:.0f}.")
+        if timer is not None:
+            timer.lap("requirements")
 
         # ----------------------------
         # Focus / Vertiefung progress (robust)
@@ -871,95 +904,75 @@ class RuleChecker:
         focus_stats: Dict[str, Any] = {"selected": focus_raw, "recognized": False}
         focus_missing: List[str] = []
 
-        if focus_key:
-            f = self.focuses.get(focus_key)
-            if f:
-                focus_stats["recognized"] = True
-                focus_stats["canonicalName"] = self.modules.get(focus_key, {}).get("title") or None
-
-                completed_modules: Set[str] = set()
-                for mk, m in self.modules.items():
-                    if module_is_complete(mk):
-                        completed_modules.add(self._norm(m["title"]))
-
-                def count_completed(from_list: List[str]) -> int:
-                    return sum(1 for t in from_list if self._norm(t) in completed_modules)
-
-                req_list = f.get("required", [])
-                for t in req_list:
-                    if self._norm(t) not in completed_modules:
-                        focus_missing.append(f"Vertiefung: Pflichtmodul fehlt: {t}")
-
-                if "choose" in f:
-                    choose = f["choose"]
-                    got = count_completed(choose["from"])
-                    need = int(choose["min"])
-                    if got < need:
-                        focus_missing.append(f"Vertiefung: es fehlen {need - got} weitere Module aus der Vertiefungsliste.")
-
-                if "choose_groups" in f:
-                    for grp in f["choose_groups"]:
-                        got = count_completed(grp["from"])
-                        need = int(grp["min"])
-                        if got < need:
-                            focus_missing.append(f"Vertiefung: es fehlen {need - got} Module aus der Gruppe: {', '.join(grp['from'])}")
-
-                focus_stats["missingCount"] = len(focus_missing)
-                focus_stats["missing"] = focus_missing[:]
-            else:
-                warnings.append(f"Vertiefung-Hinweis: selectedFocus '{focus_raw}' ist unbekannt (nicht in der curricularen Liste/Aliases).")
+        def remaining(grp: FocusGroup) -> List[str]:
+            return [t for t, b in grp.items if not done_mask & b]
+
+        fm = self.focus_masks.get(focus_key) if focus_key else None
+        if fm is not None:
+            focus_stats["recognized"] = True
+            focus_stats["canonicalName"] = self.modules.get(focus_key, {}).get("title") or None
+            focus_name = (payload.get("selectedFocus") or payload.get("vertiefung") or "").strip() or "Vertiefung"
+
+            for t in remaining(fm.required):
+                focus_missing.append(f"Vertiefung: Pflichtmodul fehlt: {t}")
+            if fm.choose is not None:
+                got = (fm.choose.mask & done_mask).bit_count()
+                if got < fm.choose.min:
+                    focus_missing.append(f"Vertiefung: es fehlen {fm.choose.min - got} weitere Module aus der Vertiefungsliste.")
+            for grp in fm.groups:
+                got = (grp.mask & done_mask).bit_count()
+                if got < grp.min:
+                    focus_missing.append(
+                        f"Vertiefung: es fehlen {grp.min - got} Module aus der Gruppe: {', '.join(t for t, _ in grp.items)}"
+                    )
+            focus_stats["missingCount"] = len(focus_missing)
+            focus_stats["missing"] = focus_missing[:]
+
+            # --- Add ALL focus missing requirements into RuleCheckResult.missing (only if missed) ---
+            for t in remaining(fm.required):
+                missing.append(f"Vertiefung ({focus_name}): Pflichtmodul fehlt: {t}")
+            for grp in fm.choice_groups:
+                got = (grp.mask & done_mask).bit_count()
+                if got < grp.min:
+                    missing.append(f"Vertiefung ({focus_name}): es fehlen {grp.min - got} Module aus: {', '.join(remaining(grp))}")
+        elif focus_key:
+            warnings.append(f"Vertiefung-Hinweis: selectedFocus '{focus_raw}' ist unbekannt (nicht in der curricularen Liste/Aliases).")
 
         if payload.get("validateFocusAsStrict") and focus_stats.get("recognized") and focus_missing:
             errors.append("rejected: selected focus requirements are not satisfied (strict focus validation enabled).")
 
-
-        # --- Add ALL focus missing requirements into RuleCheckResult.missing (only if missed) ---
-        if focus_stats.get("recognized"):
-            f = self.focuses.get(focus_key)
-            if f:
-                focus_name = (payload.get("selectedFocus") or payload.get("vertiefung") or "").strip() or "Vertiefung"
-
-                focus_missing_lines: List[str] = []
-
-                def remaining_list(from_list: List[str]) -> List[str]:
-                    return [t for t in from_list if not is_complete_title(t)]
-
-                # (A) Required modules (must-have)
-                for t in f.get("required", []):
-                    if not is_complete_title(t):
-                        focus_missing_lines.append(f"Vertiefung ({focus_name}): Pflichtmodul fehlt: {t}")
-
-                # (B) Single choose block (pick N from list)
-                if "choose" in f:
-                    choose = f["choose"]
-                    need = int(choose["min"])
-                    rem = remaining_list(choose["from"])
-                    got = len(choose["from"]) - len(rem)
-                    if got < need:
-                        # show exactly how many still needed, and the remaining options
-                        focus_missing_lines.append(
-                            f"Vertiefung ({focus_name}): es fehlen {need - got} Module aus: {', '.join(rem)}"
-                        )
-
-                # (C) Multiple choose groups (pick N from each group)
-                for grp in f.get("choose_groups", []):
-                    need = int(grp["min"])
-                    rem = remaining_list(grp["from"])
-                    got = len(grp["from"]) - len(rem)
-                    if got < need:
-                        focus_missing_lines.append(
-                            f"Vertiefung ({focus_name}): es fehlen {need - got} Module aus: {', '.join(rem)}"
-                        )
-
-                # Only add to missing[] if there is something missing
-                missing.extend(focus_missing_lines)
-
+        # All focuses at once, closest first
+        focus_ranking: List[Dict[str, Any]] = []
+        for fm in self.focus_masks.values():
+            needed = fm.required.min + sum(g.min for g in fm.choice_groups)
+            left = fm.missing_count(done_mask)
+            focus_ranking.append({
+                "name": fm.name,
+                "selected": fm.key == focus_key,
+                "complete": left == 0,
+                "completedCount": needed - left,
+                "requiredCount": needed,
+                "remainingCount": left,
+                "progress": round((needed - left) / needed, 3) if needed else 1.0,
+                "missingRequired": remaining(fm.required),
+                "groups": [
+                    {
+                        "min": g.min,
+                        "completedCount": (g.mask & done_mask).bit_count(),
+                        "remaining": remaining(g),
+                    }
+                    for g in fm.choice_groups
+                ],
+            })
+        focus_ranking.sort(key=lambda f: (f["remainingCount"], -f["progress"], f["name"]))
+        if timer is not None:
+            timer.lap("focus")
 
         # ----------------------------
         # Build stats
         # ----------------------------
         subj_pretty: Dict[str, float] = {}
-        for k, v in subj_ects.items():
+        for k, v in sorted(state.subj_ects.items()):
             subj_pretty[k.title() if k not in ("(none)",) else k] = round(v, 2)
 
         module_progress: List[Dict[str, Any]] = []
@@ -994,26 +1007,242 @@ class RuleChecker:
                     "completeLaneIndex": steop_complete_lane_done,
                     **steop_done,
                     "nonSteopEctsBeforeCompletion": round(non_steop_ects_before, 2),
-                    "maxNonSteopBeforeCompletion": 22.0,
+                    "maxNonSteopBeforeCompletion": self.steop_max_ects_before,
                 },
                 "planned": steop_plan,  # UI progress (done+planned)
             },
             "focus": focus_stats,
+            "focusRanking": focus_ranking,
             "moduleProgress": module_progress,
             "warnings": warnings,
         }
 
+        if timer is not None:
+            timer.lap("stats")
+
         # ----------------------------
         # Final decision
         # ----------------------------
         if errors:
-            change = payload.get("change") or {}
-            ccode = change.get("courseCode")
-            ctype = change.get("type")
-            if ccode:
-                msg = f"rejected: cannot apply change ({ctype}) for '{ccode}': {errors[0].replace('rejected: ', '')}"
-            else:
-                msg = errors[0]
+            stats["violations"] = errors
+            msg = self._make_actionable_message(payload, errors[0])
             return RuleCheckResult(ok=False, message=msg, stats=stats, missing=missing)
 
         return RuleCheckResult(ok=True, message="accepted", stats=stats, missing=missing)
+
+    # ----------------------------
+    # Admission checks (see services/admission)
+    # ----------------------------
+    def catalog_courses(self) -> List[Dict[str, Any]]:
+        """Every catalog course once, as a plan item of its (first) module."""
+        out: List[Dict[str, Any]] = []
+        seen: Set[str] = set()
+        for m in self.curriculum.modules:
+            spec = self.modules[self._norm(m.name)]
+            for code, title, ects in m.courses:
+                key = self._norm(code or title)
+                if not key or key in seen:
+                    continue
+                seen.add(key)
+                out.append({
+                    "code": code or title,
+                    "name": title,
+                    "ects": ects,
+                    "category": self.CATEGORY_BY_KIND.get(spec["kind"], "free"),
+                    "examSubject": m.exam_subject or None,
+                    "module": {"title": m.name},
+                })
+        return out
+
+    def state_verdict(self, state: PlanState, payload: dict[str, Any]) -> Optional[Tuple[bool, str]]:
+        """
+        ok and message of evaluate_state(state, payload), without building the dashboard;
+        None when only the full evaluation can tell (strict focus validation).
+        """
+        if payload.get("validateFocusAsStrict"):
+            return None
+        rejected = self._check_program(payload)
+        if rejected is not None:
+            return False, rejected.message
+        errors = self._overload_errors(state)
+        errors += self._gating_errors(state, *state.steop_prefix(self.steop_required_tags, self.steop_pool_min_ects))
+        if errors:
+            return False, self._make_actionable_message(payload, errors[0])
+        return True, "accepted"
+
+    # ----------------------------
+    # Rejection message tuned to the most recent change
+    # ----------------------------
+    def _make_actionable_message(self, payload: dict[str, Any], base_msg: str) -> str:
+        change = payload.get("change") or {}
+        ccode = change.get("courseCode")
+        ctype = change.get("type")
+        if ccode:
+            return f"rejected: cannot apply change ({ctype}) for '{ccode}': {base_msg.replace('rejected: ', '')}"
+        return base_msg
+
+    def rebase_result(self, result: RuleCheckResult, payload: dict[str, Any]) -> RuleCheckResult:
+        """`result` of this plan under any change, worded for the change in `payload`."""
+        violations = result.stats.get("violations")
+        if result.ok or not violations:
+            return result
+        msg = self._make_actionable_message(payload, violations[0])
+        return RuleCheckResult(ok=False, message=msg, stats=result.stats, missing=result.missing)
+
+    # ----------------------------
+    # Plan completion (see services/plan_completion)
+    # ----------------------------
+    def completion_problem(self, payload: dict[str, Any]) -> Tuple[Optional[CompletionProblem], Optional[str]]:
+        """
+        The open module-level requirements of a plan as a CompletionProblem: missing
+        Pflichtmodule and Bachelorarbeit, the narrow-elective minimum, the selected focus
+        and, closable by free-choice ECTS, Transferable Skills and the total.
+        """
+        rejected = self._check_program(payload)
+        if rejected is not None:
+            return None, rejected.message
+        state = PlanState()
+        for rec in (self.parse_course(c, s, li) for c, s, li in self.plan_items(payload)):
+            if rec.error:
+                return None, rec.error
+            state.add(rec)
+
+        problem = CompletionProblem()
+        index: Dict[str, int] = {}
+        for mk, m in sorted(self.modules.items(), key=lambda kv: kv[1]["title"]):
+            remaining = m["ects"] - state.mod_all.get(mk, 0.0)
+            if m["kind"] != "fwts" and remaining > 1e-6:
+                index[mk] = len(problem.candidates)
+                problem.candidates.append(Candidate(m["title"], round(remaining, 2), m["kind"], m["examSubject"] or ""))
+
+        def complete(title: str) -> bool:
+            key = self._norm(title)
+            return key in self.modules and key not in index
+
+        def need(label: str, titles: Any, count: int) -> None:
+            members = frozenset(index[k] for k in (self._norm(t) for t in titles) if k in index)
+            if count > 0:
+                problem.requirements.append(Requirement(label, members, count=count))
+
+        for mk, m in self.modules.items():
+            if m["kind"] in ("mandatory", "thesis") and mk in index:
+                need(f"Pflichtmodul: {m['title']}", [m["title"]], 1)
+
+        narrow = [m["title"] for m in self.modules.values() if m["kind"] == "narrow_elective"]
+        need(
+            "Wahlmodule der engen Wahl (+)",
+            narrow,
+            self.MIN_NARROW_ELECTIVE_MODULES - sum(1 for t in narrow if complete(t)),
+        )
+
+        focus_raw = payload.get("selectedFocus") or payload.get("vertiefung")
+        focus_key_in = self._norm(focus_raw) if focus_raw else ""
+        focus = self.focuses.get(self.focus_aliases.get(focus_key_in, focus_key_in))
+        if focus:
+            for t in focus.get("required", []):
+                if not complete(t):
+                    need(f"Vertiefung: Pflichtmodul {t}", [t], 1)
+            for grp in ([focus["choose"]] if "choose" in focus else []) + list(focus.get("choose_groups", [])):
+                got = sum(1 for t in grp["from"] if complete(t))
+                need(f"Vertiefung: {int(grp['min'])} aus {', '.join(grp['from'])}", grp["from"], int(grp["min"]) - got)
+
+        ts_gap = self.TRANSFERABLE_SKILLS_MIN_ECTS - state.cat_ects.get("transferable_skills", 0.0)
+        if ts_gap > 1e-6:
+            problem.requirements.append(Requirement("Transferable Skills", ects=ts_gap, filler=True))
+        total_gap = self.TOTAL_ECTS - state.total_ects
+        if total_gap > 1e-6:
+            problem.requirements.append(
+                Requirement("Gesamtumfang", frozenset(range(len(problem.candidates))), ects=total_gap, filler=True)
+            )
+        return problem, None
+
+    # ----------------------------
+    # Auto-scheduling (see services/plan_schedule)
+    # ----------------------------
+    def module_course(self, name: str) -> Optional[Dict[str, Any]]:
+        """A catalog module as one plan item (code = title = module name); None if unknown."""
+        m = self.modules.get(self._norm(name))
+        if m is None:
+            return None
+        return {
+            "code": m["title"],
+            "title": m["title"],
+            "ects": m["ects"],
+            "category": self.CATEGORY_BY_KIND.get(m["kind"], "free"),
+            "examSubject": m["examSubject"],
+        }
+
+    def schedule_problem(self, payload: dict[str, Any]) -> Tuple[Optional[ScheduleProblem], Optional[str]]:
+        """
+        The plannedCourses of a payload (lanes ignored) as a ScheduleProblem around its
+        doneCourses, which keep their lanes. Soft prerequisites order the tasks, and StEOP
+        gates them as if the plan were carried out: courses outside StEOP go after its
+        completion, unless allowed before it within the ECTS limit. A module-level item
+        carries the StEOP tags of its LVs.
+        """
+        rejected = self._check_program(payload)
+        if rejected is not None:
+            return None, rejected.message
+        done = [self.parse_course(c, "done", self._lane_index_of(c)) for c in payload.get("doneCourses") or []]
+        todo = [self.parse_course(c, "planned", 0) for c in payload.get("plannedCourses") or []]
+        seen: Set[str] = set()
+        for rec in done + todo:
+            if rec.error:
+                return None, rec.error
+            if rec.code_key in seen:
+                return None, f"rejected: duplicate course '{rec.code}'."
+            seen.add(rec.code_key)
+
+        problem = ScheduleProblem(
+            max_ects=self.MAX_ECTS_PER_SEMESTER,
+            recommended_ects=self.RECOMMENDED_ECTS_PER_SEMESTER,
+            order_hard=False,
+        )
+        done_lanes: Dict[str, int] = {}
+        for rec in done:
+            problem.lane_load[rec.lane] = problem.lane_load.get(rec.lane, 0.0) + rec.ects
+            for key in (rec.code_key, rec.module_key):
+                done_lanes[key] = min(rec.lane, done_lanes.get(key, rec.lane))
+        start = payload.get("startLane")
+        problem.first_lane = start if isinstance(start, int) and start >= 0 else max(problem.lane_load, default=-1) + 1
+        lanes = payload.get("maxSemesters")
+        problem.lanes = max(lanes if isinstance(lanes, int) and lanes > 0 else self.MAX_SEMESTERS, problem.first_lane + 1)
+
+        for rec, course in zip(todo, payload.get("plannedCourses") or []):
+            tags = {rec.steop_tag} if rec.steop_tag else set()
+            if rec.code_key == rec.module_key:
+                tags |= self.module_steop_tags.get(rec.module_key, frozenset())
+            problem.tasks.append(Task(
+                course={k: v for k, v in course.items() if k != "laneIndex"},
+                label=rec.code,
+                ects=rec.ects,
+                steop_tags=frozenset(tags),
+                steop_pool=rec.steop_pool,
+                allowed_before_steop=rec.allowed_before_steop,
+            ))
+        problem.before, problem.earliest = prerequisite_order(
+            self.prereq_graph, [(rec.code_key, rec.module_key) for rec in todo], done_lanes
+        )
+
+        # StEOP: only while the done courses leave it open and the plan can still complete it
+        if self.steop_required_tags or self.steop_pool_min_ects > 0:
+            state = PlanState()
+            for rec in done:
+                state.add(rec)
+            if state.steop_prefix(self.steop_required_tags, self.steop_pool_min_ects)[0] is None:
+                tags = set(state.steop_done_tags).union(*(t.steop_tags for t in problem.tasks))
+                pool = state.steop_done_pool + sum(t.ects for t in problem.tasks if t.steop_pool)
+                if tags >= self.steop_required_tags and pool >= self.steop_pool_min_ects - 1e-6:
+                    problem.steop = Steop(
+                        required_tags=self.steop_required_tags,
+                        pool_min_ects=self.steop_pool_min_ects,
+                        max_ects_before=self.steop_max_ects_before,
+                        done_tags={li: frozenset(t) for li, t in state.done_lane_tags.items()},
+                        done_pool=dict(state.done_lane_pool.items()),
+                        done_outside=dict(state.done_lane_non_steop.items()),
+                    )
+                else:
+                    problem.warnings.append(
+                        "StEOP cannot be completed with these courses; the schedule ignores the StEOP rules."
+                    )
+        return problem, None
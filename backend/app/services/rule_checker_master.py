@@ -3,6 +3,14 @@ from __future__ import annotations
 from dataclasses import dataclass, field
 from typing import Any, List, Dict, Tuple, Optional
 
+from . import phase_timing
+from .curriculum_compiler import Curriculum
+from .plan_aggregates import EctsBucket, LaneMultiset, exact_ects
+from .plan_completion import Candidate, CompletionProblem, Requirement
+from .plan_schedule import ScheduleProblem, Task, prerequisite_order
+from .prereq_graph import PrereqGraph
+from .text_norm import plain_key
+
 
 @dataclass
 class RuleCheckResult:
@@ -13,9 +21,151 @@ class RuleCheckResult:
     missing: List[str] = field(default_factory=list)
 
 
+class PlanState:
+    """
+    Running aggregates over the parsed courses of one plan.
+
+    Courses can be removed again, so the incremental rulecheck keeps one per session
+    and applies only the change delta; a full evaluation builds it from scratch.
+    Both paths finish in RuleChecker._evaluate_state, which reads nothing else.
+    """
+
+    def __init__(self) -> None:
+        self.records: Dict[int, Dict[str, Any]] = {}
+        self.by_cat = EctsBucket()
+        self.by_exam = EctsBucket()
+        self.per_sem = EctsBucket()
+        self.done_ects = 0.0
+        self.planned_ects = 0.0
+
+        # Buckets for the explicit curriculum constraints
+        self.subject_modules_ects = 0.0  # Pflicht/Core/Wahl, excluding free-choice module
+        self.free_module_ects = 0.0
+        self.transferable_ects = 0.0
+        self.diploma_ects = 0.0
+        self.diploma_thesis = 0.0
+        self.diploma_seminar = 0.0
+        self.diploma_defense = 0.0
+        self.diploma_other = 0.0
+
+        # code_key -> lanes (any status / done only)
+        self.lane_of = LaneMultiset()
+        self.done_lane_of = LaneMultiset()
+        # examSubject_key -> {id(course): course} of electives
+        self.electives_by_exam: Dict[str, Dict[int, Dict[str, Any]]] = {}
+        # courses contradicting a known module spec
+        self.misattributed: Dict[int, Dict[str, Any]] = {}
+
+    def can_add(self, c: Dict[str, Any]) -> bool:
+        """Whether `c` keeps the state clean (unique and exactly summable)."""
+        return c["code_key"] not in self.lane_of and exact_ects(c["ects"])
+
+    @staticmethod
+    def set_order(c: Dict[str, Any], order: int) -> None:
+        c["order"] = order
+
+    def add(self, c: Dict[str, Any]) -> None:
+        self._apply(c, 1)
+
+    def remove(self, c: Dict[str, Any]) -> None:
+        self._apply(c, -1)
+
+    def _apply(self, c: Dict[str, Any], sign: int) -> None:
+        cid = id(c)
+        ects = c["ects"]
+        cat = c["category"]
+        exam = c["examSubject_key"]
+        lane = c["laneIndex"]
+        done = c["status"] == "done"
+
+        if sign > 0:
+            self.records[cid] = c
+            self.by_cat.add(cat, ects)
+            if exam:
+                self.by_exam.add(exam, ects)
+            self.per_sem.add(lane, ects)
+            self.lane_of.add(c["code_key"], lane)
+            if done:
+                self.done_lane_of.add(c["code_key"], lane)
+            if cat == "elective" and exam:
+                self.electives_by_exam.setdefault(exam, {})[cid] = c
+            if c["misattributed"]:
+                self.misattributed[cid] = c
+        else:
+            del self.records[cid]
+            self.by_cat.remove(cat, ects)
+            if exam:
+                self.by_exam.remove(exam, ects)
+            self.per_sem.remove(lane, ects)
+            self.lane_of.remove(c["code_key"], lane)
+            if done:
+                self.done_lane_of.remove(c["code_key"], lane)
+            if cat == "elective" and exam:
+                electives = self.electives_by_exam[exam]
+                del electives[cid]
+                if not electives:
+                    del self.electives_by_exam[exam]
+            self.misattributed.pop(cid, None)
+
+        delta = sign * ects
+        if done:
+            self.done_ects += delta
+        else:
+            self.planned_ects += delta
+
+        if cat in {"mandatory", "core", "elective", "extension"}:
+            self.subject_modules_ects += delta
+        elif cat in {"free", "transferable_skills"}:
+            self.free_module_ects += delta
+            if cat == "transferable_skills":
+                self.transferable_ects += delta
+        elif cat.startswith("diploma_"):
+            self.diploma_ects += delta
+            if cat == "diploma_thesis":
+                self.diploma_thesis += delta
+            elif cat == "diploma_seminar":
+                self.diploma_seminar += delta
+            elif cat == "diploma_defense":
+                self.diploma_defense += delta
+            else:
+                self.diploma_other += delta
+
+
+class PrefixTrie:
+    """Character trie over normalized prefixes; matches any stored prefix of a key in one walk."""
+
+    __slots__ = ("root",)
+
+    _END = ""  # child key marking the end of a stored prefix (never a single character)
+
+    def __init__(self, prefixes: Any = ()) -> None:
+        self.root: Dict[str, Any] = {}
+        for prefix in prefixes:
+            self.add(prefix)
+
+    def add(self, prefix: str) -> None:
+        node = self.root
+        for ch in prefix:
+            node = node.setdefault(ch, {})
+        node[self._END] = prefix
+
+    def match(self, key: str) -> Optional[str]:
+        """The shortest stored prefix of `key`, or None."""
+        node = self.root
+        for ch in key:
+            if self._END in node:
+                return node[self._END]
+            node = node.get(ch)
+            if node is None:
+                return None
+        return node.get(self._END)
+
+
 class RuleChecker:
     """
-    Rule engine for TU Wien MSc Software Engineering (120 ECTS).
+    Rule engine for master programs like TU Wien MSc Software Engineering (066 937).
+    The curriculum itself (modules, exam subjects, ranges, limits) comes from a compiled
+    Curriculum; see services/curriculum_compiler.
 
     Assumptions / conventions (robust to variants):
     - payload contains either:
@@ -27,7 +177,7 @@ class RuleChecker:
     """
 
     # ----------------------------
-    # Curriculum constants (from the provided text)
+    # Curriculum constants (defaults; a curriculum's ects_total and rules["limits"] override them)
     # ----------------------------
     TOTAL_ECTS = 120.0
     SUBJECT_MODULES_MIN_ECTS = 81.0  # Pflicht-, Core- und Wahlmodule excluding the free-choice module
@@ -38,154 +188,71 @@ class RuleChecker:
     MAX_ECTS_PER_SEMESTER = 42.0
     # - soft warning if exceeded
     RECOMMENDED_ECTS_PER_SEMESTER = 30.0
+    # lanes the auto-scheduler may fill
+    MAX_SEMESTERS = 8
 
-    def __init__(self) -> None:
-        # Exam subjects as per curriculum
-        self.exam_subjects = {
-            "algorithms and complexity",
-            "automation systems and mobile robotics",
-            "data management and intelligent systems",
-            "distributed and next generation computing",
-            "high performance computing",
-            "machine learning",
-            "security and privacy",
-            "societal impact and critical reflections",
-            "software engineering and programming",
-            "verification and automated reasoning",
-            "methods in computer science",
-            "extension",
-            "freie wahlfächer und transferable skills",
-            "freiewahlfächer und transferable skills",
-            "free choice and transferable skills",
-            "diplomarbeit",
-            "master thesis",  # tolerated alias
-        }
+    def __init__(self, curriculum: Curriculum) -> None:
+        """
+        Build the lookup tables from a compiled curriculum: exam subjects and module specs
+        come from the catalog, ECTS ranges/prerequisites/limits from curriculum.rules.
+        """
+        rules = curriculum.rules
+        self.curriculum = curriculum
+        self.program_code = curriculum.program_code
+
+        limits = rules.get("limits") or {}
+        self.TOTAL_ECTS = float(curriculum.ects_total or self.TOTAL_ECTS)
+        self.SUBJECT_MODULES_MIN_ECTS = float(limits.get("subject_modules_min_ects", self.SUBJECT_MODULES_MIN_ECTS))
+        self.TRANSFERABLE_SKILLS_MIN_ECTS = float(limits.get("transferable_skills_min_ects", self.TRANSFERABLE_SKILLS_MIN_ECTS))
+        self.MAX_ECTS_PER_SEMESTER = float(limits.get("max_ects_per_semester", self.MAX_ECTS_PER_SEMESTER))
+        self.RECOMMENDED_ECTS_PER_SEMESTER = float(
+            limits.get("recommended_ects_per_semester", self.RECOMMENDED_ECTS_PER_SEMESTER)
+        )
+        self.MAX_SEMESTERS = int(limits.get("max_semesters", self.MAX_SEMESTERS))
+
+        # Exam subjects as per curriculum (+ tolerated aliases)
+        self.exam_subjects = {self._norm_key(name) for _, name in curriculum.exam_subjects}
+        self.exam_subjects.update(self._norm_key(a) for a in rules.get("exam_subject_aliases", []))
+
+        # Module specs: Pflicht (mandatory) and Core modules are always validated; other modules
+        # only if rules["ects_ranges"] gives them a range (variable-ECTS modules).
+        ranges = {self._norm_key(name): r for name, r in (rules.get("ects_ranges") or {}).items()}
+        self.mandatory_modules: Dict[str, Dict[str, Any]] = {}
+        self.core_modules: Dict[str, Dict[str, Any]] = {}
+        self.variable_modules: Dict[str, Dict[str, Any]] = {}
+        for m in curriculum.modules:
+            ects_min, ects_max = ranges.get(self._norm_key(m.name), (m.ects, m.ects))
+            spec = {
+                "examSubject": self._norm_key(m.exam_subject),
+                "ects_min": float(ects_min),
+                "ects_max": float(ects_max),
+                "kind": m.category,
+            }
+            if m.category == "mandatory":
+                self.mandatory_modules.setdefault(m.name, spec)
+            elif m.category == "core":
+                self.core_modules.setdefault(m.name, spec)
+            elif self._norm_key(m.name) in ranges:
+                self.variable_modules.setdefault(m.name, spec)
 
         # Core modules (+) per Prüfungsfach, needed only if taking *Wahlmodule* of that exam subject
-        self.core_by_exam_subject: Dict[str, List[str]] = {
-            "algorithms and complexity": ["Algorithmics"],
-            "automation systems and mobile robotics": ["Mobile Robotics"],
-            "data management and intelligent systems": ["Advanced Database Systems"],
-            "distributed and next generation computing": [
-                "Advanced Internet Computing",
-                "Distributed Systems Technologies",
-            ],
-            "machine learning": ["Machine Learning"],
-            "verification and automated reasoning": ["Formal Methods in Systems Engineering"],
-        }
-
-        # Mandatory (Pflicht) modules (unmarked in the list)
-        self.mandatory_modules: Dict[str, Dict[str, Any]] = {
-            "Advanced Software Engineering": {
-                "examSubject": "software engineering and programming",
-                "ects_min": 6.0,
-                "ects_max": 6.0,
-                "kind": "mandatory",
-            },
-            "Advanced Software Engineering Project": {
-                "examSubject": "software engineering and programming",
-                "ects_min": 6.0,
-                "ects_max": 6.0,
-                "kind": "mandatory",
-            },
-            "Seminar in Computer Science": {
-                "examSubject": "methods in computer science",
-                "ects_min": 3.0,
-                "ects_max": 30.0,  # curriculum says "min 3.0"; implementations may vary; we accept >=3
-                "kind": "mandatory",
-            },
-        }
-
-        # Core modules are not mandatory overall, but we still validate ects and examSubject when present
-        self.core_modules: Dict[str, Dict[str, Any]] = {
-            "Algorithmics": {
-                "examSubject": "algorithms and complexity",
-                "ects_min": 6.0,
-                "ects_max": 6.0,
-                "kind": "core",
-            },
-            "Mobile Robotics": {
-                "examSubject": "automation systems and mobile robotics",
-                "ects_min": 6.0,
-                "ects_max": 6.0,
-                "kind": "core",
-            },
-            "Advanced Database Systems": {
-                "examSubject": "data management and intelligent systems",
-                "ects_min": 6.0,
-                "ects_max": 6.0,
-                "kind": "core",
-            },
-            "Advanced Internet Computing": {
-                "examSubject": "distributed and next generation computing",
-                "ects_min": 6.0,
-                "ects_max": 6.0,
-                "kind": "core",
-            },
-            "Distributed Systems Technologies": {
-                "examSubject": "distributed and next generation computing",
-                "ects_min": 6.0,
-                "ects_max": 6.0,
-                "kind": "core",
-            },
-            "Machine Learning": {
-                "examSubject": "machine learning",
-                "ects_min": 6.0,
-                "ects_max": 6.0,
-                "kind": "core",
-            },
-            "Formal Methods in Systems Engineering": {
-                "examSubject": "verification and automated reasoning",
-                "ects_min": 6.0,
-                "ects_max": 6.0,
-                "kind": "core",
-            },
-        }
-
-        # Variable-ECTS named modules from the text (range validation if the code matches)
-        self.variable_modules: Dict[str, Dict[str, Any]] = {
-            "Network Security": {
-                "examSubject": "security and privacy",
-                "ects_min": 3.0,
-                "ects_max": 6.0,
-                "kind": "elective",
-            },
-            "Project in Computer Science": {
-                "examSubject": "methods in computer science",
-                "ects_min": 6.0,
-                "ects_max": 12.0,
-                "kind": "elective",
-            },
-            "Extension": {
-                "examSubject": "extension",
-                "ects_min": 0.0,
-                "ects_max": 12.0,
-                "kind": "elective",
-            },
-        }
-
-        # “Advanced Topics … (min 3.0 ECTS)” family
-        self.advanced_topics_prefixes = (
-            "Advanced Topics In Algorithms and Complexity",
-            "Advanced Topics In Automation and Mobile Robotics",
-            "Advanced Topics In Data Management and Intelligent Systems",
-            "Advanced Topics In Distributed and Next Generation Computing",
-            "Advanced Topics In High Performance Computing",
-            "Advanced Topics In Machine Learning",
-            "Advanced Topics In Security and Privacy",
-            "Advanced Topics In Societal Impact and Critical Reflections",
-            "Advanced Topics In Software Engineering and Programming",
-            "Advanced Topics In Verification and Automated Reasoning",
+        self.core_by_exam_subject: Dict[str, List[str]] = {}
+        for _, subject in curriculum.exam_subjects:
+            exam_key = self._norm_key(subject)
+            cores = [name for name, spec in self.core_modules.items() if spec["examSubject"] == exam_key]
+            if cores:
+                self.core_by_exam_subject[exam_key] = cores
+
+        # “Advanced Topics … (min N ECTS)” family: every module whose name starts with the prefix
+        advanced = rules.get("advanced_topics") or {}
+        advanced_prefix = self._norm_key(advanced.get("prefix"))
+        self.advanced_topics_prefixes = tuple(
+            m.name for m in curriculum.modules if advanced_prefix and self._norm_key(m.name).startswith(advanced_prefix)
         )
+        self.advanced_topics_min_ects = float(advanced.get("min_ects", 0.0))
 
         # Minimal prerequisite model (sequence checks)
-        self.prerequisites: Dict[str, List[str]] = {
-            # very common/expected sequencing
-            "Advanced Software Engineering Project": ["Advanced Software Engineering"],
-            # diploma parts (if represented as separate “courses”)
-            "Final Oral Exam / Defense": ["Master Thesis"],
-            "Seminar for Diploma Students": ["Master Thesis"],
-        }
+        self.prerequisites: Dict[str, List[str]] = dict(rules.get("prerequisites") or {})
 
         # Category normalization map (many synonyms accepted)
         self.category_map: Dict[str, str] = {
@@ -233,24 +300,51 @@ class RuleChecker:
             "abschlusspruefung": "diploma_defense",
         }
 
-        # Catalog compatibility: master SQL stores these as module category "elective",
+        # Catalog compatibility: the SQL catalog stores these as module category "elective",
         # but they are semantically diploma/TS items and must be counted in those buckets.
-        self.special_category_by_code: Dict[str, str] = {
-            # Free choice + transferable skills
-            "fwts-el": "transferable_skills",
-            "freie wahlfächer und transferable skills": "transferable_skills",
-            "freie wahlfaecher und transferable skills": "transferable_skills",
-            "free choice and transferable skills": "transferable_skills",
-            # Diploma components
-            "master thesis": "diploma_thesis",
-            "diplomarbeit": "diploma_thesis",
-            "seminar for diploma students": "diploma_seminar",
-            "seminar für diplomand_innen": "diploma_seminar",
-            "seminar fuer diplomand_innen": "diploma_seminar",
-            "final oral exam / defense": "diploma_defense",
-            "kommissionelle abschlussprüfung": "diploma_defense",
-            "kommissionelle abschlusspruefung": "diploma_defense",
+        # Keyed by module name and by every course code/title of the module.
+        module_categories = {self._norm_key(k): v for k, v in (rules.get("module_categories") or {}).items()}
+        self.special_category_by_code: Dict[str, str] = {}
+        self.diploma_targets: Dict[str, float] = {}
+        self.diploma_subject = ""
+        for m in curriculum.modules:
+            special = module_categories.get(self._norm_key(m.name))
+            if special is None:
+                continue
+            for value in (m.name, *(v for code, title, _ in m.courses for v in (code, title))):
+                if value:
+                    self.special_category_by_code.setdefault(self._norm_key(value), special)
+            if special.startswith("diploma_"):
+                self.diploma_targets[special] = self.diploma_targets.get(special, 0.0) + m.ects
+                self.diploma_subject = self.diploma_subject or m.exam_subject
+        for alias, special in (rules.get("category_aliases") or {}).items():
+            self.special_category_by_code[self._norm_key(alias)] = special
+        self.diploma_labels: Dict[str, str] = dict(rules.get("diploma_labels") or {})
+
+        # ----------------------------
+        # Lookup indexes (built once; evaluate() only reads them)
+        # ----------------------------
+        # normalized module name -> (name, spec, expected examSubject key); first definition wins
+        self.known_module_index: Dict[str, Tuple[str, Dict[str, Any], str]] = {}
+        for known in (self.mandatory_modules, self.core_modules, self.variable_modules):
+            for name, spec in known.items():
+                self.known_module_index.setdefault(
+                    self._norm_key(name), (name, spec, self._norm_key(spec.get("examSubject", "")))
+                )
+
+        self.advanced_topics_trie = PrefixTrie(self._norm_key(p) for p in self.advanced_topics_prefixes)
+
+        # (name, key) pairs for the presence/ordering checks
+        self.mandatory_module_keys: List[Tuple[str, str]] = [(m, self._norm_key(m)) for m in self.mandatory_modules]
+        self.core_keys_by_exam_subject: Dict[str, List[Tuple[str, str]]] = {
+            exam: [(core, self._norm_key(core)) for core in cores] for exam, cores in self.core_by_exam_subject.items()
         }
+        # rules "prerequisites" plus the catalog's; raises PrerequisiteCycle on a cycle
+        self.prereq_graph = PrereqGraph(
+            [(p, course) for course, prereqs in self.prerequisites.items() for p in prereqs]
+            + list(curriculum.prerequisites),
+            self._norm_key,
+        )
 
     # ----------------------------
     # Public API
@@ -260,15 +354,47 @@ class RuleChecker:
         parsed, parse_error = self._parse_courses(lanes, payload)
         if parse_error is not None:
             return RuleCheckResult(ok=False, message=parse_error, stats={}, missing=[])
+        timer = phase_timing.active()
+        if timer is not None:
+            timer.lap("parse")
+        return self.evaluate_records(payload, parsed)[0]
+
+    def evaluate_records(
+        self, payload: dict[str, Any], parsed: List[Dict[str, Any]]
+    ) -> Tuple[RuleCheckResult, Optional[PlanState]]:
+        """
+        Full evaluation of parsed courses (in parse order). Also returns the built
+        PlanState when it is clean enough to be updated incrementally afterwards.
+        """
+        state = PlanState()
+        clean = True
+        for order, c in enumerate(parsed):
+            c["order"] = order
+            clean = clean and state.can_add(c)
+            state.add(c)
 
-        stats, missing = self._build_dashboard(parsed)
+        dup_msg = self._check_duplicates(parsed)
+        timer = phase_timing.active()
+        if timer is not None:
+            timer.lap("aggregate")
+        result = self._evaluate_state(state, payload, dup_msg)
+        return result, (state if clean else None)
+
+    def evaluate_state(self, state: PlanState, payload: dict[str, Any]) -> RuleCheckResult:
+        """Evaluate an incrementally maintained, clean PlanState."""
+        return self._evaluate_state(state, payload, None)
+
+    def _evaluate_state(self, state: PlanState, payload: dict[str, Any], dup_msg: Optional[str]) -> RuleCheckResult:
+        timer = phase_timing.active()
+        stats, missing = self._build_dashboard(state)
+        if timer is not None:
+            timer.lap("dashboard")
         normalized_change = self._normalize_change(payload.get("change"))
         if normalized_change:
             stats["last_change"] = normalized_change
 
         violations: List[str] = []
 
-        dup_msg = self._check_duplicates(parsed)
         if dup_msg:
             violations.append(dup_msg)
 
@@ -277,23 +403,29 @@ class RuleChecker:
             violations.append(sem_msg)
         if warnings:
             stats.setdefault("warnings", []).extend(warnings)
+        if timer is not None:
+            timer.lap("semester_load")
 
-        mis_msg = self._check_known_module_consistency(parsed)
+        mis_msg = self._check_known_module_consistency(state)
         if mis_msg:
             violations.append(mis_msg)
+        if timer is not None:
+            timer.lap("known_modules")
 
-        pre_msg = self._check_prerequisites(parsed)
-        if pre_msg:
-            violations.append(pre_msg)
+        violations.extend(self._check_prerequisites(state))
+        if timer is not None:
+            timer.lap("prerequisites")
 
         # ✅ NEW: core/elective relationship is missing+warning, not a violation
-        core_warnings, core_missing = self._core_dependency_feedback(parsed)
+        core_warnings, core_missing = self._core_dependency_feedback(state)
         if core_warnings:
             stats.setdefault("warnings", []).extend(core_warnings)
         if core_missing:
             for m in core_missing:
                 if m not in missing:
                     missing.append(m)
+        if timer is not None:
+            timer.lap("core_dependencies")
 
         if violations:
             stats["violations"] = violations
@@ -302,6 +434,68 @@ class RuleChecker:
 
         return RuleCheckResult(ok=True, message="accepted", stats=stats, missing=missing)
 
+    # ----------------------------
+    # Admission checks (see services/admission)
+    # ----------------------------
+    def catalog_courses(self) -> List[Dict[str, Any]]:
+        """Every catalog course once, as a plan item of its (first) module."""
+        out: List[Dict[str, Any]] = []
+        seen = set()
+        for m in self.curriculum.modules:
+            for code, title, ects in m.courses:
+                key = self._norm_key(code or title)
+                if not key or key in seen:
+                    continue
+                seen.add(key)
+                out.append({
+                    "code": code or title,
+                    "name": title,
+                    "ects": ects,
+                    "category": m.category,
+                    "examSubject": m.exam_subject,
+                })
+        return out
+
+    def state_verdict(self, state: PlanState, payload: dict[str, Any]) -> Optional[Tuple[bool, str]]:
+        """ok and message of evaluate_state(state, payload), without building the dashboard."""
+        violations: List[str] = []
+        sem_msg, _ = self._check_semester_load({"per_semester": self._per_semester(state)})
+        if sem_msg:
+            violations.append(sem_msg)
+        mis_msg = self._check_known_module_consistency(state)
+        if mis_msg:
+            violations.append(mis_msg)
+        violations.extend(self._check_prerequisites(state))
+        if violations:
+            return False, self._make_actionable_message(payload, violations[0])
+        return True, "accepted"
+
+    # ----------------------------
+    # Per-course records (shared by full and incremental evaluation)
+    # ----------------------------
+    def plan_items(self, payload: Dict[str, Any]) -> Optional[List[Tuple[Dict[str, Any], str, int]]]:
+        """(course, status, laneIndex) in parse order; None for payload shapes not handled incrementally."""
+        if isinstance(payload.get("lanes"), list) or "laneIndex" in payload:
+            return None
+        out: List[Tuple[Dict[str, Any], str, int]] = []
+        for lane in self._extract_lanes(payload):
+            for list_name, status in (("doneCourses", "done"), ("plannedCourses", "planned")):
+                for course in lane[list_name]:
+                    out.append((course, status, lane["laneIndex"]))
+        return out
+
+    def course_key(self, course: Dict[str, Any]) -> str:
+        return self._norm(course.get("code"))
+
+    @staticmethod
+    def course_signature(course: Dict[str, Any], status: str, lane: int) -> Tuple[Any, ...]:
+        # Everything _parse_course reads from a course; equal signatures parse identically.
+        return (status, lane, course.get("code"), course.get("ects"), course.get("category"), course.get("examSubject"))
+
+    def parse_item(self, course: Dict[str, Any], status: str, lane_index: int) -> Optional[Dict[str, Any]]:
+        record, error = self.parse_course(course, status, lane_index)
+        return None if error is not None else record
+
     # ----------------------------
     # Parsing & normalization
     # ----------------------------
@@ -340,10 +534,8 @@ class RuleChecker:
             return ""
         return str(s).strip()
 
-    @staticmethod
-    def _norm_key(s: Any) -> str:
-        # normalized key for matching
-        return RuleChecker._norm(s).lower()
+    # normalized key for matching (shared, cached; see services/text_norm)
+    _norm_key = staticmethod(plain_key)
 
     @staticmethod
     def _parse_ects(v: Any) -> Optional[float]:
@@ -404,122 +596,84 @@ class RuleChecker:
                 for course in items:
                     if not isinstance(course, dict):
                         return [], f"Course entries must be objects; got '{type(course).__name__}'."
-
-                    code = self._norm(course.get("code"))
-                    ects = self._parse_ects(course.get("ects"))
-                    raw_cat = course.get("category")
-                    exam_subject = self._norm(course.get("examSubject"))
-
-                    if not code:
-                        return [], "A course is missing 'code'."
-                    if ects is None or ects <= 0:
-                        return [], f"Course '{code}' has invalid ects '{course.get('ects')}'."
-                    if ects > 60:
-                        return [], f"Course '{code}' has implausible ects '{ects}'."
-
-                    mapped_cat = self._map_category(raw_cat, code)
-                    if mapped_cat is None:
-                        return [], f"Course '{code}' has unknown category '{raw_cat}'."
-
-                    # Normalize examSubject key; allow empty for free/diploma items
-                    exam_key = self._norm_key(exam_subject)
-                    if mapped_cat in {"mandatory", "core", "elective", "extension"}:
-                        if not exam_key:
-                            return [], f"Course '{code}' must have an examSubject (got empty)."
-                        if exam_key not in self.exam_subjects:
-                            return [], (
-                                f"Course '{code}' has unknown examSubject '{exam_subject}'. "
-                                "Use a curriculum exam subject (or use category 'free/transferable' for free-choice items)."
-                            )
-
-                    parsed.append(
-                        {
-                            "code": code,
-                            "code_key": self._norm_key(code),
-                            "ects": float(ects),
-                            "category_raw": raw_cat,
-                            "category": mapped_cat,
-                            "examSubject": exam_subject,
-                            "examSubject_key": exam_key,
-                            "laneIndex": lane_index,
-                            "status": status,
-                        }
-                    )
+                    record, error = self.parse_course(course, status, lane_index)
+                    if error is not None:
+                        return [], error
+                    parsed.append(record)
 
         # Also tolerate per-course laneIndex if top-level lists were given (rare); ignore if lanes already exist
         # (We keep lane-based as the canonical structure.)
 
         return parsed, None
 
+    def parse_course(
+        self, course: Dict[str, Any], status: str, lane_index: int
+    ) -> Tuple[Dict[str, Any], Optional[str]]:
+        code = self._norm(course.get("code"))
+        ects = self._parse_ects(course.get("ects"))
+        raw_cat = course.get("category")
+        exam_subject = self._norm(course.get("examSubject"))
+
+        if not code:
+            return {}, "A course is missing 'code'."
+        if ects is None or ects <= 0:
+            return {}, f"Course '{code}' has invalid ects '{course.get('ects')}'."
+        if ects > 60:
+            return {}, f"Course '{code}' has implausible ects '{ects}'."
+
+        mapped_cat = self._map_category(raw_cat, code)
+        if mapped_cat is None:
+            return {}, f"Course '{code}' has unknown category '{raw_cat}'."
+
+        # Normalize examSubject key; allow empty for free/diploma items
+        exam_key = self._norm_key(exam_subject)
+        if mapped_cat in {"mandatory", "core", "elective", "extension"}:
+            if not exam_key:
+                return {}, f"Course '{code}' must have an examSubject (got empty)."
+            if exam_key not in self.exam_subjects:
+                return {}, (
+                    f"Course '{code}' has unknown examSubject '{exam_subject}'. "
+                    "Use a curriculum exam subject (or use category 'free/transferable' for free-choice items)."
+                )
+
+        record = {
+            "code": code,
+            "code_key": self._norm_key(code),
+            "ects": float(ects),
+            "category_raw": raw_cat,
+            "category": mapped_cat,
+            "examSubject": exam_subject,
+            "examSubject_key": exam_key,
+            "laneIndex": lane_index,
+            "status": status,
+            "order": 0,
+        }
+        record["misattributed"] = self._known_module_violation(record)
+        return record, None
+
     # ----------------------------
     # Dashboard
     # ----------------------------
-    def _build_dashboard(self, courses: List[Dict[str, Any]]) -> Tuple[Dict[str, Any], List[str]]:
-        by_cat: Dict[str, float] = {}
-        by_exam: Dict[str, float] = {}
-        per_sem: Dict[int, float] = {}
-        done_ects = 0.0
-        planned_ects = 0.0
-
-        def add(d: Dict[str, float], k: str, v: float) -> None:
-            d[k] = d.get(k, 0.0) + v
-
-        for c in courses:
-            ects = c["ects"]
-            cat = c["category"]
-            exam = c["examSubject_key"]
-            sem = c["laneIndex"]
-            status = c["status"]
-
-            add(by_cat, cat, ects)
-            if exam:
-                add(by_exam, exam, ects)
-            per_sem[sem] = per_sem.get(sem, 0.0) + ects
-
-            if status == "done":
-                done_ects += ects
-            else:
-                planned_ects += ects
-
-        # Buckets for the explicit curriculum constraints
-        subject_modules_ects = 0.0  # Pflicht/Core/Wahl, excluding free-choice module
-        free_module_ects = 0.0
-        transferable_ects = 0.0
-        diploma_ects = 0.0
-        diploma_thesis = 0.0
-        diploma_seminar = 0.0
-        diploma_defense = 0.0
-        diploma_other = 0.0
-
-        for c in courses:
-            ects = c["ects"]
-            cat = c["category"]
-            if cat in {"mandatory", "core", "elective", "extension"}:
-                subject_modules_ects += ects
-            elif cat in {"free", "transferable_skills"}:
-                free_module_ects += ects
-                if cat == "transferable_skills":
-                    transferable_ects += ects
-            elif cat.startswith("diploma_"):
-                diploma_ects += ects
-                if cat == "diploma_thesis":
-                    diploma_thesis += ects
-                elif cat == "diploma_seminar":
-                    diploma_seminar += ects
-                elif cat == "diploma_defense":
-                    diploma_defense += ects
-                else:
-                    diploma_other += ects
-            elif cat == "diploma_other":
-                diploma_ects += ects
-                diploma_other += ects
+    def _build_dashboard(self, state: PlanState) -> Tuple[Dict[str, Any], List[str]]:
+        done_ects = state.done_ects
+        planned_ects = state.planned_ects
+
+        subject_modules_ects = state.subject_modules_ects
+        free_module_ects = state.free_module_ects
+        transferable_ects = state.transferable_ects
+        diploma_ects = state.diploma_ects
+        diploma_thesis = state.diploma_thesis
+        diploma_seminar = state.diploma_seminar
+        diploma_defense = state.diploma_defense
+        diploma_other = state.diploma_other
 
         total_ects = done_ects + planned_ects
 
         # Infer diploma components if only a generic diploma item exists (e.g., "Diplomarbeit" 30 ECTS)
-        thesis_need = 27.0
-        seminar_need = 1.5
-        defense_need = 1.5
+        thesis_need = self.diploma_targets.get("diploma_thesis", 0.0)
+        seminar_need = self.diploma_targets.get("diploma_seminar", 0.0)
+        defense_need = self.diploma_targets.get("diploma_defense", 0.0)
+        diploma_need = thesis_need + seminar_need + defense_need
 
         remaining_generic = max(0.0, diploma_other)
         thesis_total = diploma_thesis
@@ -543,29 +697,34 @@ class RuleChecker:
         missing: List[str] = []
 
         # Mandatory modules presence
-        for m in self.mandatory_modules.keys():
-            if not any(self._norm_key(c["code"]) == self._norm_key(m) for c in courses):
-                if m == "Seminar in Computer Science":
-                    missing.append("Mandatory: Seminar in Computer Science (min. 3.0 ECTS) is missing.")
+        for m, key in self.mandatory_module_keys:
+            if key not in state.lane_of:
+                spec = self.mandatory_modules[m]
+                if spec["ects_max"] > spec["ects_min"]:
+                    missing.append(f"Mandatory: {m} (min. {spec['ects_min']:.1f} ECTS) is missing.")
                 else:
-                    missing.append(f"Mandatory: {m} (6.0 ECTS) is missing.")
+                    missing.append(f"Mandatory: {m} ({spec['ects_min']:.1f} ECTS) is missing.")
 
-        # Minimum 81 ECTS in Pflicht/Core/Wahl modules (excluding free-choice module)
+        # Minimum ECTS (e.g. 81) in Pflicht/Core/Wahl modules (excluding free-choice module)
         if subject_modules_ects + 1e-9 < self.SUBJECT_MODULES_MIN_ECTS:
             need = self.SUBJECT_MODULES_MIN_ECTS - subject_modules_ects
             missing.append(
                 f"At least {self.SUBJECT_MODULES_MIN_ECTS:.1f} ECTS from Pflicht/Core/Wahl modules (excluding Free Choice/TS): need {need:.1f} more."
             )
 
-        # Diploma (30 ECTS total, split as 27 + 1.5 + 1.5)
-        if diploma_ects + 1e-9 < 30.0:
-            missing.append(f"Diploma requirement: need {30.0 - diploma_ects:.1f} more ECTS in Diplomarbeit (total 30.0).")
-        if thesis_total + 1e-9 < thesis_need:
-            missing.append(f"Diploma requirement: Master Thesis/Diplomarbeit work needs {thesis_need - thesis_total:.1f} more ECTS (target 27.0).")
-        if seminar_total + 1e-9 < seminar_need:
-            missing.append(f"Diploma requirement: Seminar for Diploma Students needs {seminar_need - seminar_total:.1f} more ECTS (target 1.5).")
-        if defense_total + 1e-9 < defense_need:
-            missing.append(f"Diploma requirement: Final oral exam/defense needs {defense_need - defense_total:.1f} more ECTS (target 1.5).")
+        # Diploma (total split into thesis + seminar + defense, e.g. 27 + 1.5 + 1.5)
+        if diploma_ects + 1e-9 < diploma_need:
+            missing.append(
+                f"Diploma requirement: need {diploma_need - diploma_ects:.1f} more ECTS in {self.diploma_subject} (total {diploma_need:.1f})."
+            )
+        for part, have, need in (
+            ("diploma_thesis", thesis_total, thesis_need),
+            ("diploma_seminar", seminar_total, seminar_need),
+            ("diploma_defense", defense_total, defense_need),
+        ):
+            if have + 1e-9 < need:
+                label = self.diploma_labels.get(part, part)
+                missing.append(f"Diploma requirement: {label} needs {need - have:.1f} more ECTS (target {need:.1f}).")
 
         # Transferable skills minimum within Free Choice module
         if transferable_ects + 1e-9 < self.TRANSFERABLE_SKILLS_MIN_ECTS:
@@ -573,15 +732,17 @@ class RuleChecker:
                 f"Transferable Skills: need {self.TRANSFERABLE_SKILLS_MIN_ECTS - transferable_ects:.1f} more ECTS (minimum {self.TRANSFERABLE_SKILLS_MIN_ECTS:.1f})."
             )
 
-        # Total ECTS to reach 120 (note: curriculum allows >=120, so only missing when below)
+        # Total ECTS to reach TOTAL_ECTS (note: curriculum allows more, so only missing when below)
         if total_ects + 1e-9 < self.TOTAL_ECTS:
             missing.append(f"Total ECTS: need {self.TOTAL_ECTS - total_ects:.1f} more to reach {self.TOTAL_ECTS:.0f}.")
 
-        # Free-choice ECTS needed to reach 120 once subject modules + diploma are counted
+        # Free-choice ECTS needed to reach TOTAL_ECTS once subject modules + diploma are counted
         # Free module can shrink if subject modules exceed 81; but TS min still applies (handled above).
         needed_free = max(0.0, self.TOTAL_ECTS - (subject_modules_ects + diploma_ects))
         if free_module_ects + 1e-9 < needed_free:
-            missing.append(f"Free Choice/Transferable Skills module: need {needed_free - free_module_ects:.1f} more ECTS to reach total 120.")
+            missing.append(
+                f"Free Choice/Transferable Skills module: need {needed_free - free_module_ects:.1f} more ECTS to reach total {self.TOTAL_ECTS:.0f}."
+            )
 
         stats: Dict[str, Any] = {
             "ects": {
@@ -600,12 +761,16 @@ class RuleChecker:
                 "diploma_defense_allocated": round(defense_total, 1),
                 "needed_free_to_hit_120": round(needed_free, 1),
             },
-            "per_semester": {str(k): round(v, 1) for k, v in sorted(per_sem.items())},
-            "by_category": {k: round(v, 1) for k, v in sorted(by_cat.items())},
-            "by_exam_subject": {k: round(v, 1) for k, v in sorted(by_exam.items())},
+            "per_semester": self._per_semester(state),
+            "by_category": {k: round(v, 1) for k, v in sorted(state.by_cat.items())},
+            "by_exam_subject": {k: round(v, 1) for k, v in sorted(state.by_exam.items())},
         }
         return stats, missing
 
+    @staticmethod
+    def _per_semester(state: PlanState) -> Dict[str, float]:
+        return {str(k): round(v, 1) for k, v in sorted(state.per_sem.items())}
+
     # ----------------------------
     # Validations (hard reject)
     # ----------------------------
@@ -641,97 +806,82 @@ class RuleChecker:
                 )
         return None, warnings
 
-    def _check_known_module_consistency(self, courses: List[Dict[str, Any]]) -> Optional[str]:
-        # If a known mandatory/core module appears with wrong examSubject or ects out of range or wrong category -> reject.
-        known = {}
-        known.update(self.mandatory_modules)
-        known.update(self.core_modules)
-        known.update(self.variable_modules)
+    def _check_known_module_consistency(self, state: PlanState) -> Optional[str]:
+        # First course (in plan order) whose known-module check failed.
+        if not state.misattributed:
+            return None
+        first = min(state.misattributed.values(), key=lambda c: c["order"])
+        return first["misattributed"]
 
-        for c in courses:
-            code = c["code"]
-            code_key = c["code_key"]
-            ects = c["ects"]
-            cat = c["category"]
-            exam_key = c["examSubject_key"]
-
-            # Advanced Topics family: min 3 ECTS
-            for prefix in self.advanced_topics_prefixes:
-                if self._norm_key(code).startswith(self._norm_key(prefix)):
-                    if ects + 1e-9 < 3.0:
-                        return f"'{code}' is an Advanced Topics module and must be at least 3.0 ECTS (currently {ects:.1f})."
-                    # examSubject should be non-empty, but may be handled in parse; no further check here.
-                    break
-
-            # Exact match with known spec?
-            spec = known.get(code) or known.get(self._best_known_name(code_key, known))
-            if spec is None:
-                # If user marks something as core/mandatory but we don't recognize it, reject as “misattributed category”.
-                if cat in {"mandatory", "core"}:
-                    return (
-                        f"Course '{code}' is marked as '{cat}', but it is not a known {cat} module in this curriculum. "
-                        "Fix the category or use an elective/free category."
-                    )
-                continue
+    def _known_module_violation(self, c: Dict[str, Any]) -> Optional[str]:
+        # If a known mandatory/core module appears with wrong examSubject or ects out of range or wrong category -> reject.
+        code = c["code"]
+        code_key = c["code_key"]
+        ects = c["ects"]
+        cat = c["category"]
+        exam_key = c["examSubject_key"]
+
+        # Advanced Topics family: min ECTS
+        if self.advanced_topics_trie.match(code_key) is not None and ects + 1e-9 < self.advanced_topics_min_ects:
+            return (
+                f"'{code}' is an Advanced Topics module and must be at least "
+                f"{self.advanced_topics_min_ects:.1f} ECTS (currently {ects:.1f})."
+            )
 
-            expected_exam = self._norm_key(spec.get("examSubject", ""))
-            if expected_exam and exam_key and expected_exam != exam_key:
+        # Known spec (by normalized name)?
+        known = self.known_module_index.get(code_key)
+        if known is None:
+            # If user marks something as core/mandatory but we don't recognize it, reject as “misattributed category”.
+            if cat in {"mandatory", "core"}:
                 return (
-                    f"Course '{code}' is assigned to examSubject '{c['examSubject']}', "
-                    f"but it belongs to '{spec['examSubject']}' in the curriculum."
+                    f"Course '{code}' is marked as '{cat}', but it is not a known {cat} module in this curriculum. "
+                    "Fix the category or use an elective/free category."
                 )
+            return None
+        _, spec, expected_exam = known
 
-            # ECTS range check
-            mn = float(spec.get("ects_min", 0.0))
-            mx = float(spec.get("ects_max", 1e9))
-            if ects + 1e-9 < mn or ects > mx + 1e-9:
-                return f"Course '{code}' has {ects:.1f} ECTS, but the allowed range is {mn:.1f}–{mx:.1f} ECTS."
+        if expected_exam and exam_key and expected_exam != exam_key:
+            return (
+                f"Course '{code}' is assigned to examSubject '{c['examSubject']}', "
+                f"but it belongs to '{spec['examSubject']}' in the curriculum."
+            )
 
-            # Category consistency for known mandatory/core modules
-            expected_kind = spec.get("kind")
-            if expected_kind in {"mandatory", "core"}:
-                if cat != expected_kind:
-                    return f"Course '{code}' must be categorized as '{expected_kind}', not '{cat}'."
+        # ECTS range check
+        mn = float(spec.get("ects_min", 0.0))
+        mx = float(spec.get("ects_max", 1e9))
+        if ects + 1e-9 < mn or ects > mx + 1e-9:
+            return f"Course '{code}' has {ects:.1f} ECTS, but the allowed range is {mn:.1f}–{mx:.1f} ECTS."
 
-        return None
+        # Category consistency for known mandatory/core modules
+        expected_kind = spec.get("kind")
+        if expected_kind in {"mandatory", "core"}:
+            if cat != expected_kind:
+                return f"Course '{code}' must be categorized as '{expected_kind}', not '{cat}'."
 
-    @staticmethod
-    def _best_known_name(code_key: str, known: Dict[str, Dict[str, Any]]) -> Optional[str]:
-        # try to match by normalized keys
-        for k in known.keys():
-            if RuleChecker._norm_key(k) == code_key:
-                return k
         return None
 
-    def _check_prerequisites(self, courses: List[Dict[str, Any]]) -> Optional[str]:
-        # Build earliest lane index per course code
-        lane_of: Dict[str, int] = {}
-        for c in courses:
-            k = c["code_key"]
-            lane_of[k] = min(lane_of.get(k, c["laneIndex"]), c["laneIndex"])
-
-        def find_lane(name: str) -> Optional[int]:
-            return lane_of.get(self._norm_key(name))
-
-        # Check explicit prerequisites (if these items are used)
-        for course_name, prereqs in self.prerequisites.items():
-            course_lane = find_lane(course_name)
-            if course_lane is None:
-                continue
-            for p in prereqs:
-                pre_lane = find_lane(p)
-                if pre_lane is None:
-                    return f"'{course_name}' requires '{p}' to be in your plan first."
-                if pre_lane > course_lane:
-                    return (
-                        f"'{course_name}' is planned in semester {course_lane + 1}, "
-                        f"but its prerequisite '{p}' is in semester {pre_lane + 1}."
-                    )
+    def _check_prerequisites(self, state: PlanState) -> List[str]:
+        # Every missing direct prerequisite and every direct or indirect one planned later
+        messages: List[str] = []
+        for v in self.prereq_graph.validate(state.lane_of.earliest):
+            if v.prereq_lane is None:
+                messages.append(f"'{v.target}' requires '{v.prereq}' to be in your plan first.")
+            elif v.via:
+                chain = " → ".join(f"'{name}'" for name in (v.prereq, *v.via, v.target))
+                messages.append(
+                    f"'{v.target}' is planned in semester {v.target_lane + 1}, but its indirect prerequisite "
+                    f"'{v.prereq}' is in semester {v.prereq_lane + 1} ({chain})."
+                )
+            else:
+                messages.append(
+                    f"'{v.target}' is planned in semester {v.target_lane + 1}, "
+                    f"but its prerequisite '{v.prereq}' is in semester {v.prereq_lane + 1}."
+                )
 
         # Also ensure: if a user takes a known core module and its examSubject electives exist earlier, core should not be later (handled in core gating)
-        return None
+        return messages
 
-    def _core_dependency_feedback(self, courses: List[Dict[str, Any]]) -> Tuple[List[str], List[str]]:
+    def _core_dependency_feedback(self, state: PlanState) -> Tuple[List[str], List[str]]:
         """
         If an examSubject has electives selected, its core modules must ALSO be in the plan
         to satisfy completion rules. Timing does NOT matter for validity, but we warn if
@@ -740,33 +890,14 @@ class RuleChecker:
         warnings: List[str] = []
         missing: List[str] = []
 
-        courses_by_exam: Dict[str, List[Dict[str, Any]]] = {}
-        for c in courses:
-            ek = c["examSubject_key"]
-            if ek:
-                courses_by_exam.setdefault(ek, []).append(c)
-
-        # code_key -> laneIndex (earliest occurrence, any status)
-        lane_of: Dict[str, int] = {}
-        # code_key -> laneIndex (earliest occurrence, done only)
-        done_lane_of: Dict[str, int] = {}
-        for c in courses:
-            k = c["code_key"]
-            lane_of[k] = min(lane_of.get(k, c["laneIndex"]), c["laneIndex"])
-            if c.get("status") == "done":
-                done_lane_of[k] = min(done_lane_of.get(k, c["laneIndex"]), c["laneIndex"])
-
-        for exam_key, core_list in self.core_by_exam_subject.items():
-            items = courses_by_exam.get(exam_key, [])
-            if not items:
-                continue
-
-            electives = [c for c in items if c["category"] == "elective"]
-            if not electives:
+        for exam_key, core_list in self.core_keys_by_exam_subject.items():
+            electives_by_id = state.electives_by_exam.get(exam_key)
+            if not electives_by_id:
                 continue
+            electives = sorted(electives_by_id.values(), key=lambda c: c["order"])
 
             # 1) Missing requirement: core must be present somewhere in plan
-            missing_cores_in_plan = [core for core in core_list if self._norm_key(core) not in lane_of]
+            missing_cores_in_plan = [core for core, key in core_list if key not in state.lane_of]
             if missing_cores_in_plan:
                 # One consolidated missing message per exam subject
                 missing.append(
@@ -781,7 +912,7 @@ class RuleChecker:
                 continue
 
             # 2) Core completion requirement: planned is not enough, core must be done.
-            missing_core_completions = [core for core in core_list if self._norm_key(core) not in done_lane_of]
+            missing_core_completions = [core for core, key in core_list if key not in state.done_lane_of]
             if missing_core_completions:
                 missing.append(
                     f"Core completion requirement for '{electives[0]['examSubject']}': complete core module(s): "
@@ -793,10 +924,10 @@ class RuleChecker:
                 )
 
             # 3) Ordering warning only (not a violation): elective before core
+            core_lanes = [(core, state.lane_of.earliest(key)) for core, key in core_list]
             for e in electives:
                 e_lane = e["laneIndex"]
-                for core in core_list:
-                    c_lane = lane_of[self._norm_key(core)]
+                for core, c_lane in core_lanes:
                     if c_lane > e_lane:
                         warnings.append(
                             f"Recommended sequencing: take core '{core}' before elective '{e['code']}'. "
@@ -902,3 +1033,171 @@ class RuleChecker:
         if action:
             return f"Rejected {action}{semester_hint}: {base_msg}"
         return base_msg
+
+    def rebase_result(self, result: RuleCheckResult, payload: Dict[str, Any]) -> RuleCheckResult:
+        """`result` of this plan under any change, worded for the change in `payload`."""
+        if not result.stats:
+            return result
+        stats = dict(result.stats)
+        stats.pop("last_change", None)
+        normalized_change = self._normalize_change(payload.get("change"))
+        if normalized_change:
+            stats["last_change"] = normalized_change
+        msg = result.message
+        if stats.get("violations"):
+            msg = self._make_actionable_message(payload, stats["violations"][0])
+        return RuleCheckResult(ok=result.ok, message=msg, stats=stats, missing=result.missing)
+
+    # ----------------------------
+    # Plan completion (see services/plan_completion)
+    # ----------------------------
+    def completion_problem(self, payload: dict[str, Any]) -> Tuple[Optional[CompletionProblem], Optional[str]]:
+        """
+        The open module-level requirements of a plan as a CompletionProblem: missing
+        mandatory modules, core gating (also for electives the search adds), the subject
+        module minimum, the diploma parts and, closable by free-choice ECTS, Transferable
+        Skills and the total.
+        """
+        lanes = self._extract_lanes(payload)
+        parsed, parse_error = self._parse_courses(lanes, payload)
+        if parse_error is not None:
+            return None, parse_error
+        state = PlanState()
+        for c in parsed:
+            state.add(c)
+
+        problem = CompletionProblem()
+        index: Dict[str, int] = {}
+        diploma_modules: Dict[str, Tuple[str, str]] = {}
+        for m in self.curriculum.modules:
+            key = self._norm_key(m.name)
+            special = self.special_category_by_code.get(key)
+            if special is not None:
+                if special.startswith("diploma_"):
+                    diploma_modules.setdefault(special, (m.name, m.exam_subject))
+                continue
+            if key in state.lane_of or key in index:
+                continue
+            known = self.known_module_index.get(key)
+            ects = known[1]["ects_min"] if known and known[1]["ects_min"] > 0 else m.ects
+            index[key] = len(problem.candidates)
+            problem.candidates.append(Candidate(m.name, ects, m.category, m.exam_subject))
+
+        subject_members = frozenset(index.values())
+
+        for name, key in self.mandatory_module_keys:
+            if key in index:
+                problem.requirements.append(Requirement(f"Mandatory: {name}", frozenset((index[key],)), count=1))
+
+        # Core modules (+): required by electives already in the plan, and by any elective the search adds
+        for exam_key, core_list in self.core_keys_by_exam_subject.items():
+            missing = frozenset(index[key] for _, key in core_list if key in index)
+            if not missing:
+                continue
+            label = f"Core modules for {exam_key}"
+            if exam_key in state.electives_by_exam:
+                problem.requirements.append(Requirement(label, missing, count=len(missing)))
+                continue
+            electives = frozenset(
+                i for i, c in enumerate(problem.candidates)
+                if c.kind == "elective" and self._norm_key(c.exam_subject) == exam_key
+            )
+            if electives:
+                problem.requirements.append(Requirement(label, missing, count=len(missing), trigger=electives))
+
+        subject_gap = self.SUBJECT_MODULES_MIN_ECTS - state.subject_modules_ects
+        if subject_gap > 1e-9:
+            problem.requirements.append(Requirement("Pflicht/Core/Wahl modules", subject_members, ects=subject_gap))
+
+        have = {
+            "diploma_thesis": state.diploma_thesis,
+            "diploma_seminar": state.diploma_seminar,
+            "diploma_defense": state.diploma_defense,
+        }
+        generic = state.diploma_other
+        for part in ("diploma_thesis", "diploma_seminar", "diploma_defense"):
+            gap = self.diploma_targets.get(part, 0.0) - have[part]
+            alloc = min(max(0.0, generic), max(0.0, gap))
+            generic -= alloc
+            gap -= alloc
+            if gap > 1e-9 and part in diploma_modules:
+                name, exam_subject = diploma_modules[part]
+                i = len(problem.candidates)
+                problem.candidates.append(Candidate(name, round(gap, 2), part, exam_subject))
+                problem.requirements.append(Requirement(self.diploma_labels.get(part, name), frozenset((i,)), count=1))
+
+        ts_gap = self.TRANSFERABLE_SKILLS_MIN_ECTS - state.transferable_ects
+        if ts_gap > 1e-9:
+            problem.requirements.append(Requirement("Transferable Skills", ects=ts_gap, filler=True))
+        total_gap = self.TOTAL_ECTS - (state.done_ects + state.planned_ects)
+        if total_gap > 1e-9:
+            problem.requirements.append(
+                Requirement("Total ECTS", frozenset(range(len(problem.candidates))), ects=total_gap, filler=True)
+            )
+        return problem, None
+
+    # ----------------------------
+    # Auto-scheduling (see services/plan_schedule)
+    # ----------------------------
+    def module_course(self, name: str) -> Optional[Dict[str, Any]]:
+        """A catalog module as one plan item (code = title = module name); None if unknown."""
+        key = self._norm_key(name)
+        m = next((m for m in self.curriculum.modules if self._norm_key(m.name) == key), None)
+        if m is None:
+            return None
+        known = self.known_module_index.get(key)
+        return {
+            "code": m.name,
+            "title": m.name,
+            "ects": known[1]["ects_min"] if known and known[1]["ects_min"] > 0 else m.ects,
+            "category": m.category,
+            "examSubject": m.exam_subject,
+        }
+
+    def schedule_problem(self, payload: dict[str, Any]) -> Tuple[Optional[ScheduleProblem], Optional[str]]:
+        """
+        The plannedCourses of a payload (lanes ignored) as a ScheduleProblem around its
+        doneCourses, which keep their lanes. Prerequisites are hard: a prerequisite may
+        share the lane of its course (as in evaluate), but the schedule prefers it earlier.
+        """
+        done: List[Dict[str, Any]] = []
+        todo: List[Dict[str, Any]] = []
+        for courses, status, out in (("doneCourses", "done", done), ("plannedCourses", "planned", todo)):
+            for course in payload.get(courses) or []:
+                if not isinstance(course, dict):
+                    return None, f"Course entries must be objects; got '{type(course).__name__}'."
+                lane = course.get("laneIndex", 0) if status == "done" else 0
+                if not isinstance(lane, int) or lane < 0:
+                    return None, f"Invalid laneIndex '{lane}'. laneIndex must be a non-negative integer."
+                record, error = self.parse_course(course, status, lane)
+                if error is not None:
+                    return None, error
+                out.append(record)
+        dup_msg = self._check_duplicates(done + todo)
+        if dup_msg:
+            return None, dup_msg
+
+        problem = ScheduleProblem(
+            max_ects=self.MAX_ECTS_PER_SEMESTER,
+            recommended_ects=self.RECOMMENDED_ECTS_PER_SEMESTER,
+        )
+        done_lanes: Dict[str, int] = {}
+        for c in done:
+            lane = c["laneIndex"]
+            problem.lane_load[lane] = problem.lane_load.get(lane, 0.0) + c["ects"]
+            done_lanes[c["code_key"]] = min(lane, done_lanes.get(c["code_key"], lane))
+        start = payload.get("startLane")
+        problem.first_lane = start if isinstance(start, int) and start >= 0 else max(problem.lane_load, default=-1) + 1
+        lanes = payload.get("maxSemesters")
+        problem.lanes = max(lanes if isinstance(lanes, int) and lanes > 0 else self.MAX_SEMESTERS, problem.first_lane + 1)
+
+        for c, course in zip(todo, payload.get("plannedCourses") or []):
+            problem.tasks.append(Task(
+                course={k: v for k, v in course.items() if k != "laneIndex"},
+                label=c["code"],
+                ects=c["ects"],
+            ))
+        problem.before, problem.earliest = prerequisite_order(
+            self.prereq_graph, [(c["code_key"],) for c in todo], done_lanes
+        )
+        return problem, None
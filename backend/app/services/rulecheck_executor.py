@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import functools
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from . import batch_rulecheck, curriculum_registry, phase_timing
+
+# Where /rulecheck evaluations run:
+#   inline  - on the event loop (blocks every other request while evaluating)
+#   thread  - in a dedicated thread pool, so the loop (and Starlette's own thread pool) stay free
+#   process - in worker processes with the curricula preloaded; a thread per in-flight
+#             request waits for its worker, caching and delta responses stay in this process
+MODES = ("inline", "thread", "process")
+
+
+class Overloaded(Exception):
+    """More evaluations are waiting for a slot than the queue allows."""
+
+
+class Limiter:
+    """
+    At most `max_in_flight` evaluations run at once; up to `max_queued` more wait for a
+    slot, later ones are rejected. Only used from the event loop, so no lock is needed.
+    """
+
+    def __init__(self, max_in_flight: int, max_queued: int) -> None:
+        self.max_in_flight = max_in_flight
+        self.max_queued = max_queued
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self.in_flight = 0
+        self.queued = 0
+        self._counters: Dict[str, Any] = {
+            "completed": 0,
+            "rejected": 0,
+            "queuedPeak": 0,
+            "waited": 0,
+            "waitMsTotal": 0.0,
+            "waitMsMax": 0.0,
+        }
+
+    async def acquire(self) -> None:
+        if self._slots.locked():
+            if self.queued >= self.max_queued:
+                self._counters["rejected"] += 1
+                raise Overloaded(f"{self.queued} rulechecks already waiting")
+            self.queued += 1
+            self._counters["queuedPeak"] = max(self._counters["queuedPeak"], self.queued)
+            started = time.perf_counter()
+            try:
+                await self._slots.acquire()
+            finally:
+                self.queued -= 1
+            waited = (time.perf_counter() - started) * 1000
+            self._counters["waited"] += 1
+            self._counters["waitMsTotal"] += waited
+            self._counters["waitMsMax"] = max(self._counters["waitMsMax"], waited)
+        else:
+            await self._slots.acquire()
+        self.in_flight += 1
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        self._counters["completed"] += 1
+        self._slots.release()
+
+    def stats(self) -> Dict[str, Any]:
+        c = self._counters
+        return {
+            "maxInFlight": self.max_in_flight,
+            "maxQueued": self.max_queued,
+            "inFlight": self.in_flight,
+            "queued": self.queued,
+            "queuedPeak": c["queuedPeak"],
+            "completed": c["completed"],
+            "rejected": c["rejected"],
+            "waitMsMean": round(c["waitMsTotal"] / c["waited"], 3) if c["waited"] else 0.0,
+            "waitMsMax": round(c["waitMsMax"], 3),
+        }
+
+
+class RuleCheckExecutor:
+    def __init__(self, mode: str, workers: int, max_in_flight: int, max_queued: int) -> None:
+        if mode not in MODES:
+            raise ValueError(f"Unsupported rulecheck executor '{mode}'. Expected {', '.join(MODES)}.")
+        self.mode = mode
+        self.workers = batch_rulecheck.resolve_workers(workers)
+        self.max_in_flight = max_in_flight if max_in_flight > 0 else self.workers
+        self.max_queued = max(0, max_queued)
+        self._limiter: Optional[Limiter] = None
+        self._threads: Optional[ThreadPoolExecutor] = None
+        self._processes: Optional[ProcessPoolExecutor] = None
+        self._processes_version = ""
+        self._lock = threading.Lock()
+
+    @property
+    def remote(self) -> bool:
+        """True when checkers run in worker processes (see evaluate_remote)."""
+        return self.mode == "process"
+
+    def _get_limiter(self) -> Limiter:
+        # created on first use, i.e. inside the running loop
+        if self._limiter is None:
+            self._limiter = Limiter(self.max_in_flight, self.max_queued)
+        return self._limiter
+
+    def _get_threads(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._threads is None:
+                # process mode: one (mostly waiting) thread per in-flight request
+                size = self.max_in_flight if self.remote else self.workers
+                self._threads = ThreadPoolExecutor(max_workers=size, thread_name_prefix="rulecheck")
+            return self._threads
+
+    def _get_processes(self) -> ProcessPoolExecutor:
+        version = curriculum_registry.version()
+        with self._lock:
+            if self._processes is None or self._processes_version != version:
+                if self._processes is not None:
+                    # running evaluations finish on the old workers
+                    self._processes.shutdown(wait=False)
+                self._processes = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    initializer=batch_rulecheck.init_worker,
+                    initargs=(curriculum_registry.snapshot(),),
+                )
+                self._processes_version = version
+            return self._processes
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """
+        `fn(*args)` once an in-flight slot is free (raises Overloaded when the queue is
+        full). Runs inline or on the executor's threads, with the caller's context
+        variables (the phase timer) visible to `fn`.
+        """
+        limiter = self._get_limiter()
+        await limiter.acquire()
+        try:
+            if self.mode == "inline":
+                return fn(*args)
+            ctx = contextvars.copy_context()
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_threads(), functools.partial(ctx.run, fn, *args))
+        finally:
+            limiter.release()
+
+    async def acquire(self) -> None:
+        """
+        Take an in-flight slot for work that runs elsewhere (a batch in its own process
+        pool); raises Overloaded like run(). Every acquire() needs one release().
+        """
+        await self._get_limiter().acquire()
+
+    def release(self) -> None:
+        self._get_limiter().release()
+
+    def evaluate_remote(self, checker: Any, payload: Dict[str, Any]) -> Any:
+        """checker.evaluate(payload) in a worker process; blocks the calling thread."""
+        timer = phase_timing.active()
+        future = self._get_processes().submit(
+            _evaluate_in_worker, checker.program_code, payload, timer is not None
+        )
+        result, phases = future.result()
+        if timer is not None and phases:
+            timer.absorb(phases)
+            timer.lap("ipc")
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        limiter = self._limiter.stats() if self._limiter is not None else {}
+        return {"mode": self.mode, "workers": self.workers, **limiter}
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._threads is not None:
+                self._threads.shutdown(wait=False, cancel_futures=True)
+            if self._processes is not None:
+                self._processes.shutdown(wait=False, cancel_futures=True)
+            self._threads = None
+            self._processes = None
+            self._processes_version = ""
+
+
+# ----------------------------
+# Worker side
+# ----------------------------
+
+def _evaluate_in_worker(program_code: str, payload: Dict[str, Any], timed: bool) -> Tuple[Any, Optional[Dict[str, float]]]:
+    checker = curriculum_registry.get_checker(program_code)
+    if checker is None:
+        raise LookupError(f"No curriculum for program {program_code} in this worker")
+    if not timed:
+        return checker.evaluate(payload), None
+    with phase_timing.recording() as timer:
+        result = checker.evaluate(payload)
+    return result, timer.phases
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import unicodedata
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Optional
+
+# Distinct strings seen in practice are the curriculum tables (a few hundred) plus the
+# course codes/titles/categories clients send; this keeps all of them warm.
+CACHE_SIZE = 8192
+
+
+class _FoldTable(dict):
+    """
+    str.translate table for fold_key, filled lazily per code point: combining marks are
+    dropped, characters that are neither alphanumeric nor whitespace become a space.
+    """
+
+    def __missing__(self, cp: int) -> Optional[str]:
+        ch = chr(cp)
+        if unicodedata.combining(ch):
+            value: Optional[str] = None
+        elif ch.isalnum() or ch.isspace():
+            value = ch
+        else:
+            value = " "
+        self[cp] = value
+        return value
+
+
+_FOLD_TABLE = _FoldTable()
+for _cp in range(128):
+    _FOLD_TABLE[_cp]  # pre-fill ASCII
+del _cp
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _fold(text: str) -> str:
+    if text.isascii():
+        t = text.lower()
+    else:
+        t = unicodedata.normalize("NFKD", text).lower()
+    return " ".join(t.translate(_FOLD_TABLE).split())
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _plain(text: str) -> str:
+    return text.strip().lower()
+
+
+def fold_key(text: Any) -> str:
+    """
+    Accent-, case- and punctuation-insensitive key: "Einführung in die Programmierung 1"
+    -> "einfuhrung in die programmierung 1", "VU/SE-Math." -> "vu se math".
+    """
+    if not text:
+        return ""
+    if text.__class__ is not str:
+        text = str(text)
+    return _fold(text)
+
+
+def plain_key(text: Any) -> str:
+    """Trimmed, lower-cased key (exact spelling otherwise)."""
+    if text is None:
+        return ""
+    if text.__class__ is not str:
+        text = str(text)
+    return _plain(text)
+
+
+def prime(values: Iterable[str]) -> None:
+    """Fill both caches with known strings (curriculum tables) so lookups start warm."""
+    for value in values:
+        _fold(value)
+        _plain(value)
+
+
+def cache_stats() -> Dict[str, Dict[str, int]]:
+    stats: Dict[str, Dict[str, int]] = {}
+    for name, fn in (("fold", _fold), ("plain", _plain)):
+        info = fn.cache_info()
+        stats[name] = {"hits": info.hits, "misses": info.misses, "size": info.currsize, "maxsize": info.maxsize or 0}
+    return stats
+
+
+def cache_clear() -> None:
+    _fold.cache_clear()
+    _plain.cache_clear()
@@ -0,0 +1,604 @@
+"""
+NumPy engine evaluating many plans of one program at once (cohort audits, what-if
+sweeps), checked against RuleChecker.evaluate by bench/vector_diff.
+
+numpy is an optional dependency: pip install ".[vector]" (see pyproject.toml). Without
+it the module still imports and available() is False.
+"""
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # optional: only cohort audits and what-if sweeps need this engine
+    np = None  # type: ignore[assignment]
+
+# Compiled engines kept per process, keyed by curriculum fingerprint
+MAX_ENGINES = 8
+
+_engines: "OrderedDict[Hashable, Any]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def available() -> bool:
+    return np is not None
+
+
+def engine_for(checker: Any) -> Any:
+    """The vector engine for a RuleChecker (compiled once per curriculum)."""
+    if np is None:
+        raise RuntimeError('The vectorized rulecheck engine needs numpy (pip install ".[vector]").')
+    key = (checker.curriculum.engine, checker.curriculum.fingerprint)
+    with _lock:
+        engine = _engines.get(key)
+        if engine is not None and engine.checker is checker:
+            _engines.move_to_end(key)
+            return engine
+    engine = _ENGINES[checker.curriculum.engine](checker)
+    with _lock:
+        _engines[key] = engine
+        while len(_engines) > MAX_ENGINES:
+            _engines.popitem(last=False)
+    return engine
+
+
+def evaluate_many(checker: Any, payloads: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Evaluate many plans of one program at once. Per plan, one of:
+
+      {"stats": {...}, "missing": [...], "violations": [...]}
+          the subset of checker.evaluate's result the engine supports: the stats keys
+          present are exact, "missing"/"violations" hold exactly the lines of evaluate
+          that start with the engine's MISSING_PREFIXES/VIOLATION_PREFIXES (in order)
+      {"rejected": message, "stats": {...}}
+          evaluate rejects the plan before checking it (wrong program, unparsable course)
+      {"error": message}
+          evaluate raises for the plan
+    """
+    return engine_for(checker).evaluate(payloads)
+
+
+# ----------------------------
+# Shared helpers
+# ----------------------------
+
+def _memo(fn: Callable[[Dict[str, Any], str, int], Any], signature: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Per-call cache of fn(course, status, lane) by the checker's course signature: plans
+    of a cohort share most of their courses, so each distinct course is parsed and
+    encoded once. Unhashable signatures bypass the cache.
+    """
+    memo: Dict[Any, Any] = {}
+
+    def cached(course: Dict[str, Any], status: str, lane: int) -> Any:
+        try:
+            key = signature(course, status, lane)
+            hit = memo.get(key)
+        except TypeError:
+            return fn(course, status, lane)
+        if hit is None:
+            hit = memo[key] = fn(course, status, lane)
+        return hit
+
+    return cached
+
+
+def _index(values: Dict[Any, int], value: Any) -> int:
+    idx = values.get(value)
+    if idx is None:
+        idx = values[value] = len(values)
+    return idx
+
+
+def _add(shape: Any, index: Any, ects: Any) -> Any:
+    """
+    ECTS sums over `index`. np.add.at applies repeated indices in array order, i.e. in
+    the order the checker adds the courses, so the sums are bit-identical to the
+    checker's running float sums.
+    """
+    sums = np.zeros(shape)
+    np.add.at(sums, index, ects)
+    return sums
+
+
+def _count(shape: Any, index: Any) -> Any:
+    counts = np.zeros(shape, dtype=np.int64)
+    np.add.at(counts, index, 1)
+    return counts
+
+
+def _keyed(sums: Any, counts: Any, keys: Sequence[Any], digits: int) -> Dict[Any, float]:
+    """{key: round(sum)} for the keys with items, in `keys` order (one plan's rows)."""
+    return {keys[j]: round(s, digits) for j, (s, n) in enumerate(zip(sums.tolist(), counts.tolist())) if n}
+
+
+def _duplicates(plan: Any, codes: Any, n_plans: int) -> Any:
+    """Plans in which a code id (>= 0) occurs more than once."""
+    valid = codes >= 0
+    width = int(codes.max(initial=0)) + 1
+    uniq, counts = np.unique(plan[valid] * width + codes[valid], return_counts=True)
+    dup = np.zeros(n_plans, dtype=bool)
+    dup[uniq[counts > 1] // width] = True
+    return dup
+
+
+# ----------------------------
+# Bachelor
+# ----------------------------
+
+class BachelorVectorEngine:
+    """
+    Bachelor checks over dense arrays: plans x catalog modules ECTS, plans x lanes load,
+    plans x categories, StEOP tags/pool and focus group counts (module completion
+    matrix x group membership).
+
+    Supported: totalEcts, ectsMissingTo180, ectsPerSemester, ectsByCategory,
+    narrowElectives, steop.planned, focusRanking (without the title lists), the
+    semester overload violations and the StEOP, mandatory, thesis, narrow elective,
+    TS, total and selected-focus missing lines.
+    """
+
+    MISSING_PREFIXES = (
+        "StEOP ",
+        "Pflichtmodul fehlt:",
+        "Bachelorarbeit fehlt:",
+        "Wahlmodule der engen Wahl",
+        "Transferable Skills:",
+        "Gesamtumfang:",
+        "Vertiefung (",
+    )
+    VIOLATION_PREFIXES = ("rejected: semester ",)
+
+    # Columns of an encoded course row
+    LANE, ECTS, COUNTED, MODULE, CATEGORY, POOL, TAG, CODE, ERROR, UNPARSABLE = range(10)
+
+    def __init__(self, checker: Any) -> None:
+        c = self.checker = checker
+        self.module_keys = list(c.modules)
+        self.module_col = {k: i for i, k in enumerate(self.module_keys)}
+        modules = list(c.modules.values())
+        self.titles = [m["title"] for m in modules]
+        self.required = np.array([float(m["ects"]) for m in modules])
+        self.narrow = np.array([m["kind"] == "narrow_elective" for m in modules], dtype=bool)
+        self.mandatory_cols = np.array([i for i, m in enumerate(modules) if m["kind"] == "mandatory"], dtype=np.int64)
+        # same iteration order as the checker's sum over the set
+        self.thesis_cols = [self.module_col[k] for k in c.thesis_module_keys]
+        self.tags = list(dict.fromkeys(tag for tag, _, _ in c.steop_mandatory))
+        self.tag_col = {t: i for i, t in enumerate(self.tags)}
+
+        # Focus groups: column g of `membership` marks the catalog modules of group g.
+        # module_bits gives catalog module i bit i; focus titles outside the catalog have
+        # higher bits and are never complete, so they are simply not members.
+        self.focuses = list(c.focus_masks.values())
+        groups: List[Any] = []
+        required_groups: List[int] = []
+        self.choice_groups: List[List[int]] = []
+        for fm in self.focuses:
+            required_groups.append(len(groups))
+            groups.append(fm.required)
+            first = len(groups)
+            groups.extend(fm.choice_groups)
+            self.choice_groups.append(list(range(first, len(groups))))
+        self.required_groups = np.array(required_groups, dtype=np.int64)
+        self.group_min = np.array([g.min for g in groups], dtype=np.int64)
+        self.membership = np.zeros((len(self.module_keys), len(groups)), dtype=np.int64)
+        for j, g in enumerate(groups):
+            for i in range(len(self.module_keys)):
+                if g.mask >> i & 1:
+                    self.membership[i, j] = 1
+        # (groups x focuses): sums the choice group gaps of each focus
+        self.choice_of = np.zeros((len(groups), len(self.focuses)), dtype=np.int64)
+        for f, gs in enumerate(self.choice_groups):
+            self.choice_of[gs, f] = 1
+        self.focus_needed = [fm.required.min + sum(g.min for g in fm.choice_groups) for fm in self.focuses]
+
+    def evaluate(self, payloads: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        c = self.checker
+        n_plans = len(payloads)
+        out: List[Optional[Dict[str, Any]]] = [None] * n_plans
+        cats: Dict[str, int] = {}
+        codes: Dict[str, int] = {}
+
+        def encode(course: Dict[str, Any], status: str, lane: int) -> Tuple[float, ...]:
+            rec = c.parse_course(course, status, lane)
+            return (
+                rec.lane,
+                rec.ects if rec.ects is not None else 0.0,
+                rec.counted,
+                self.module_col.get(rec.module_key, -1),
+                _index(cats, rec.category),
+                rec.steop_pool,
+                self.tag_col.get(rec.steop_tag, -1) if rec.steop_tag else -1,
+                _index(codes, rec.code_key) if rec.code else -1,
+                rec.error is not None,
+                rec.ects is None,
+            )
+
+        # ---- encode: one row per course, in the checker's order ----
+        encoded = _memo(encode, c.course_signature)
+        table: List[Tuple[float, ...]] = []
+        plan_ids: List[int] = []
+        for p, payload in enumerate(payloads):
+            rejected = c._check_program(payload)
+            if rejected is not None:
+                out[p] = {"rejected": rejected.message, "stats": rejected.stats}
+                continue
+            rows = [encoded(course, s, li) for course, s, li in c.plan_items(payload)]
+            table.extend(rows)
+            plan_ids.extend([p] * len(rows))
+
+        data = np.array(table, dtype=float).reshape(-1, 10)
+        plan = np.array(plan_ids, dtype=np.int64)
+        col = lambda k, dtype=np.int64: data[:, k].astype(dtype)  # noqa: E731
+        ects = data[:, self.ECTS]
+        counted = col(self.COUNTED, bool)
+
+        # evaluate raises summing an unparsable ECTS value
+        for p in np.unique(plan[col(self.UNPARSABLE, bool)]).tolist():
+            for course, s, li in c.plan_items(payloads[p]):
+                rec = c.parse_course(course, s, li)
+                if rec.ects is None:
+                    try:
+                        c._to_float(rec.ects_raw)
+                    except Exception as exc:
+                        out[p] = {"error": f"{type(exc).__name__}: {exc}"}
+                        break
+
+        # ---- aggregate ----
+        has_error = _duplicates(plan, col(self.CODE), n_plans)
+        has_error[plan[col(self.ERROR, bool)]] = True
+        total = _add(n_plans, plan, ects)
+        pool_rows = col(self.POOL, bool)
+        pool = _add(n_plans, plan[pool_rows], ects[pool_rows])
+        tags = col(self.TAG)
+        tags_present = np.zeros((n_plans, len(self.tags)), dtype=bool)
+        tags_present[plan[tags >= 0], tags[tags >= 0]] = True
+
+        cp, ce = plan[counted], ects[counted]
+        lane_values, lane_idx = np.unique(col(self.LANE)[counted], return_inverse=True)
+        lane_sums = _add((n_plans, len(lane_values)), (cp, lane_idx), ce)
+        lane_counts = _count((n_plans, len(lane_values)), (cp, lane_idx))
+        cat_idx = col(self.CATEGORY)[counted]
+        cat_sums = _add((n_plans, len(cats)), (cp, cat_idx), ce)
+        cat_counts = _count((n_plans, len(cats)), (cp, cat_idx))
+        modules = col(self.MODULE)
+        in_catalog = counted & (modules >= 0)
+        mod_all = _add((n_plans, len(self.module_keys)), (plan[in_catalog], modules[in_catalog]), ects[in_catalog])
+
+        # ---- checks ----
+        complete = mod_all >= self.required - 1e-6
+        narrow_done = complete & self.narrow
+        mandatory_short = mod_all[:, self.mandatory_cols] + 1e-6 < self.required[self.mandatory_cols]
+        thesis_have = np.zeros(n_plans)
+        for i in self.thesis_cols:
+            thesis_have = thesis_have + mod_all[:, i]
+        group_counts = complete.astype(np.int64) @ self.membership
+        group_gaps = np.maximum(0, self.group_min - group_counts)
+        focus_left = (
+            self.group_min[self.required_groups] - group_counts[:, self.required_groups] + group_gaps @ self.choice_of
+        )
+        overloaded = (lane_sums > c.MAX_ECTS_PER_SEMESTER + 1e-6) & (lane_counts > 0) & ~has_error[:, None]
+
+        cat_keys = list(cats)
+        lane_list = lane_values.tolist()
+        lane_keys = [str(v) for v in lane_list]
+        ts_col = cats.get("transferable_skills")
+
+        # ---- results (formatting only) ----
+        for p in range(n_plans):
+            if out[p] is not None:
+                continue
+            payload = payloads[p]
+            missing: List[str] = []
+            violations = [
+                f"rejected: semester {lane_list[j]+1} exceeds max load ({lane_sums[p, j]:.1f} ECTS > {c.MAX_ECTS_PER_SEMESTER:.1f})."
+                for j in np.flatnonzero(overloaded[p]).tolist()
+            ]
+
+            present = {t for t, hit in zip(self.tags, tags_present[p].tolist()) if hit}
+            pool_ects = pool[p].item()
+            mandatory_ok = c.steop_required_tags.issubset(present)
+            pool_ok = pool_ects >= c.steop_pool_min_ects - 1e-6
+            steop_plan = {
+                "mandatoryPresent": sorted(present),
+                "poolEcts": round(pool_ects, 2),
+                "mandatoryOk": mandatory_ok,
+                "poolOk": pool_ok,
+                "isComplete": bool(mandatory_ok and pool_ok),
+            }
+            if not steop_plan["isComplete"]:
+                for tag, label, need in c.steop_mandatory:
+                    if tag not in present:
+                        missing.append(f"StEOP Pflicht-LV fehlt: {label} ({need:.1f} ECTS)")
+                pool_missing = max(0.0, c.steop_pool_min_ects - float(steop_plan["poolEcts"]))
+                if pool_missing > 1e-6:
+                    missing.append(
+                        f"StEOP Pool: {pool_missing:.1f} ECTS fehlen (mind. {c.steop_pool_min_ects:g} ECTS aus: {c.steop_pool_label})."
+                    )
+
+            if mandatory_short[p].any():
+                for j in np.flatnonzero(mandatory_short[p]).tolist():
+                    i = int(self.mandatory_cols[j])
+                    req, have = self.required[i].item() or 0.0, mod_all[p, i].item()
+                    missing.append(f"Pflichtmodul fehlt: {self.titles[i]} ({req - have:.1f} ECTS)")
+            thesis = thesis_have[p].item()
+            if thesis + 1e-6 < c.thesis_ects:
+                missing.append(f"Bachelorarbeit fehlt: {c.thesis_ects - thesis:.1f} ECTS")
+            narrow_completed = [self.titles[i] for i in np.flatnonzero(narrow_done[p]).tolist()]
+            if len(narrow_completed) < c.MIN_NARROW_ELECTIVE_MODULES:
+                missing.append(
+                    f"Wahlmodule der engen Wahl (+): mindestens {c.MIN_NARROW_ELECTIVE_MODULES} Module nötig, aktuell {len(narrow_completed)}."
+                )
+            ts_ects = cat_sums[p, ts_col].item() if ts_col is not None and cat_counts[p, ts_col] else 0.0
+            if ts_ects + 1e-6 < c.TRANSFERABLE_SKILLS_MIN_ECTS:
+                missing.append(f"Transferable Skills: mindestens {c.TRANSFERABLE_SKILLS_MIN_ECTS:.1f} ECTS nötig (aktuell {ts_ects:.1f}).")
+            total_ects = total[p].item()
+            if total_ects + 1e-6 < c.TOTAL_ECTS:
+                missing.append(f"Gesamtumfang: {c.TOTAL_ECTS - total_ects:.1f} ECTS fehlen bis {c.TOTAL_ECTS:.0f}.")
+
+            focus_raw = payload.get("selectedFocus") or payload.get("vertiefung")
+            focus_key_in = c._norm(focus_raw) if focus_raw else ""
+            focus_key = c.focus_aliases.get(focus_key_in, focus_key_in)
+            ranking: List[Dict[str, Any]] = []
+            for f, (fm, needed, left) in enumerate(zip(self.focuses, self.focus_needed, focus_left[p].tolist())):
+                ranking.append({
+                    "name": fm.name,
+                    "selected": fm.key == focus_key,
+                    "complete": left == 0,
+                    "completedCount": needed - left,
+                    "requiredCount": needed,
+                    "remainingCount": left,
+                    "progress": round((needed - left) / needed, 3) if needed else 1.0,
+                })
+                if fm.key == focus_key:
+                    counts = [group_counts[p, g].item() for g in self.choice_groups[f]]
+                    missing.extend(self._focus_missing(payload, fm, complete[p].tolist(), counts))
+            ranking.sort(key=lambda r: (r["remainingCount"], -r["progress"], r["name"]))
+
+            stats = {
+                "totalEcts": round(total_ects, 2),
+                "ectsMissingTo180": round(max(0.0, c.TOTAL_ECTS - total_ects), 2),
+                "ectsPerSemester": _keyed(lane_sums[p], lane_counts[p], lane_keys, 2),
+                "ectsByCategory": dict(sorted(_keyed(cat_sums[p], cat_counts[p], cat_keys, 2).items())),
+                "narrowElectives": {
+                    "requiredCount": c.MIN_NARROW_ELECTIVE_MODULES,
+                    "completedCount": len(narrow_completed),
+                    "completed": narrow_completed,
+                    "allOptionsCount": int(self.narrow.sum()),
+                },
+                "steop": {"planned": steop_plan},
+                "focusRanking": ranking,
+            }
+            out[p] = {"stats": stats, "missing": missing, "violations": violations}
+
+        return out  # type: ignore[return-value]
+
+    def _focus_missing(self, payload: Dict[str, Any], fm: Any, done_cols: List[bool], choice_counts: List[int]) -> List[str]:
+        n = len(done_cols)
+
+        def remaining(grp: Any) -> List[str]:
+            return [t for t, b in grp.items if b.bit_length() > n or not done_cols[b.bit_length() - 1]]
+
+        focus_name = (payload.get("selectedFocus") or payload.get("vertiefung") or "").strip() or "Vertiefung"
+        lines = [f"Vertiefung ({focus_name}): Pflichtmodul fehlt: {t}" for t in remaining(fm.required)]
+        for grp, got in zip(fm.choice_groups, choice_counts):
+            if got < grp.min:
+                lines.append(f"Vertiefung ({focus_name}): es fehlen {grp.min - got} Module aus: {', '.join(remaining(grp))}")
+        return lines
+
+
+# ----------------------------
+# Master
+# ----------------------------
+
+class MasterVectorEngine:
+    """
+    Master checks over dense arrays: per plan done/planned ECTS and the curriculum
+    buckets (subject modules, free choice/TS, diploma parts with the allocation of
+    generic diploma ECTS), plans x lanes load, plans x categories, plans x exam subjects
+    and plans x course presence.
+
+    Supported: ects, buckets, per_semester, by_category, by_exam_subject, the semester
+    load violation and the mandatory, subject module, diploma, TS, total and free choice
+    missing lines.
+    """
+
+    MISSING_PREFIXES = (
+        "Mandatory:",
+        "At least ",
+        "Diploma requirement:",
+        "Transferable Skills:",
+        "Total ECTS:",
+        "Free Choice/Transferable Skills module:",
+    )
+    VIOLATION_PREFIXES = ("Semester ",)
+
+    SUBJECT = ("mandatory", "core", "elective", "extension")
+    FREE = ("free", "transferable_skills")
+    DIPLOMA_PARTS = ("diploma_thesis", "diploma_seminar", "diploma_defense")
+
+    # Columns of an encoded course row
+    LANE, ECTS, DONE, CATEGORY, EXAM, CODE = range(6)
+
+    def __init__(self, checker: Any) -> None:
+        self.checker = checker
+        self.diploma_needs = [checker.diploma_targets.get(part, 0.0) for part in self.DIPLOMA_PARTS]
+
+    def evaluate(self, payloads: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        c = self.checker
+        n_plans = len(payloads)
+        out: List[Optional[Dict[str, Any]]] = [None] * n_plans
+        cats: Dict[str, int] = {}
+        exams: Dict[str, int] = {"": 0}
+        codes: Dict[str, int] = {}
+
+        def row(r: Dict[str, Any]) -> Tuple[float, ...]:
+            return (
+                r["laneIndex"],
+                r["ects"],
+                r["status"] == "done",
+                _index(cats, r["category"]),
+                _index(exams, r["examSubject_key"]),
+                _index(codes, r["code_key"]),
+            )
+
+        def encode(course: Dict[str, Any], status: str, lane: int) -> Tuple[Optional[Tuple[float, ...]], Optional[str]]:
+            r, error = c.parse_course(course, status, lane)
+            return (None, error) if error is not None else (row(r), None)
+
+        # ---- encode: one row per course, in the checker's order; the first bad course rejects the plan ----
+        encoded = _memo(encode, c.course_signature)
+        table: List[Tuple[float, ...]] = []
+        plan_ids: List[int] = []
+        for p, payload in enumerate(payloads):
+            items = c.plan_items(payload)
+            if items is None:
+                # explicit lanes: the checker's own parser validates their shape
+                records, error = c._parse_courses(c._extract_lanes(payload), payload)
+                rows = [(None, error)] if error is not None else [(row(r), None) for r in records]
+            else:
+                rows = [encoded(course, s, li) for course, s, li in items]
+            error = next((e for row, e in rows if e is not None), None)
+            if error is not None:
+                out[p] = {"rejected": error, "stats": {}}
+                continue
+            table.extend(row for row, _ in rows)
+            plan_ids.extend([p] * len(rows))
+
+        data = np.array(table, dtype=float).reshape(-1, 6)
+        plan = np.array(plan_ids, dtype=np.int64)
+        col = lambda k, dtype=np.int64: data[:, k].astype(dtype)  # noqa: E731
+        ects = data[:, self.ECTS]
+        done = col(self.DONE, bool)
+        cat = col(self.CATEGORY)
+
+        def bucket(rows: Any) -> Any:
+            return _add(n_plans, plan[rows], ects[rows])
+
+        def in_cats(names: Sequence[str]) -> Any:
+            return np.isin(cat, [cats[n] for n in names if n in cats])
+
+        # ---- aggregate ----
+        done_ects, planned_ects = bucket(done), bucket(~done)
+        subject = bucket(in_cats(self.SUBJECT))
+        free = bucket(in_cats(self.FREE))
+        transferable = bucket(in_cats(("transferable_skills",)))
+        diploma_cats = [k for k in cats if k.startswith("diploma_")]
+        diploma = bucket(in_cats(diploma_cats))
+        parts = [bucket(in_cats((part,))) for part in self.DIPLOMA_PARTS]
+        other = bucket(in_cats([k for k in diploma_cats if k not in self.DIPLOMA_PARTS]))
+
+        # generic diploma ECTS fill the missing parts in order (thesis -> seminar -> defense)
+        remaining = np.maximum(0.0, other)
+        allocated = []
+        for have, need in zip(parts, self.diploma_needs):
+            alloc = np.minimum(remaining, np.maximum(0.0, need - have))
+            allocated.append(have + alloc)
+            remaining = remaining - alloc
+
+        lane_values, lane_idx = np.unique(col(self.LANE), return_inverse=True)
+        lane_sums = _add((n_plans, len(lane_values)), (plan, lane_idx), ects)
+        lane_counts = _count((n_plans, len(lane_values)), (plan, lane_idx))
+        cat_sums = _add((n_plans, len(cats)), (plan, cat), ects)
+        cat_counts = _count((n_plans, len(cats)), (plan, cat))
+        exam = col(self.EXAM)
+        with_exam = exam > 0
+        exam_sums = _add((n_plans, len(exams)), (plan[with_exam], exam[with_exam]), ects[with_exam])
+        exam_counts = _count((n_plans, len(exams)), (plan[with_exam], exam[with_exam]))
+        mandatory = [(m, codes.get(key, -1)) for m, key in c.mandatory_module_keys]
+        mandatory_present = np.zeros((n_plans, len(mandatory) + 1), dtype=bool)
+        mandatory_col = np.full(len(codes) + 1, len(mandatory), dtype=np.int64)  # unlisted codes -> spare column
+        for j, (_, code) in enumerate(mandatory):
+            if code >= 0:
+                mandatory_col[code] = j
+        mandatory_present[plan, mandatory_col[col(self.CODE)]] = True
+
+        cat_keys = list(cats)
+        exam_keys = list(exams)
+        lane_keys = [str(v) for v in lane_values.tolist()]
+
+        # ---- results (formatting only) ----
+        for p in range(n_plans):
+            if out[p] is not None:
+                continue
+            done_p, planned_p = done_ects[p].item(), planned_ects[p].item()
+            subject_p, free_p = subject[p].item(), free[p].item()
+            transferable_p, diploma_p = transferable[p].item(), diploma[p].item()
+            thesis, seminar, defense = (a[p].item() for a in allocated)
+            total_ects = done_p + planned_p
+            needs = self.diploma_needs
+            diploma_need = needs[0] + needs[1] + needs[2]
+
+            missing: List[str] = []
+            for j, (m, _) in enumerate(mandatory):
+                if not mandatory_present[p, j]:
+                    spec = c.mandatory_modules[m]
+                    if spec["ects_max"] > spec["ects_min"]:
+                        missing.append(f"Mandatory: {m} (min. {spec['ects_min']:.1f} ECTS) is missing.")
+                    else:
+                        missing.append(f"Mandatory: {m} ({spec['ects_min']:.1f} ECTS) is missing.")
+            if subject_p + 1e-9 < c.SUBJECT_MODULES_MIN_ECTS:
+                need = c.SUBJECT_MODULES_MIN_ECTS - subject_p
+                missing.append(
+                    f"At least {c.SUBJECT_MODULES_MIN_ECTS:.1f} ECTS from Pflicht/Core/Wahl modules (excluding Free Choice/TS): need {need:.1f} more."
+                )
+            if diploma_p + 1e-9 < diploma_need:
+                missing.append(
+                    f"Diploma requirement: need {diploma_need - diploma_p:.1f} more ECTS in {c.diploma_subject} (total {diploma_need:.1f})."
+                )
+            for part, have, need in zip(self.DIPLOMA_PARTS, (thesis, seminar, defense), needs):
+                if have + 1e-9 < need:
+                    label = c.diploma_labels.get(part, part)
+                    missing.append(f"Diploma requirement: {label} needs {need - have:.1f} more ECTS (target {need:.1f}).")
+            if transferable_p + 1e-9 < c.TRANSFERABLE_SKILLS_MIN_ECTS:
+                missing.append(
+                    f"Transferable Skills: need {c.TRANSFERABLE_SKILLS_MIN_ECTS - transferable_p:.1f} more ECTS (minimum {c.TRANSFERABLE_SKILLS_MIN_ECTS:.1f})."
+                )
+            if total_ects + 1e-9 < c.TOTAL_ECTS:
+                missing.append(f"Total ECTS: need {c.TOTAL_ECTS - total_ects:.1f} more to reach {c.TOTAL_ECTS:.0f}.")
+            needed_free = max(0.0, c.TOTAL_ECTS - (subject_p + diploma_p))
+            if free_p + 1e-9 < needed_free:
+                missing.append(
+                    f"Free Choice/Transferable Skills module: need {needed_free - free_p:.1f} more ECTS to reach total {c.TOTAL_ECTS:.0f}."
+                )
+
+            per_semester = _keyed(lane_sums[p], lane_counts[p], lane_keys, 1)
+            violations: List[str] = []
+            for sem_str, load in per_semester.items():
+                # the checker compares the rounded load
+                if load > c.MAX_ECTS_PER_SEMESTER + 1e-9:
+                    violations.append(
+                        f"Semester {int(sem_str) + 1} exceeds the maximum allowed planning load of "
+                        f"{c.MAX_ECTS_PER_SEMESTER:.1f} ECTS (currently {load:.1f})."
+                    )
+                    break
+
+            stats = {
+                "ects": {
+                    "done": round(done_p, 1),
+                    "planned": round(planned_p, 1),
+                    "total": round(total_ects, 1),
+                    "target_total": c.TOTAL_ECTS,
+                },
+                "buckets": {
+                    "subject_modules_excl_free": round(subject_p, 1),
+                    "free_choice_and_ts": round(free_p, 1),
+                    "transferable_skills": round(transferable_p, 1),
+                    "diploma_total": round(diploma_p, 1),
+                    "diploma_thesis_allocated": round(thesis, 1),
+                    "diploma_seminar_allocated": round(seminar, 1),
+                    "diploma_defense_allocated": round(defense, 1),
+                    "needed_free_to_hit_120": round(needed_free, 1),
+                },
+                "per_semester": per_semester,
+                "by_category": dict(sorted(_keyed(cat_sums[p], cat_counts[p], cat_keys, 1).items())),
+                "by_exam_subject": dict(sorted(_keyed(exam_sums[p], exam_counts[p], exam_keys, 1).items())),
+            }
+            out[p] = {"stats": stats, "missing": missing, "violations": violations}
+        return out  # type: ignore[return-value]
+
+
+_ENGINES = {"bachelor": BachelorVectorEngine, "master": MasterVectorEngine}
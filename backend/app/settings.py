@@ -4,8 +4,29 @@ from typing import List
 class Settings(BaseSettings):
     DATABASE_URL: str
     CORS_ORIGIN: str | None = None
-    USE_CATALOG_MAT: int = 0
+    USE_CATALOG_MAT: int = 1  # GET /catalog reads v_catalog_json_mat; 0 = the live view v_catalog_json
+    CATALOG_REFRESH_POLL_SECONDS: int = 1  # how often a worker checks catalog_dirty; 0 = never refresh
+    CATALOG_REFRESH_DEBOUNCE_SECONDS: int = 2  # refresh once changes have been quiet this long...
+    CATALOG_REFRESH_MAX_DELAY_SECONDS: int = 30  # ...or the oldest pending change is this old
+    CATALOG_CACHE: int = 1  # serve /catalog from per-process ETag'd bytes, dropped on NOTIFY catalog_changed
+    RULECHECK_INCREMENTAL: int = 1  # reuse per-session aggregates for /rulecheck deltas
+    RULECHECK_BATCH_WORKERS: int = 0  # worker processes for /rulecheck/batch; 0 = one per CPU
+    RULECHECK_BATCH_MAX_PLANS: int = 5000
+    RULECHECK_COMPLETE_BUDGET_MS: int = 250  # search time limit of /rulecheck/complete
+    PLAN_SCHEDULE_BUDGET_MS: int = 200  # local-search time limit of /plan/schedule
+    RULECHECK_CACHE_SIZE: int = 4096  # cached /rulecheck results per process; 0 = off
+    RULECHECK_CACHE_TTL_SECONDS: int = 600
+    RULECHECK_DELTA_BASES: int = 1024  # result bodies held for delta responses; 0 = always full
+    RULECHECK_EXECUTOR: str = "thread"  # where /rulecheck evaluates: inline | thread | process
+    RULECHECK_EXECUTOR_WORKERS: int = 0  # threads/processes of the executor; 0 = one per CPU
+    RULECHECK_MAX_IN_FLIGHT: int = 0  # concurrent /rulecheck evaluations; 0 = one per executor worker
+    RULECHECK_MAX_QUEUED: int = 256  # /rulecheck requests waiting for a slot before answering 503
+    RULECHECK_TIMING: int = 0  # per-phase timing: Server-Timing header, stats.timings on request, /rulecheck/metrics
+    COHORT_SUMMARY_ON_SAVE: int = 1  # refresh the user's planner_state_summary rows on PUT /planner-state
+    COHORT_MIN_USERS: int = 5  # GET /analytics/cohort leaves out programs and groups with fewer users
     MIGRATIONS_DIR: str = "sql"  # relative to project root
+    CURRICULA_DIR: str = "curricula"  # per-program rule files (<code without spaces>.json)
+    CURRICULUM_REFRESH_SECONDS: int = 60  # recompile curricula from the catalog; 0 = only on startup
 
     model_config = SettingsConfigDict(env_file=".env", env_prefix="")
 
@@ -0,0 +1 @@
+# Micro-benchmarks for the backend services (run from backend/: python -m bench.<module>).
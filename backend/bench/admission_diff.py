@@ -0,0 +1,95 @@
+"""
+Differential check of the admissible-drop mask (services/admission) against
+RuleChecker.evaluate, plus its latency for the full catalog.
+
+    python -m bench.admission_diff [--plans 40] [--seed 1] [--only bachelor]
+
+Plans come from bench.plans (every scenario, cycled with fresh seeds up to --plans per
+program). For each plan, a random target lane and status, every catalog course must get
+the answer (ok and message) of evaluate on the plan with that course appended. Exits with
+status 1 if any program has a mismatch. Needs a migrated DATABASE_URL.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+from app.services import admission, curriculum_registry
+
+from .plans import PlanGenerator
+
+
+def plans_for(curriculum: Any, count: int, seed: int) -> List[Dict[str, Any]]:
+    plans: List[Dict[str, Any]] = []
+    round_ = 0
+    while len(plans) < count:
+        for payloads in PlanGenerator(curriculum, seed=seed + round_).scenarios().values():
+            plans.extend(payloads)
+        round_ += 1
+    return plans[:count]
+
+
+def compare(checker: Any, payload: Dict[str, Any], mask: Dict[str, Any], candidates: List[Dict[str, Any]]) -> List[str]:
+    list_name = "doneCourses" if mask["status"] == "done" else "plannedCourses"
+    out: List[str] = []
+    for candidate, row in zip(candidates, mask["courses"]):
+        course = {**candidate, "laneIndex": mask["laneIndex"]}
+        result = checker.evaluate({**payload, list_name: [*payload.get(list_name, []), course]})
+        expected = (result.ok, None if result.ok else result.message)
+        if expected != (row["ok"], row["message"]):
+            out.append(f"{row['code']}: evaluate {expected}, mask {(row['ok'], row['message'])}")
+    return out
+
+
+def run(count: int, seed: int, only: Optional[List[str]] = None) -> bool:
+    asyncio.run(curriculum_registry.load())
+    rng = random.Random(seed)
+    ok = True
+    for curriculum in curriculum_registry.snapshot():
+        if only and curriculum.engine not in only and curriculum.program_code not in only:
+            continue
+        checker = curriculum_registry.get_checker(curriculum.program_code)
+        candidates = checker.catalog_courses()
+
+        mismatches = 0
+        rejected = 0
+        latencies: List[float] = []
+        for i, payload in enumerate(plans_for(curriculum, count, seed)):
+            lane = rng.randrange(8)
+            status = "done" if rng.random() < 0.25 else "planned"
+            started = time.perf_counter()
+            mask = admission.admissible_courses(checker, payload, lane, status)
+            latencies.append((time.perf_counter() - started) * 1000)
+            rejected += sum(1 for row in mask["courses"] if not row["ok"])
+            problems = compare(checker, payload, mask, candidates)
+            if problems:
+                mismatches += 1
+                if mismatches <= 5:
+                    print(f"   plan {i} (lane {lane}, {status}): " + "; ".join(problems[:3]))
+        mark = "✅" if not mismatches else "❌"
+        print(
+            f"{mark} {curriculum.engine} {curriculum.program_code}: {len(latencies)} masks of {len(candidates)} courses "
+            f"({rejected} rejections), {mismatches} mismatches; "
+            f"median {statistics.median(latencies):.1f} ms, max {max(latencies):.1f} ms"
+        )
+        ok = ok and not mismatches
+    return ok
+
+
+def main(argv: List[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--plans", type=int, default=40, help="plans per program")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--only", action="append", help="engine (bachelor/master) or program code (repeatable)")
+    args = parser.parse_args(argv)
+    if not run(args.plans, args.seed, args.only):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+GET /catalog body production: decoded (jsonb codec -> Python tree -> jsonable_encoder ->
+JSONResponse) vs. the raw passthrough (jsonb as text -> response bytes).
+
+    python -m bench.catalog_passthrough [--rounds 5]
+
+Per program and for the all-programs listing: MB/s of response body (query included) and
+the Python memory one request allocates at peak (tracemalloc, separate run). Both bodies
+must decode to the same value. Needs a migrated DATABASE_URL.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import tracemalloc
+from typing import Awaitable, Callable, List, Optional
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.db import get_pool
+from app.routes.catalog import _query_catalog
+
+VIEW = "public.v_catalog_json_mat"
+
+
+async def decoded_body(program_code: Optional[str]) -> bytes:
+    """What the route did before: rows decoded by the codec, serialized by FastAPI."""
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        rows = await conn.fetch(
+            f"SELECT program_id, program_code, catalog FROM {VIEW}"
+            " WHERE ($1::text IS NULL OR program_code = $1) ORDER BY program_code",
+            program_code,
+        )
+    if program_code:
+        value = rows[0]["catalog"] or []
+    else:
+        value = [
+            {"program_id": str(r["program_id"]), "program_code": r["program_code"], "catalog": r["catalog"] or []}
+            for r in rows
+        ]
+    return JSONResponse(jsonable_encoder(value)).body
+
+
+async def measure(produce: Callable[[], Awaitable[bytes]], rounds: int) -> tuple:
+    times: List[float] = []
+    body = b""
+    for _ in range(rounds):
+        started = time.perf_counter()
+        body = await produce()
+        times.append(time.perf_counter() - started)
+    tracemalloc.start()
+    try:
+        await produce()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return body, statistics.median(times), peak
+
+
+async def run(rounds: int) -> bool:
+    pool = await get_pool()
+    async with pool.acquire() as conn:
+        codes = [r[0] for r in await conn.fetch(f"SELECT program_code FROM {VIEW} ORDER BY program_code")]
+    ok = True
+    for code in [*codes, None]:
+        label = code or "all programs"
+        old, old_s, old_peak = await measure(lambda: decoded_body(code), rounds)
+        new, new_s, new_peak = await measure(lambda: _query_catalog(code), rounds)
+        same = json.loads(old) == json.loads(new)
+        ok = ok and same
+        mb = 1024 * 1024
+        print(
+            f"{'✅' if same else '❌'} {label}: {len(new) / mb:.1f} MB body; "
+            f"decoded {len(old) / mb / old_s:.0f} MB/s, peak {old_peak / mb:.1f} MB; "
+            f"raw {len(new) / mb / new_s:.0f} MB/s, peak {new_peak / mb:.1f} MB "
+            f"({old_s / new_s:.1f}x)"
+        )
+    await pool.close()
+    return ok
+
+
+def main(argv: List[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=5, help="timed requests per path and program")
+    args = parser.parse_args(argv)
+    if not asyncio.run(run(args.rounds)):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Per-request rule checker setup cost: fresh construction vs. the process-wide registry.
+
+    python -m bench.checker_construction [--rounds 2000]
+
+Curricula are compiled from the catalog, so DATABASE_URL must point at a migrated database.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+from functools import partial
+from typing import Any, Callable, Dict, List
+
+from app.services import curriculum_registry
+from app.services.rule_checker_bachelor import RuleChecker as BachelorRuleChecker
+from app.services.rule_checker_master import RuleChecker as MasterRuleChecker
+
+BACHELOR_PAYLOAD: Dict[str, Any] = {
+    "programCode": "033 521",
+    "plannedCourses": [
+        {"code": "Einführung in die Programmierung 1", "ects": 5.5, "category": "mandatory", "laneIndex": 0},
+        {"code": "MA-VU", "ects": 2.0, "category": "mandatory", "laneIndex": 0},
+        {"code": "ORI-VU", "ects": 1.0, "category": "mandatory", "laneIndex": 0},
+        {"code": "ADM-VU", "ects": 9.0, "category": "mandatory", "laneIndex": 0},
+        {"code": "Einführung in die Programmierung 2", "ects": 4.0, "category": "mandatory", "laneIndex": 1},
+        {"code": "Algorithmen und Datenstrukturen", "ects": 8.0, "category": "mandatory", "laneIndex": 1},
+        {"code": "ANL-VU", "ects": 6.0, "category": "mandatory", "laneIndex": 1},
+    ],
+    "doneCourses": [],
+    "change": {"type": "plan_updated", "added": [{"code": "ANL-VU", "toLaneIndex": 1}]},
+    "selectedFocus": "se",
+}
+
+MASTER_PAYLOAD: Dict[str, Any] = {
+    "programCode": "066 937",
+    "plannedCourses": [
+        {"code": "Advanced Software Engineering", "ects": 6, "category": "mandatory",
+         "examSubject": "Software Engineering and Programming", "laneIndex": 0},
+        {"code": "Algorithmics", "ects": 6, "category": "core",
+         "examSubject": "Algorithms and Complexity", "laneIndex": 0},
+        {"code": "Complexity Theory", "ects": 6, "category": "elective",
+         "examSubject": "Algorithms and Complexity", "laneIndex": 1},
+    ],
+    "doneCourses": [],
+    "change": {"type": "plan_updated", "added": [{"code": "Complexity Theory", "toLaneIndex": 1}]},
+}
+
+
+def _per_call_us(fn: Callable[[], Any], rounds: int) -> float:
+    fn()  # warm-up
+    started = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - started) / rounds * 1e6
+
+
+def main(argv: List[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    asyncio.run(curriculum_registry.load())
+    curricula = {c.program_code: c for c in curriculum_registry.snapshot()}
+
+    cases = [
+        ("bachelor", BachelorRuleChecker, BACHELOR_PAYLOAD),
+        ("master", MasterRuleChecker, MASTER_PAYLOAD),
+    ]
+    print(f"{'program':<10} {'construct':>12} {'evaluate':>12} {'fresh/req':>12} {'registry/req':>14} {'speedup':>9}")
+    for name, engine, payload in cases:
+        curriculum = curricula[payload["programCode"]]
+        factory = partial(engine, curriculum)
+        construct = _per_call_us(factory, args.rounds)
+        fresh = _per_call_us(lambda: factory().evaluate(payload), args.rounds)
+        evaluate = fresh - construct
+        registry = _per_call_us(
+            lambda: curriculum_registry.get_checker(payload["programCode"]).evaluate(payload), args.rounds
+        )
+        print(
+            f"{name:<10} {construct:>10.1f}us {max(evaluate, 0.0):>10.1f}us {fresh:>10.1f}us "
+            f"{registry:>12.1f}us {fresh / registry:>8.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Seeded plan generator for the rule engine benchmarks.
+
+Plans are built from a compiled Curriculum (one course per catalog module), so they stay
+realistic when the catalog changes; the same seed and catalog give the same plans.
+"""
+from __future__ import annotations
+
+import random
+from typing import Any, Dict, List, Optional
+
+from app.services.curriculum_compiler import Curriculum, CurriculumModule
+
+# Lanes (semesters) of a regular plan, by engine
+REGULAR_LANES = {"bachelor": 6, "master": 4}
+ECTS_PER_LANE = 30.0
+
+
+class PlanGenerator:
+    """Scenario name -> list of payload variants, for one program."""
+
+    def __init__(self, curriculum: Curriculum, seed: int = 1, variants: int = 8) -> None:
+        self.curriculum = curriculum
+        self.seed = seed
+        self.variants = variants
+        self.lanes = REGULAR_LANES.get(curriculum.engine, 6)
+        self.mandatory = [m for m in curriculum.modules if m.category == "mandatory" or m.is_mandatory]
+        self.optional = [m for m in curriculum.modules if m not in self.mandatory]
+
+    # ----------------------------
+    # Building blocks
+    # ----------------------------
+    def _course(self, m: CurriculumModule, lane: int) -> Dict[str, Any]:
+        return {
+            "code": m.name,
+            "title": m.name,
+            "ects": m.ects,
+            "category": m.category,
+            "examSubject": m.exam_subject,
+            "laneIndex": lane,
+        }
+
+    def _payload(
+        self,
+        rng: random.Random,
+        modules: List[CurriculumModule],
+        lanes: int,
+        done_lanes: int = 0,
+        focus: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Fill lanes in order (~30 ECTS each); courses in the first `done_lanes` lanes are done."""
+        planned: List[Dict[str, Any]] = []
+        done: List[Dict[str, Any]] = []
+        lane, load = 0, 0.0
+        for m in modules:
+            if load + m.ects > ECTS_PER_LANE and load > 0 and lane < lanes - 1:
+                lane, load = lane + 1, 0.0
+            load += m.ects
+            (done if lane < done_lanes else planned).append(self._course(m, lane))
+        rng.shuffle(planned)
+        last = planned[-1]["code"] if planned else None
+        payload: Dict[str, Any] = {
+            "programCode": self.curriculum.program_code,
+            "plannedCourses": planned,
+            "doneCourses": done,
+            "change": {"type": "plan_updated", "added": [{"code": last, "toLaneIndex": 0}] if last else []},
+        }
+        if focus is not None:
+            payload["selectedFocus"] = focus
+        return payload
+
+    def _up_to(self, rng: random.Random, base: List[CurriculumModule], ects: float) -> List[CurriculumModule]:
+        """`base` plus random optional modules until `ects` are reached."""
+        picked = list(dict.fromkeys(base))
+        total = sum(m.ects for m in picked)
+        for m in rng.sample(self.optional, len(self.optional)):
+            if total >= ects:
+                break
+            if m not in picked:
+                picked.append(m)
+                total += m.ects
+        return picked
+
+    def _by_name(self, titles: List[str]) -> List[CurriculumModule]:
+        wanted = set(titles)
+        return [m for m in self.curriculum.modules if m.name in wanted]
+
+    # ----------------------------
+    # Scenarios
+    # ----------------------------
+    def scenarios(self) -> Dict[str, List[Dict[str, Any]]]:
+        total = self.curriculum.ects_total or self.lanes * ECTS_PER_LANE
+        out: Dict[str, List[Dict[str, Any]]] = {}
+
+        def variants(build) -> List[Dict[str, Any]]:
+            return [build(random.Random(f"{self.seed}:{len(out)}:{i}")) for i in range(self.variants)]
+
+        out["empty"] = variants(lambda rng: self._payload(rng, [], 1))
+        out["typical"] = variants(
+            lambda rng: self._payload(rng, self._up_to(rng, self.mandatory, total * 0.6), self.lanes, done_lanes=2)
+        )
+        out["full"] = variants(
+            lambda rng: self._payload(rng, self._up_to(rng, self.mandatory, total), self.lanes, done_lanes=self.lanes - 1)
+        )
+
+        def duplicate_heavy(rng: random.Random) -> Dict[str, Any]:
+            payload = self._payload(rng, self._up_to(rng, self.mandatory, total * 0.6), self.lanes, done_lanes=1)
+            copies = [dict(c, laneIndex=rng.randrange(self.lanes)) for c in payload["plannedCourses"] if rng.random() < 0.4]
+            payload["plannedCourses"] += copies
+            return payload
+
+        out["duplicate_heavy"] = variants(duplicate_heavy)
+        out["many_lanes"] = variants(
+            lambda rng: self._payload(rng, self._up_to(rng, self.mandatory, total), 24, done_lanes=4)
+        )
+
+        def adversarial(rng: random.Random) -> Dict[str, Any]:
+            payload = self._payload(rng, self._up_to(rng, self.mandatory, total * 0.8), self.lanes, done_lanes=2)
+            for c in payload["plannedCourses"]:
+                r = rng.random()
+                if r < 0.15:
+                    c["code"] = f"UNKNOWN-{rng.randrange(10**6)}"
+                elif r < 0.3:
+                    c["category"] = rng.choice(["", "Pflicht", "weird", "ts", "thesis"])
+                elif r < 0.45:
+                    c["examSubject"] = rng.choice(["", "?", "Unbekanntes Prüfungsfach"])
+                elif r < 0.55:
+                    c["ects"] = str(c["ects"]).replace(".", ",")
+                elif r < 0.6:
+                    c["ects"] = 40.0  # overloads its semester
+            return payload
+
+        out["adversarial"] = variants(adversarial)
+
+        for name, spec in (self.curriculum.rules.get("focuses") or {}).items():
+            titles = list(spec.get("required", []))
+            for grp in ([spec["choose"]] if "choose" in spec else []) + list(spec.get("choose_groups", [])):
+                titles += grp["from"][: int(grp["min"])]
+            out[f"focus:{name}"] = variants(
+                lambda rng, titles=titles, name=name: self._payload(
+                    rng, self._up_to(rng, self.mandatory + self._by_name(titles), total * 0.8),
+                    self.lanes, done_lanes=3, focus=name,
+                )
+            )
+        return out
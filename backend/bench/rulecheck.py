@@ -0,0 +1,165 @@
+"""
+Rule engine benchmark: latency and memory of RuleChecker.evaluate per generated scenario.
+
+    python -m bench.rulecheck [--rounds 200] [--seed 1] [--only typical] [--save FILE]
+    python -m bench.rulecheck --compare FILE [--threshold 0.15]
+
+Scenarios come from bench.plans (empty, typical, full, duplicate_heavy, many_lanes,
+adversarial and one per bachelor focus). Per scenario:
+
+  - latency percentiles over `rounds` evaluations, cycling through the plan variants
+  - peakKb: tracemalloc peak of one evaluation (CPython has no total allocation
+    counter, so this stands in for allocation volume)
+  - retainedKb / retainedBlocks: memory and allocated blocks still held by the result
+
+--save writes the report as JSON (a baseline); --compare runs the suite again and exits
+with status 1 if a scenario's p50 or peakKb regressed by more than the threshold.
+Curricula are compiled from the catalog, so DATABASE_URL must point at a migrated database.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from typing import Any, Dict, List, Optional
+
+from app.services import curriculum_registry
+
+from .plans import PlanGenerator
+
+# Metrics checked by --compare (lower is better)
+COMPARED = ("p50Us", "peakKb")
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, max(0, round(q * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+def run_scenario(checker: Any, payloads: List[Dict[str, Any]], rounds: int) -> Dict[str, Any]:
+    for payload in payloads:  # warm-up (and text_norm caches)
+        checker.evaluate(payload)
+
+    samples: List[float] = []
+    for i in range(rounds):
+        payload = payloads[i % len(payloads)]
+        started = time.perf_counter_ns()
+        checker.evaluate(payload)
+        samples.append((time.perf_counter_ns() - started) / 1000.0)
+
+    peak = retained = blocks = 0
+    tracemalloc.start()
+    try:
+        for payload in payloads:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            blocks_before = sys.getallocatedblocks()
+            result = checker.evaluate(payload)
+            blocks = max(blocks, sys.getallocatedblocks() - blocks_before)
+            current, p = tracemalloc.get_traced_memory()
+            peak = max(peak, p - before)
+            retained = max(retained, current - before)
+            del result
+    finally:
+        tracemalloc.stop()
+
+    samples.sort()
+    return {
+        "rounds": rounds,
+        "variants": len(payloads),
+        "meanUs": round(sum(samples) / len(samples), 1),
+        "p50Us": round(_percentile(samples, 0.50), 1),
+        "p90Us": round(_percentile(samples, 0.90), 1),
+        "p99Us": round(_percentile(samples, 0.99), 1),
+        "maxUs": round(samples[-1], 1),
+        "peakKb": round(peak / 1024, 1),
+        "retainedKb": round(retained / 1024, 1),
+        "retainedBlocks": blocks,
+    }
+
+
+def run_suite(rounds: int, seed: int, only: Optional[List[str]] = None) -> Dict[str, Any]:
+    asyncio.run(curriculum_registry.load())
+    scenarios: Dict[str, Any] = {}
+    for curriculum in curriculum_registry.snapshot():
+        checker = curriculum_registry.get_checker(curriculum.program_code)
+        for name, payloads in PlanGenerator(curriculum, seed=seed).scenarios().items():
+            key = f"{curriculum.engine}/{name}"
+            if only and not any(o in key for o in only):
+                continue
+            scenarios[key] = run_scenario(checker, payloads, rounds)
+            print(_row(key, scenarios[key]), flush=True)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "seed": seed,
+            "rounds": rounds,
+            "curricula": curriculum_registry.version()[:12],
+            "createdAt": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "scenarios": scenarios,
+    }
+
+
+def _row(name: str, s: Dict[str, Any]) -> str:
+    return (
+        f"{name[:60]:<60} {s['p50Us']:>9.1f} {s['p90Us']:>9.1f} {s['p99Us']:>9.1f} "
+        f"{s['peakKb']:>8.1f} {s['retainedKb']:>8.1f} {s['retainedBlocks']:>7}"
+    )
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float) -> List[str]:
+    """Regressions of `current` against `baseline` beyond `threshold` (0.15 = +15%)."""
+    regressions: List[str] = []
+    for name, base in baseline.get("scenarios", {}).items():
+        now = current["scenarios"].get(name)
+        if now is None:
+            continue
+        for metric in COMPARED:
+            old, new = base.get(metric), now.get(metric)
+            if old and new and new > old * (1 + threshold):
+                regressions.append(f"{name}: {metric} {old} -> {new} (+{(new / old - 1) * 100:.0f}%)")
+    return regressions
+
+
+def main(argv: List[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--only", action="append", help="only scenarios whose engine/name contains this (repeatable)")
+    parser.add_argument("--save", help="write the report (baseline) to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.15)
+    args = parser.parse_args(argv)
+
+    print(f"{'scenario':<60} {'p50 us':>9} {'p90 us':>9} {'p99 us':>9} {'peak KB':>8} {'kept KB':>8} {'blocks':>7}")
+    report = run_suite(args.rounds, args.seed, args.only)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        print(f"✅ baseline written to {args.save}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("meta", {}).get("seed") != args.seed:
+            print("⚠️  baseline was recorded with another seed; scenarios differ")
+        regressions = compare(baseline, report, args.threshold)
+        if regressions:
+            print(f"❌ {len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+            for line in regressions:
+                print(f"   {line}")
+            sys.exit(1)
+        print(f"✅ no regression beyond {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+Differential check of the vectorized engine (services/vector_rulecheck) against
+RuleChecker.evaluate, plus the throughput of both.
+
+    python -m bench.vector_diff [--plans 2000] [--seed 1] [--only bachelor]
+
+Plans come from bench.plans (every scenario, cycled with fresh seeds up to --plans per
+program). For every plan the engine's output must equal evaluate's result on what the
+engine supports: each stats key it returns (recursively), and the missing/violation
+lines with its prefixes. Rejections and raised errors must match too; edge-case variants
+of the generated plans cover those. Exits with status 1 if any program has a mismatch.
+Needs numpy (the "vector" extra) and a migrated DATABASE_URL.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import copy
+import random
+import sys
+import time
+from dataclasses import asdict
+from typing import Any, Dict, List, Optional
+
+from app.services import curriculum_registry, vector_rulecheck
+
+from .plans import PlanGenerator
+
+
+def _same(a: Any, b: Any) -> bool:
+    return type(a) is type(b) and a == b
+
+
+def diff(expected: Any, got: Any, path: str = "") -> List[str]:
+    """Where `got` differs from `expected`, looking only at the keys `got` has."""
+    if isinstance(got, dict):
+        if not isinstance(expected, dict):
+            return [f"{path}: expected {expected!r}, got a dict"]
+        out: List[str] = []
+        for k, v in got.items():
+            if k not in expected:
+                out.append(f"{path}/{k}: missing in evaluate")
+            else:
+                out.extend(diff(expected[k], v, f"{path}/{k}"))
+        return out
+    if isinstance(got, list) and isinstance(expected, list):
+        if len(got) != len(expected):
+            return [f"{path}: {len(expected)} items expected, got {len(got)}"]
+        return [line for i, (e, g) in enumerate(zip(expected, got)) for line in diff(e, g, f"{path}/{i}")]
+    return [] if _same(expected, got) else [f"{path}: expected {expected!r}, got {got!r}"]
+
+
+def compare(engine: Any, checker: Any, payload: Dict[str, Any], got: Dict[str, Any]) -> List[str]:
+    try:
+        result = asdict(checker.evaluate(payload))
+    except Exception as exc:
+        error = f"{type(exc).__name__}: {exc}"
+        return [] if got.get("error") == error else [f"evaluate raised {error!r}, engine gave {got}"]
+    if "error" in got:
+        return [f"engine raised {got['error']!r}, evaluate did not"]
+    if "rejected" in got:
+        if result["ok"] or result["message"] != got["rejected"]:
+            return [f"engine rejected ({got['rejected']!r}), evaluate: {result['message']!r}"]
+        return diff(result["stats"], got["stats"], "stats")
+
+    out = diff(result["stats"], got["stats"], "stats")
+    missing = [m for m in result["missing"] if m.startswith(engine.MISSING_PREFIXES)]
+    violations = [v for v in result["stats"].get("violations", []) if v.startswith(engine.VIOLATION_PREFIXES)]
+    out += diff(missing, got["missing"], "missing")
+    out += diff(violations, got["violations"], "violations")
+    return out
+
+
+def edge_cases(plan: Dict[str, Any], rng: random.Random) -> List[Dict[str, Any]]:
+    """Variants of `plan` that hit the rejection/error paths and the other payload shapes."""
+    out: List[Dict[str, Any]] = []
+
+    def variant(mutate: Any) -> None:
+        p = copy.deepcopy(plan)
+        mutate(p)
+        out.append(p)
+
+    courses = plan["plannedCourses"] + plan["doneCourses"]
+    pick = lambda p: rng.choice(p["plannedCourses"] or p["doneCourses"])  # noqa: E731
+    if courses:
+        variant(lambda p: pick(p).update(ects="abc"))
+        variant(lambda p: pick(p).update(ects=-3))
+        variant(lambda p: pick(p).update(code=""))
+        variant(lambda p: p["plannedCourses"].append(dict(pick(p), laneIndex=rng.randrange(6))))
+        variant(lambda p: pick(p).update(laneIndex=-1))
+        variant(lambda p: pick(p).update(category=None, examSubject=None))
+    variant(lambda p: p.update(programCode="999 999"))
+    variant(lambda p: p.update(selectedFocus=rng.choice(["ai", "Unbekannt", " vc ", ""])))
+    variant(lambda p: p.update(lanes=[
+        {"laneIndex": li, "plannedCourses": [c for c in p["plannedCourses"] if c.get("laneIndex") == li],
+         "doneCourses": [c for c in p["doneCourses"] if c.get("laneIndex") == li]}
+        for li in sorted({c.get("laneIndex", 0) for c in courses})
+    ]))
+    return out
+
+
+def plans_for(curriculum: Any, count: int, seed: int) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    plans: List[Dict[str, Any]] = []
+    round_ = 0
+    while len(plans) < count:
+        for payloads in PlanGenerator(curriculum, seed=seed + round_).scenarios().values():
+            plans.extend(payloads)
+            plans.extend(edge_cases(payloads[0], rng))
+        round_ += 1
+    return plans[:count]
+
+
+def run(count: int, seed: int, only: Optional[List[str]] = None) -> bool:
+    asyncio.run(curriculum_registry.load())
+    ok = True
+    for curriculum in curriculum_registry.snapshot():
+        if only and curriculum.engine not in only and curriculum.program_code not in only:
+            continue
+        checker = curriculum_registry.get_checker(curriculum.program_code)
+        engine = vector_rulecheck.engine_for(checker)
+        plans = plans_for(curriculum, count, seed)
+
+        started = time.perf_counter()
+        got = vector_rulecheck.evaluate_many(checker, plans)
+        vector_s = time.perf_counter() - started
+        started = time.perf_counter()
+        for payload in plans:
+            try:
+                checker.evaluate(payload)
+            except Exception:
+                pass
+        loop_s = time.perf_counter() - started
+
+        mismatches = 0
+        for i, (payload, row) in enumerate(zip(plans, got)):
+            problems = compare(engine, checker, payload, row)
+            if problems:
+                mismatches += 1
+                if mismatches <= 5:
+                    print(f"   plan {i}: " + "; ".join(problems[:3]))
+        mark = "✅" if not mismatches else "❌"
+        print(
+            f"{mark} {curriculum.engine} {curriculum.program_code}: {len(plans)} plans, {mismatches} mismatches; "
+            f"evaluate {len(plans) / loop_s:.0f} plans/s, vectorized {len(plans) / vector_s:.0f} plans/s "
+            f"(x{loop_s / vector_s:.1f})"
+        )
+        ok = ok and not mismatches
+    return ok
+
+
+def main(argv: List[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--plans", type=int, default=2000, help="plans per program")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--only", action="append", help="engine (bachelor/master) or program code (repeatable)")
+    args = parser.parse_args(argv)
+    if not vector_rulecheck.available():
+        print('❌ numpy is not installed (pip install ".[vector]")')
+        sys.exit(1)
+    if not run(args.plans, args.seed, args.only):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,5 @@
-DROP MATERIALIZED VIEW IF EXISTS v_catalog_json_mat;
-
-CREATE MATERIALIZED VIEW v_catalog_json_mat AS
+-- Live catalog tree per program (GET /catalog with USE_CATALOG_MAT=0).
+CREATE OR REPLACE VIEW v_catalog_json AS
 WITH courses AS (
     SELECT
         mc.module_id,
@@ -64,6 +63,13 @@ WITH courses AS (
     )
 SELECT program_id, program_code, catalog
 FROM subjects;
+COMMIT;
+
+-- Its materialized copy (USE_CATALOG_MAT=1). Created once; catalog changes reach it through
+-- refresh_catalog_json_mat() (007, 008). To change the tree, drop this view first.
+CREATE MATERIALIZED VIEW IF NOT EXISTS v_catalog_json_mat AS
+SELECT program_id, program_code, catalog
+FROM v_catalog_json;
 
 -- For REFRESH CONCURRENTLY:
 CREATE UNIQUE INDEX IF NOT EXISTS idx_v_catalog_json_mat_program
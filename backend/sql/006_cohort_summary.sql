@@ -0,0 +1,25 @@
+-- One row per user and planned program: what the rule engine derived from the stored
+-- planner_state. Kept current on every PUT /planner-state (services/cohort_analytics), so
+-- cohort reports aggregate these rows instead of evaluating the raw jsonb.
+CREATE TABLE IF NOT EXISTS planner_state_summary (
+    user_id uuid NOT NULL REFERENCES app_user(id) ON DELETE CASCADE,
+    program_code text NOT NULL,                  -- without spaces, e.g. '033521'
+    plan_fingerprint text NOT NULL,              -- rulecheck payload the row was derived from
+    curricula_version text NOT NULL,             -- curriculum_registry.version() at evaluation
+    state_updated_at timestamptz NOT NULL,       -- planner_state.updated_at that was evaluated
+    ok boolean,                                  -- NULL when the evaluation failed (see error)
+    error text,
+    total_ects double precision,
+    ects_per_semester double precision[] NOT NULL DEFAULT '{}',  -- [1] = first semester
+    steop_complete boolean,                      -- NULL for programs without StEOP
+    focus text,                                  -- recognized focus, NULL if none selected
+    missing text[] NOT NULL DEFAULT '{}',        -- requirement keys (amounts replaced by #)
+    heavy_semesters integer[] NOT NULL DEFAULT '{}',       -- above the recommended load
+    overloaded_semesters integer[] NOT NULL DEFAULT '{}',  -- above the maximum load
+    updated_at timestamptz NOT NULL DEFAULT now(),
+    PRIMARY KEY (user_id, program_code)
+);
+COMMIT;
+
+CREATE INDEX IF NOT EXISTS idx_planner_state_summary_program ON planner_state_summary(program_code);
+COMMIT;
@@ -0,0 +1,13 @@
+-- Catalog change notifications. Every API worker LISTENs on 'catalog_changed' and drops
+-- its cached /catalog responses (services/catalog_cache), so whatever rebuilds or
+-- refreshes v_catalog_json_mat must notify. Materialized views take no triggers, hence
+-- the refresh goes through this function rather than a bare REFRESH.
+CREATE OR REPLACE FUNCTION refresh_catalog_json_mat() RETURNS void
+LANGUAGE plpgsql AS $$
+BEGIN
+    REFRESH MATERIALIZED VIEW CONCURRENTLY v_catalog_json_mat;
+    -- delivered on commit, i.e. once the refreshed rows are visible
+    PERFORM pg_notify('catalog_changed', 'refresh');
+END;
+$$;
+COMMIT;
@@ -0,0 +1,70 @@
+-- Programs whose catalog changed since v_catalog_json_mat was last refreshed. Filled by the
+-- triggers below; drained by the refresher (services/catalog_refresh), which waits until a
+-- program has been quiet for a moment (debounce) before running refresh_catalog_json_mat().
+CREATE TABLE IF NOT EXISTS catalog_dirty (
+    program_id uuid PRIMARY KEY REFERENCES study_program(id) ON DELETE CASCADE,
+    first_marked_at timestamptz NOT NULL DEFAULT clock_timestamp(),  -- oldest unrefreshed change
+    last_marked_at timestamptz NOT NULL DEFAULT clock_timestamp()    -- newest one
+);
+COMMIT;
+
+CREATE OR REPLACE FUNCTION catalog_mark_dirty(programs uuid[]) RETURNS void
+LANGUAGE sql AS $$
+    INSERT INTO catalog_dirty (program_id)
+    SELECT DISTINCT p FROM unnest(programs) AS p WHERE p IS NOT NULL
+    ORDER BY p  -- same lock order in every transaction
+    ON CONFLICT (program_id) DO UPDATE SET last_marked_at = clock_timestamp();
+$$;
+COMMIT;
+
+-- Row trigger for the catalog tables: resolves the program(s) a changed row belongs to,
+-- before and after the change.
+CREATE OR REPLACE FUNCTION catalog_row_changed() RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+    rows_ jsonb[] := ARRAY[]::jsonb[];
+    r jsonb;
+    programs uuid[] := ARRAY[]::uuid[];
+BEGIN
+    IF TG_OP <> 'INSERT' THEN
+        rows_ := rows_ || to_jsonb(OLD);
+    END IF;
+    IF TG_OP <> 'DELETE' THEN
+        rows_ := rows_ || to_jsonb(NEW);
+    END IF;
+    FOREACH r IN ARRAY rows_ LOOP
+        IF TG_TABLE_NAME IN ('exam_subject', 'module') THEN
+            programs := programs || (r->>'program_id')::uuid;
+        ELSIF TG_TABLE_NAME = 'module_grouping' THEN
+            programs := programs || ARRAY(SELECT program_id FROM exam_subject WHERE id = (r->>'exam_subject_id')::uuid);
+        ELSIF TG_TABLE_NAME = 'module_course' THEN
+            programs := programs || ARRAY(SELECT program_id FROM module WHERE id = (r->>'module_id')::uuid);
+        ELSIF TG_TABLE_NAME = 'course' THEN
+            programs := programs || ARRAY(
+                SELECT m.program_id FROM module_course mc JOIN module m ON m.id = mc.module_id
+                WHERE mc.course_id = (r->>'id')::uuid
+            );
+        END IF;
+    END LOOP;
+    PERFORM catalog_mark_dirty(programs);
+    RETURN NULL;
+END;
+$$;
+COMMIT;
+
+DROP TRIGGER IF EXISTS trg_catalog_dirty ON exam_subject;
+CREATE TRIGGER trg_catalog_dirty AFTER INSERT OR UPDATE OR DELETE ON exam_subject
+    FOR EACH ROW EXECUTE FUNCTION catalog_row_changed();
+DROP TRIGGER IF EXISTS trg_catalog_dirty ON module;
+CREATE TRIGGER trg_catalog_dirty AFTER INSERT OR UPDATE OR DELETE ON module
+    FOR EACH ROW EXECUTE FUNCTION catalog_row_changed();
+DROP TRIGGER IF EXISTS trg_catalog_dirty ON module_grouping;
+CREATE TRIGGER trg_catalog_dirty AFTER INSERT OR UPDATE OR DELETE ON module_grouping
+    FOR EACH ROW EXECUTE FUNCTION catalog_row_changed();
+DROP TRIGGER IF EXISTS trg_catalog_dirty ON module_course;
+CREATE TRIGGER trg_catalog_dirty AFTER INSERT OR UPDATE OR DELETE ON module_course
+    FOR EACH ROW EXECUTE FUNCTION catalog_row_changed();
+DROP TRIGGER IF EXISTS trg_catalog_dirty ON course;
+CREATE TRIGGER trg_catalog_dirty AFTER INSERT OR UPDATE OR DELETE ON course
+    FOR EACH ROW EXECUTE FUNCTION catalog_row_changed();
+COMMIT;
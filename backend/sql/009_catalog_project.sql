@@ -0,0 +1,35 @@
+-- Sparse fieldsets for GET /catalog (fields=...): copies of catalog tree nodes without the
+-- keys a client did not ask for, one function per level of the tree. The drop lists are
+-- computed by the API (services/catalog_fields); an empty list keeps a level whole.
+CREATE OR REPLACE FUNCTION catalog_project_courses(courses jsonb, drop_course text[]) RETURNS jsonb
+LANGUAGE sql IMMUTABLE AS $$
+    SELECT COALESCE(jsonb_agg(c.value - drop_course ORDER BY c.ordinality), '[]'::jsonb)
+    FROM jsonb_array_elements(courses) WITH ORDINALITY AS c
+$$;
+COMMIT;
+
+CREATE OR REPLACE FUNCTION catalog_project_modules(modules jsonb, drop_module text[], drop_course text[]) RETURNS jsonb
+LANGUAGE sql IMMUTABLE AS $$
+    SELECT COALESCE(jsonb_agg(
+        CASE WHEN m.value ? 'courses' AND NOT 'courses' = ANY(drop_module) AND cardinality(drop_course) > 0
+             THEN jsonb_set(m.value - drop_module, '{courses}', catalog_project_courses(m.value->'courses', drop_course))
+             ELSE m.value - drop_module
+        END
+        ORDER BY m.ordinality), '[]'::jsonb)
+    FROM jsonb_array_elements(modules) WITH ORDINALITY AS m
+$$;
+COMMIT;
+
+CREATE OR REPLACE FUNCTION catalog_project(catalog jsonb, drop_subject text[], drop_module text[], drop_course text[]) RETURNS jsonb
+LANGUAGE sql IMMUTABLE AS $$
+    SELECT COALESCE(jsonb_agg(
+        CASE WHEN s.value ? 'modules' AND NOT 'modules' = ANY(drop_subject)
+                  AND cardinality(drop_module) + cardinality(drop_course) > 0
+             THEN jsonb_set(s.value - drop_subject, '{modules}',
+                            catalog_project_modules(s.value->'modules', drop_module, drop_course))
+             ELSE s.value - drop_subject
+        END
+        ORDER BY s.ordinality), '[]'::jsonb)
+    FROM jsonb_array_elements(catalog) WITH ORDINALITY AS s
+$$;
+COMMIT;
@@ -0,0 +1,117 @@
+-- Catalog versions for delta sync (GET /catalog?program_code=...&since=<version>).
+--
+-- catalog_node holds v_catalog_json_mat flattened into its subjects, modules (per subject)
+-- and courses (per module and subject), each stamped with the program's catalog version of
+-- its last change; removed nodes stay as tombstones (node NULL) so deltas can report them.
+-- catalog_record_versions() diffs the view against it and bumps the version of every
+-- program that changed; refresh_catalog_json_mat() calls it in the refresh's transaction.
+CREATE TABLE IF NOT EXISTS catalog_version (
+    program_id uuid PRIMARY KEY REFERENCES study_program(id) ON DELETE CASCADE,
+    version bigint NOT NULL DEFAULT 0,      -- 1 after the first recording
+    min_version bigint NOT NULL DEFAULT 0,  -- oldest since= that still gets a complete delta
+    updated_at timestamptz NOT NULL DEFAULT now()
+);
+COMMIT;
+
+CREATE TABLE IF NOT EXISTS catalog_node (
+    program_id uuid NOT NULL REFERENCES study_program(id) ON DELETE CASCADE,
+    kind text NOT NULL CHECK (kind IN ('subject', 'module', 'course')),
+    key text NOT NULL,         -- ids joined by '/': subject, subject/module, subject/module/course
+    ref jsonb NOT NULL,        -- the same ids as an object, as listed under "remove"
+    node jsonb,                -- tree node without its children plus parent ids; NULL once removed
+    version bigint NOT NULL,   -- catalog version of the last change
+    PRIMARY KEY (program_id, kind, key)
+);
+COMMIT;
+
+CREATE INDEX IF NOT EXISTS idx_catalog_node_version ON catalog_node(program_id, version);
+COMMIT;
+
+-- Tombstones are kept for this many versions; clients further behind get a full snapshot.
+CREATE OR REPLACE FUNCTION catalog_record_versions(keep_versions bigint DEFAULT 100) RETURNS void
+LANGUAGE plpgsql AS $$
+DECLARE
+    p record;
+    next_version bigint;
+    changed bigint;
+BEGIN
+    FOR p IN
+        SELECT sp.id AS program_id, v.catalog
+        FROM study_program sp
+        LEFT JOIN v_catalog_json_mat v ON v.program_id = sp.id
+        ORDER BY sp.id
+    LOOP
+        INSERT INTO catalog_version (program_id) VALUES (p.program_id) ON CONFLICT DO NOTHING;
+        SELECT version + 1 INTO next_version
+        FROM catalog_version WHERE program_id = p.program_id FOR UPDATE;
+
+        WITH cur AS (
+            SELECT 'subject' AS kind,
+                   s.value->>'exam_subject_id' AS key,
+                   jsonb_build_object('exam_subject_id', s.value->'exam_subject_id') AS ref,
+                   s.value - 'modules' AS node
+            FROM jsonb_array_elements(COALESCE(p.catalog, '[]'::jsonb)) s
+            UNION ALL
+            SELECT 'module',
+                   concat_ws('/', s.value->>'exam_subject_id', m.value->>'module_id'),
+                   jsonb_build_object('exam_subject_id', s.value->'exam_subject_id', 'module_id', m.value->'module_id'),
+                   (m.value - 'courses') || jsonb_build_object('exam_subject_id', s.value->'exam_subject_id')
+            FROM jsonb_array_elements(COALESCE(p.catalog, '[]'::jsonb)) s,
+                 jsonb_array_elements(s.value->'modules') m
+            UNION ALL
+            SELECT 'course',
+                   concat_ws('/', s.value->>'exam_subject_id', m.value->>'module_id', c.value->>'course_id'),
+                   jsonb_build_object('exam_subject_id', s.value->'exam_subject_id', 'module_id', m.value->'module_id',
+                                      'course_id', c.value->'course_id'),
+                   c.value || jsonb_build_object('exam_subject_id', s.value->'exam_subject_id', 'module_id', m.value->'module_id')
+            FROM jsonb_array_elements(COALESCE(p.catalog, '[]'::jsonb)) s,
+                 jsonb_array_elements(s.value->'modules') m,
+                 jsonb_array_elements(m.value->'courses') c
+        ),
+        upserted AS (
+            INSERT INTO catalog_node (program_id, kind, key, ref, node, version)
+            SELECT p.program_id, kind, key, ref, node, next_version FROM cur
+            ON CONFLICT (program_id, kind, key) DO UPDATE
+                SET node = EXCLUDED.node, version = EXCLUDED.version
+                WHERE catalog_node.node IS DISTINCT FROM EXCLUDED.node
+            RETURNING 1
+        ),
+        removed AS (
+            UPDATE catalog_node n SET node = NULL, version = next_version
+            WHERE n.program_id = p.program_id AND n.node IS NOT NULL
+              AND NOT EXISTS (SELECT 1 FROM cur WHERE cur.kind = n.kind AND cur.key = n.key)
+            RETURNING 1
+        )
+        SELECT (SELECT count(*) FROM upserted) + (SELECT count(*) FROM removed) INTO changed;
+
+        IF changed > 0 THEN
+            DELETE FROM catalog_node
+            WHERE program_id = p.program_id AND node IS NULL AND version <= next_version - keep_versions;
+            UPDATE catalog_version
+            SET version = next_version,
+                min_version = CASE WHEN next_version = 1 THEN 1
+                                   ELSE greatest(min_version, next_version - keep_versions) END,
+                updated_at = now()
+            WHERE program_id = p.program_id;
+        END IF;
+    END LOOP;
+END;
+$$;
+COMMIT;
+
+-- Replaces the definition of 007: versions are recorded in the refresh's transaction, so
+-- a version always describes the view contents committed with it.
+CREATE OR REPLACE FUNCTION refresh_catalog_json_mat() RETURNS void
+LANGUAGE plpgsql AS $$
+BEGIN
+    REFRESH MATERIALIZED VIEW CONCURRENTLY v_catalog_json_mat;
+    PERFORM catalog_record_versions();
+    -- delivered on commit, i.e. once the refreshed rows are visible
+    PERFORM pg_notify('catalog_changed', 'refresh');
+END;
+$$;
+COMMIT;
+
+-- First recording (and a no-op on later boots unless the view changed meanwhile).
+SELECT catalog_record_versions();
+COMMIT;